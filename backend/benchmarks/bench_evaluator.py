@@ -0,0 +1,84 @@
+"""
+Benchmark of the fusion evaluator.
+
+Times the original line-overlap evaluator and ReportTemplate.score on batches of candidate
+reports derived from example_report.md (reworded, reformatted and truncated variants), and
+prints each candidate's scores so the two rankings can be compared.
+
+Usage:
+    python benchmarks/bench_evaluator.py [--candidates 3,5,10] [--iterations 200]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.report_evaluator import DIMENSIONS, ReportTemplate
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def legacy_scores(outputs, example):
+    """The line-set overlap llm_prompts.evaluator used before report_evaluator."""
+    example_lines = frozenset(example.split('\n'))
+    return [len(set(output.split('\n')).intersection(example_lines)) / len(example_lines) for output in outputs]
+
+
+def make_candidates(example, count):
+    lines = example.split("\n")
+    variants = [
+        ("verbatim", example),
+        ("reindented", "\n".join("  " + line for line in lines)),
+        ("plain text", example.replace("**", "")),
+        ("first half", "\n".join(lines[:len(lines) // 2])),
+        ("narrative only", example[example.index("**Narrative:**"):]),
+        ("no placeholders", example.replace("Not provided", "")),
+        ("unrelated", "The weather today is sunny with a light breeze from the west."),
+    ]
+    return [(f"{name} {index // len(variants)}" if index >= len(variants) else name, text)
+            for index, (name, text) in ((i, variants[i % len(variants)]) for i in range(count))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", default="3,5,10")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    with open(os.path.join(BACKEND_DIR, "src", "example_report.md")) as example_file:
+        example = example_file.read().strip()
+    with open(os.path.join(BACKEND_DIR, "tests", "test_transcription.txt")) as transcription_file:
+        transcription = transcription_file.read()
+
+    started = time.perf_counter()
+    template = ReportTemplate(example)
+    print(f"Template: {len(template.sections)} sections, {len(template.fields)} fields, "
+          f"{len(template.vocabulary)} terms, parsed in {(time.perf_counter() - started) * 1000:.2f} ms")
+
+    for count in (int(value) for value in args.candidates.split(",")):
+        outputs = [text for _, text in make_candidates(example, count)]
+        timings = {}
+        for name, score in [
+            ("line overlap", lambda: legacy_scores(outputs, example)),
+            ("report_evaluator", lambda: template.score(outputs, transcription)),
+        ]:
+            started = time.perf_counter()
+            for _ in range(args.iterations):
+                score()
+            timings[name] = (time.perf_counter() - started) / args.iterations * 1000
+        print(f"{count:>3} candidates: " + ", ".join(f"{name} {ms:.3f} ms" for name, ms in timings.items()))
+
+    candidates = make_candidates(example, 7)
+    legacy = legacy_scores([text for _, text in candidates], example)
+    scores = template.score([text for _, text in candidates], transcription)
+    print(f"\n{'candidate':>16}  {'legacy':>7}  {'score':>6}  " + "  ".join(f"{name:>18}" for name in DIMENSIONS))
+    for index, (name, _) in enumerate(candidates):
+        print(f"{name:>16}  {legacy[index]:7.3f}  {scores['score'][index]:6.3f}  "
+              + "  ".join(f"{scores[dimension][index]:18.3f}" for dimension in DIMENSIONS))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Micro-benchmark of the per-request setup cost of report generation.
+
+Compares the original setup path (load_dotenv, three llm.get_model calls, re-reading
+example_report.md and rebuilding what the evaluator compares against, formatting the user prompt) against the
+cached path in src.llm_prompts. No LLM calls are made.
+
+Usage:
+    python benchmarks/bench_llm_setup.py [--iterations 200] [--models gpt-4o-mini,gpt-4o,gpt-4]
+
+Models default to REPORT_MODELS or the Groq models; pass --models with any ids known to
+the installed llm plugins if llm-groq is not installed.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm
+from dotenv import load_dotenv
+from src import llm_prompts
+from src.llm_prompts import DEFAULT_REPORT_MODELS
+
+TRANSCRIPTION_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "test_transcription.txt")
+
+
+def legacy_setup(model_ids, transcription):
+    """The setup work every request used to repeat."""
+    load_dotenv()
+    models = [llm.get_model(model_id) for model_id in model_ids]
+    with open(llm_prompts.user_prompt_path, 'r') as file:
+        template = file.read().strip()
+    with open(llm_prompts.example_report_path, 'r') as file:
+        example_report = file.read().strip()
+    prompt = template.format(transcription=transcription, reportType="General Occurrence", example_report=example_report)
+    with open(llm_prompts.example_report_path, 'r') as file:
+        example_lines = set(file.read().strip().split('\n'))
+    return models, prompt, example_lines
+
+
+def cached_setup(transcription):
+    models = llm_prompts.build_models()
+    prompt = llm_prompts.generate_user_prompt(transcription, "General Occurrence")
+    template = llm_prompts._report_template.get()
+    return models, prompt, template
+
+
+def measure(function, iterations):
+    function()  # Warm up
+    started = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return (time.perf_counter() - started) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--models", default=os.getenv("REPORT_MODELS", DEFAULT_REPORT_MODELS))
+    args = parser.parse_args()
+
+    os.environ["REPORT_MODELS"] = args.models
+    model_ids = [model_id.strip() for model_id in args.models.split(",")]
+    with open(TRANSCRIPTION_PATH, 'r') as file:
+        transcription = file.read().strip()
+
+    before = measure(lambda: legacy_setup(model_ids, transcription), args.iterations)
+    llm_prompts.clear_caches()
+    after = measure(lambda: cached_setup(transcription), args.iterations)
+
+    print(f"models: {', '.join(model_ids)}")
+    print(f"before: {before * 1e6:10.1f} us per request")
+    print(f"after:  {after * 1e6:10.1f} us per request")
+    print(f"speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
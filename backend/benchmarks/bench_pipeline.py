@@ -0,0 +1,358 @@
+"""
+Load benchmark of the whole API against offline stand-ins for Groq and the report models.
+
+Starts the real app under uvicorn in a background thread, with the Groq SDK and the llm
+models replaced by the stand-ins in stubs.py, and drives POST /api/v1/upload-audio, both
+WebSocket endpoints and POST /api/v1/generate_report at a fixed number of requests in
+flight. For each scenario it reports throughput, p50/p95/p99 latency, errors, peak RSS
+and the event-loop lag of the server's loop, and saves everything as JSON so runs on
+different commits can be compared with --compare. No network calls are made; the rate
+limiter, transcription cache and UPSTREAM_RATE_LIMITS are disabled so runs are comparable.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--scenarios upload,stream_audio,transcribe_stream,report]
+        [--requests 40] [--concurrency 8] [--transcription-latency 0.3] [--llm-latency 1.0]
+        [--rate-limit-rate 0.0] [--error-rate 0.0] [--output results.json] [--compare baseline.json] [--verbose]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from stubs import LatencyProfile, StubModel, stub_groq_client, synthetic_speech
+
+SCENARIOS = ["upload", "stream_audio", "transcribe_stream", "report"]
+CONTROL_STATUSES = ("session", "keep-alive", "backpressure")  # Stream messages that are not replies
+SAMPLE_RATE = 16000
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def summarize(values):
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "mean": None, "max": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "p50": round(float(p50), 4),
+        "p95": round(float(p95), 4),
+        "p99": round(float(p99), 4),
+        "mean": round(float(np.mean(values)), 4),
+        "max": round(float(np.max(values)), 4),
+    }
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes a task that sleeps for a fixed interval."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples = []
+
+    async def run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - started - self.interval))
+
+    def take(self):
+        samples, self.samples = self.samples, []
+        return samples
+
+
+class BenchServer:
+    """Runs the app under uvicorn on its own event loop in a background thread."""
+
+    def __init__(self, app):
+        import uvicorn
+
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning", ws="websockets"))
+        self.lag = LoopLagMonitor()
+        self.thread = threading.Thread(target=lambda: asyncio.run(self._serve()), daemon=True)
+
+    async def _serve(self):
+        monitor = asyncio.create_task(self.lag.run())
+        try:
+            await self.server.serve()
+        finally:
+            monitor.cancel()
+
+    def start(self) -> int:
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError("The server failed to start")
+            time.sleep(0.01)
+        return self.server.servers[0].sockets[0].getsockname()[1]
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(10)
+
+
+def load_app(args, data_dir):
+    """Import the app with a reproducible environment and swap in the stand-ins."""
+    os.environ.update({
+        "GROQ_API_KEY": "benchmark",  # Never used: the SDK client is replaced below
+        "TRANSCRIPTION_BACKEND": "groq",
+        "TRANSCRIPTION_CACHE_SIZE": "0",
+        "TRANSCRIPTION_CACHE_DB": "",
+        "REPORT_CACHE_SIZE": "0",  # Every request should reach the stand-in models
+        "REPORT_CACHE_DB": "",
+        "UPSTREAM_RATE_LIMITS": "",
+        "JOBS_DB": os.path.join(data_dir, "jobs.sqlite"),
+        "JOBS_DIR": os.path.join(data_dir, "jobs"),
+        "PROFILING_ENABLED": "false",
+    })
+    from src import llm_prompts, main
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)  # main configures INFO logging for every module
+    main.limiter.enabled = False
+    # Startup keeps a backend that is already set, so build it now to swap its SDK client
+    main.initialize_transcription_backend().client = stub_groq_client(LatencyProfile(
+        args.transcription_latency, args.sigma, args.rate_limit_rate, args.error_rate, args.retry_after, seed=args.seed
+    ))
+
+    with open(os.path.join(BACKEND_DIR, "src", "example_report.md")) as example:
+        example_lines = example.read().split("\n")
+    models = []
+    for index in range(args.models):
+        profile = LatencyProfile(args.llm_latency, args.sigma, args.rate_limit_rate, args.error_rate, args.retry_after, seed=args.seed + 1 + index)
+        # Each model's report keeps a different share of the example's lines, so the evaluator has a choice to make
+        report = "\n".join(example_lines[:max(1, len(example_lines) * (index + 1) // args.models)])
+        models.append(StubModel(f"stub-model-{index + 1}", profile, report))
+    with llm_prompts._models_lock:
+        llm_prompts._models = models
+    return main.app
+
+
+async def run_scenario(name, one, requests, concurrency, server):
+    latencies, errors = [], Counter()
+    queue = asyncio.Queue()
+    for index in range(requests):
+        queue.put_nowait(index)
+    peak_rss = current_rss()
+
+    async def worker():
+        while not queue.empty():
+            index = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                await one(index)
+                latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                errors[str(e) or type(e).__name__] += 1
+
+    async def sample_rss():
+        nonlocal peak_rss
+        while True:
+            peak_rss = max(peak_rss, current_rss())
+            await asyncio.sleep(0.05)
+
+    server.lag.take()
+    sampler = asyncio.create_task(sample_rss())
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    sampler.cancel()
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "succeeded": len(latencies),
+        "errors": dict(errors),
+        "seconds": round(elapsed, 3),
+        "throughput_per_second": round(len(latencies) / elapsed, 3),
+        "latency_seconds": summarize(latencies),
+        "event_loop_lag_seconds": summarize(server.lag.take()),
+        "peak_rss_mb": round(peak_rss / 2 ** 20, 1),
+    }
+
+
+def make_scenarios(args, base_url):
+    import httpx
+    import websockets
+
+    from src.audio_chunker import pcm_to_wav
+
+    audio = synthetic_speech(args.audio_seconds, SAMPLE_RATE, seed=args.seed)
+    upload_wav = pcm_to_wav(audio)
+    message_wav = pcm_to_wav(audio[:3 * SAMPLE_RATE])
+    chunk_bytes = int(SAMPLE_RATE * args.chunk_ms / 1000) * 2
+    pcm = audio.tobytes()
+    with open(os.path.join(BACKEND_DIR, "tests", "test_transcription.txt")) as transcription_file:
+        transcription = transcription_file.read()
+    ws_url = base_url.replace("http://", "ws://")
+    client = httpx.AsyncClient(base_url=base_url, timeout=300)
+
+    def check(response):
+        if response.status_code >= 400:
+            raise RuntimeError(f"HTTP {response.status_code}")
+
+    async def upload(index):
+        check(await client.post("/api/v1/upload-audio", files={"file": (f"bench-{index}.wav", upload_wav, "audio/wav")}))
+
+    async def stream_audio(index):
+        async with websockets.connect(f"{ws_url}/api/v1/stream-audio", max_size=None) as websocket:
+            for start in range(0, len(pcm), chunk_bytes):
+                await websocket.send(pcm[start:start + chunk_bytes])
+                if args.realtime:
+                    await asyncio.sleep(args.chunk_ms / 1000)
+            await websocket.send(b"")
+            async for message in websocket:
+                event = json.loads(message)
+                if event.get("status") == "complete":
+                    return
+                if event.get("status") == "error":
+                    raise RuntimeError(f"stream error: {event.get('detail') or event.get('message')}")
+            raise RuntimeError("stream closed before completing")
+
+    async def transcribe_stream(index):
+        async with websockets.connect(f"{ws_url}/api/v1/transcribe-stream", max_size=None) as websocket:
+            for _ in range(args.messages):
+                await websocket.send(message_wav)
+                reply = json.loads(await websocket.recv())
+                while reply.get("status") in CONTROL_STATUSES:
+                    reply = json.loads(await websocket.recv())
+                if "error" in reply:
+                    raise RuntimeError(f"transcribe-stream error: {reply['error']}")
+
+    async def report(index):
+        check(await client.post("/api/v1/generate_report", json={"transcription": transcription, "report_type": "General Occurrence"}))
+
+    return client, {"upload": upload, "stream_audio": stream_audio, "transcribe_stream": transcribe_stream, "report": report}
+
+
+async def bench(args, base_url, server):
+    client, scenarios = make_scenarios(args, base_url)
+    results = {}
+    try:
+        for name in args.scenarios:
+            # A few unmeasured requests first, so lazy imports and connection setup are not timed
+            await run_scenario(name, scenarios[name], min(args.warm_up, args.requests), args.concurrency, server)
+            results[name] = await run_scenario(name, scenarios[name], args.requests, args.concurrency, server)
+            print_result(name, results[name])
+    finally:
+        await client.aclose()
+    return results
+
+
+def print_result(name, result):
+    latency, lag = result["latency_seconds"], result["event_loop_lag_seconds"]
+    errors = sum(result["errors"].values())
+    if latency["p50"] is None:
+        print(f"{name:>17}: every request failed {result['errors']}")
+        return
+    print(
+        f"{name:>17}: {result['throughput_per_second']:7.2f}/s  p50 {latency['p50']:.3f} s  p95 {latency['p95']:.3f} s  "
+        f"p99 {latency['p99']:.3f} s  loop lag p99 {(lag['p99'] or 0) * 1000:.1f} ms  "
+        f"RSS {result['peak_rss_mb']} MB  errors {errors}"
+    )
+
+
+def compare(baseline, results):
+    print(f"\nCompared with {baseline.get('commit', 'baseline')}:")
+    for name, result in results.items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before or before["latency_seconds"]["p50"] is None or result["latency_seconds"]["p50"] is None:
+            continue
+        changes = []
+        for label, old, new in [
+            ("throughput", before["throughput_per_second"], result["throughput_per_second"]),
+            ("p50", before["latency_seconds"]["p50"], result["latency_seconds"]["p50"]),
+            ("p95", before["latency_seconds"]["p95"], result["latency_seconds"]["p95"]),
+            ("p99", before["latency_seconds"]["p99"], result["latency_seconds"]["p99"]),
+        ]:
+            changes.append(f"{label} {(new - old) / old * 100:+.1f}%" if old else f"{label} n/a")
+        print(f"{name:>17}: " + "  ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated subset of " + ", ".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=40, help="Measured requests (or sessions) per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warm-up", type=int, default=4, help="Unmeasured requests before each scenario")
+    parser.add_argument("--transcription-latency", type=float, default=0.3, help="Median stand-in transcription latency in seconds")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="Median stand-in report model latency in seconds")
+    parser.add_argument("--sigma", type=float, default=0.25, help="Log-normal spread of stand-in latencies")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of stand-in calls answered with a 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of stand-in calls that fail otherwise")
+    parser.add_argument("--retry-after", type=float, default=0.5, help="Retry-After of stand-in 429s")
+    parser.add_argument("--models", type=int, default=3, help="Number of stand-in report models")
+    parser.add_argument("--audio-seconds", type=float, default=30, help="Length of the synthetic recording")
+    parser.add_argument("--chunk-ms", type=int, default=100, help="Audio per message on /api/v1/stream-audio")
+    parser.add_argument("--realtime", action="store_true", help="Send stream-audio chunks in real time rather than at once")
+    parser.add_argument("--messages", type=int, default=3, help="WAV messages per /api/v1/transcribe-stream session")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON results file (default benchmarks/results/pipeline-<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--verbose", action="store_true", help="Keep the server's INFO logs, such as the report each request chose")
+    args = parser.parse_args()
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    commit = git_commit()
+    with tempfile.TemporaryDirectory() as data_dir:
+        server = BenchServer(load_app(args, data_dir))
+        port = server.start()
+        print(f"Commit {commit}: {args.requests} requests per scenario, {args.concurrency} in flight")
+        try:
+            results = asyncio.run(bench(args, f"http://127.0.0.1:{port}", server))
+        finally:
+            server.stop()
+
+    output = args.output or os.path.join(BACKEND_DIR, "benchmarks", "results", f"pipeline-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as output_file:
+        json.dump({
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+            "scenarios": results,
+        }, output_file, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            compare(json.load(baseline_file), results)
+
+
+if __name__ == "__main__":
+    main()
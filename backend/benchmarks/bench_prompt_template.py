@@ -0,0 +1,99 @@
+"""
+Benchmark of prompt placeholder substitution in MinimalChainable.run.
+
+Compares the original approach (a str.replace over the whole prompt for every context key
+and every previous output, with json.dumps for each dict output) against the compiled
+templates in src.chain, on a multi-stage chain whose prompts embed a ~50k-token transcript.
+
+Usage:
+    python benchmarks/bench_prompt_template.py [--tokens 50000] [--stages 4] [--iterations 50]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.chain import compile_prompt
+
+
+def legacy_fill(prompt, context, output):
+    """The substitution loop MinimalChainable.run used before templates were compiled."""
+    i = len(output)
+    for key, value in context.items():
+        if "{{" + key + "}}" in prompt:
+            prompt = prompt.replace("{{" + key + "}}", str(value))
+    for j in range(i, 0, -1):
+        previous_output = output[i - j]
+        if isinstance(previous_output, dict):
+            if f"{{{{output[-{j}]}}}}" in prompt:
+                prompt = prompt.replace(f"{{{{output[-{j}]}}}}", json.dumps(previous_output))
+            for key, value in previous_output.items():
+                if f"{{{{output[-{j}].{key}}}}}" in prompt:
+                    prompt = prompt.replace(f"{{{{output[-{j}].{key}}}}}", str(value))
+        else:
+            if f"{{{{output[-{j}]}}}}" in prompt:
+                prompt = prompt.replace(f"{{{{output[-{j}]}}}}", str(previous_output))
+    return prompt
+
+
+def build_chain(tokens, stages):
+    words = ["officer", "suspect", "vehicle", "dawson", "road", "witness", "stated", "approximately", "hours", "the"]
+    transcript = " ".join(words[i % len(words)] for i in range(tokens))
+    context = {"transcript": transcript, "report_type": "General Occurrence", "officer": "Constable Adams"}
+    context.update({f"field_{i}": f"value {i}" for i in range(20)})
+    outputs = [{f"key_{k}": f"stage {s} value {k} " * 20 for k in range(20)} for s in range(stages - 1)]
+    prompts = []
+    for stage in range(stages):
+        references = " ".join(
+            f"{{{{output[-{j}]}}}} {{{{output[-{j}].key_3}}}}" for j in range(1, stage + 1)
+        )
+        prompts.append(
+            f"Stage {stage} for {{{{officer}}}} ({{{{report_type}}}}).\n{references}\n"
+            f"Transcript:\n{{{{transcript}}}}\nFields: " + " ".join(f"{{{{field_{i}}}}}" for i in range(20))
+        )
+    return context, prompts, outputs
+
+
+def run_chain(fill, context, prompts, outputs):
+    return [fill(prompt, context, outputs[:stage]) for stage, prompt in enumerate(prompts)]
+
+
+def compiled_fill(prompt, context, output):
+    return compile_prompt(prompt).render(context, output)
+
+
+def measure(function, iterations):
+    function()  # Warm up
+    started = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return (time.perf_counter() - started) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=50000)
+    parser.add_argument("--stages", type=int, default=4)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    context, prompts, outputs = build_chain(args.tokens, args.stages)
+    legacy = run_chain(legacy_fill, context, prompts, outputs)
+    compiled = run_chain(compiled_fill, context, prompts, outputs)
+    assert legacy == compiled, "Compiled templates must produce the same prompts"
+
+    before = measure(lambda: run_chain(legacy_fill, context, prompts, outputs), args.iterations)
+    after = measure(lambda: run_chain(compiled_fill, context, prompts, outputs), args.iterations)
+
+    print(f"transcript: {args.tokens} tokens, {len(context['transcript'])} chars, {args.stages} stages")
+    print(f"before: {before * 1e3:8.3f} ms per chain")
+    print(f"after:  {after * 1e3:8.3f} ms per chain")
+    print(f"speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
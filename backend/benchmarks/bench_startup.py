@@ -0,0 +1,91 @@
+"""
+Cold-start benchmark of the API.
+
+Starts a fresh interpreter for each run, as a new worker or container would, and times
+importing src.main, running the app's startup and waiting until it is ready to serve,
+along with the wall time of the whole process. The Groq backend is built with a dummy
+key and never called, and the job store is opened in a temporary directory, so no network
+calls are made. Pass --backend-dir to time another checkout, such as a git worktree of an
+earlier commit.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 10] [--backend groq] [--backend-dir path/to/backend]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child interpreter; prints one JSON line of timings
+CHILD = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+from src import main
+imported = time.perf_counter()
+
+async def measure():
+    async with main.app.router.lifespan_context(main.app):
+        startup = time.perf_counter()
+        deadline = startup + float(sys.argv[2])
+        while not getattr(main, "ready", True) and time.perf_counter() < deadline:
+            await asyncio.sleep(0.005)
+        return startup, time.perf_counter()
+
+startup, ready = asyncio.run(measure())
+print(json.dumps({"import": imported - started, "startup": startup - imported, "ready": ready - started}))
+"""
+
+
+def run_once(args, data_dir):
+    env = dict(
+        os.environ,
+        GROQ_API_KEY="benchmark",
+        TRANSCRIPTION_BACKEND=args.backend,
+        JOBS_DB=os.path.join(data_dir, "jobs.sqlite"),
+        JOBS_DIR=os.path.join(data_dir, "jobs"),
+        TRANSCRIPTION_CACHE_DB="",
+        REPORT_CACHE_DB="",
+    )
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD, args.backend_dir, str(args.timeout)],
+        cwd=data_dir, env=env, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "child failed")
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings["process"] = wall
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--backend", default="groq", help="TRANSCRIPTION_BACKEND of the started app")
+    parser.add_argument("--backend-dir", default=BACKEND_DIR, help="Backend checkout to start")
+    parser.add_argument("--timeout", type=float, default=300, help="Longest wait for readiness, in seconds")
+    args = parser.parse_args()
+
+    runs = []
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as data_dir:
+            runs.append(run_once(args, data_dir))
+
+    print(f"{args.runs} cold starts of {args.backend_dir} with the {args.backend} backend")
+    print(f"{'phase':>8}  {'median s':>8}  {'min s':>6}  {'max s':>6}")
+    for phase in ("import", "startup", "ready", "process"):
+        values = [run[phase] for run in runs]
+        print(f"{phase:>8}  {statistics.median(values):8.3f}  {min(values):6.3f}  {max(values):6.3f}")
+
+
+if __name__ == "__main__":
+    main()
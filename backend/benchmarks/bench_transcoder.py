@@ -0,0 +1,68 @@
+"""
+Benchmark of the upload transcoder.
+
+Builds a synthetic speech recording as a 48 kHz stereo WAV, the kind of file a browser or
+phone recorder uploads, and for each codec times decoding it to 16 kHz mono PCM and
+encoding it again, printing the payload size and its reduction against the upload.
+Codecs other than wav need ffmpeg; without it they fall back to 16 kHz mono WAV, which
+the output shows.
+
+Usage:
+    python benchmarks/bench_transcoder.py [--minutes 10] [--codecs opus,flac,wav] [--workers 2]
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import sys
+import time
+import wave
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stubs import synthetic_speech
+from src.transcoder import Transcoder
+
+
+def stereo_upload(minutes: float, sample_rate: int = 48000) -> bytes:
+    samples = synthetic_speech(minutes * 60, sample_rate=sample_rate)
+    wav_data = io.BytesIO()
+    with wave.open(wav_data, "wb") as wav_file:
+        wav_file.setnchannels(2)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(np.stack([samples, samples], axis=1).tobytes())
+    return wav_data.getvalue()
+
+
+async def run(args):
+    upload = stereo_upload(args.minutes)
+    print(f"Upload: {args.minutes:g} min, 48 kHz stereo WAV, {len(upload) / 1e6:.1f} MB")
+    print(f"{'codec':>6}  {'sent as':>7}  {'decode s':>8}  {'encode s':>8}  {'MB':>7}  {'reduction':>9}")
+    for codec in args.codecs.split(","):
+        transcoder = Transcoder(max_workers=args.workers, codec=codec)
+        try:
+            pcm = await transcoder.decode(upload, "upload.wav")
+            started = time.perf_counter()
+            payload, extension = await transcoder.encode(pcm.samples, pcm.sample_rate)
+            wall = time.perf_counter() - started
+            stats = transcoder.stats()
+            print(f"{codec:>6}  {extension:>7}  {stats['decode_seconds']:8.2f}  {stats['encode_seconds']:8.2f}  "
+                  f"{len(payload) / 1e6:7.2f}  {len(upload) / len(payload):8.1f}x  (encode wall {wall:.2f} s)")
+        finally:
+            transcoder.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, default=10)
+    parser.add_argument("--codecs", default="opus,flac,wav")
+    parser.add_argument("--workers", type=int, default=2)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark of transcription backends on the same audio.
+
+Sends a recording to each backend a number of times with a fixed number of requests in
+flight and reports latency and throughput, so the local Whisper engine's CPU (or GPU)
+throughput can be compared with the Groq API's latency. Unlike the other benchmarks this
+one does real work: the Groq backend needs GROQ_API_KEY and makes network calls, and the
+local backend needs transformers and torch and downloads its model on first use.
+
+Usage:
+    python benchmarks/bench_transcription_backends.py [--backends groq,local] [--audio tests/test_audio.mp3]
+        [--requests 8] [--concurrency 4]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.transcription_backends import create_backend
+
+
+async def bench(name, audio, filename, requests, concurrency):
+    backend = create_backend(name)
+    try:
+        started = time.perf_counter()
+        await backend.warm_up()
+        warm_up = time.perf_counter() - started
+
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def one():
+            async with semaphore:
+                started = time.perf_counter()
+                await backend.transcribe_audio((filename, audio), language="en")
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - started
+    finally:
+        await backend.aclose()
+
+    latencies.sort()
+    print(
+        f"{name:>6}: warm-up {warm_up:.2f} s, latency p50 {statistics.median(latencies):.2f} s "
+        f"max {latencies[-1]:.2f} s, {requests / elapsed:.2f} requests/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    default_audio = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "test_audio.mp3")
+    parser.add_argument("--backends", default="groq,local")
+    parser.add_argument("--audio", default=default_audio)
+    parser.add_argument("--requests", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    with open(args.audio, "rb") as audio_file:
+        audio = audio_file.read()
+    print(f"{os.path.basename(args.audio)}: {len(audio)} bytes, {args.requests} requests, {args.concurrency} in flight")
+
+    for name in args.backends.split(","):
+        try:
+            asyncio.run(bench(name.strip(), audio, os.path.basename(args.audio), args.requests, args.concurrency))
+        except (RuntimeError, ValueError) as e:
+            print(f"{name:>6}: skipped ({str(e)})")
+
+
+if __name__ == "__main__":
+    main()
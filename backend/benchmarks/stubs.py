@@ -0,0 +1,163 @@
+"""
+Deterministic local stand-ins for the upstream APIs, used by bench_pipeline.py.
+
+StubTranscriptions replaces the Groq SDK's audio.transcriptions resource and StubModel
+replaces an llm model, so everything between the HTTP handler and the network (upload
+spooling, VAD, chunking, the upstream scheduler, the fusion chain and the evaluator)
+runs for real. Each stand-in draws its latency from a log-normal distribution and fails
+a given fraction of calls with a 429 or another error. The n-th call to a stand-in always
+draws the same outcome for a given seed, whatever order concurrent calls arrive in.
+"""
+
+import asyncio
+import math
+import random
+import threading
+import time
+from types import SimpleNamespace
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+class StubRateLimitError(Exception):
+    """Looks like a Groq 429 to retry_after_seconds."""
+
+    status_code = 429
+
+    def __init__(self, retry_after: float):
+        super().__init__("Rate limit exceeded (stub)")
+        self.headers = {"Retry-After": str(retry_after)}
+
+
+class StubUpstreamError(Exception):
+    status_code = 500
+
+
+class LatencyProfile:
+    """
+    Latency and failure distribution of a stand-in upstream.
+
+    Args:
+        median (float): Median latency in seconds.
+        sigma (float): Spread of the log-normal latency; 0 makes every call take the median.
+        rate_limit_rate (float): Fraction of calls answered with a 429.
+        error_rate (float): Fraction of calls that fail with another error.
+        retry_after (float): Retry-After sent with each 429.
+        seed (int): Seed of the per-call draws.
+    """
+
+    def __init__(self, median: float, sigma: float = 0.25, rate_limit_rate: float = 0.0, error_rate: float = 0.0,
+                 retry_after: float = 0.5, seed: int = 0):
+        self.median = median
+        self.sigma = sigma
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.seed = seed
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def draw(self) -> Tuple[float, Optional[Exception]]:
+        """Return the latency of the next call and the exception it fails with, if any."""
+        with self._lock:
+            index = self.calls
+            self.calls += 1
+        rng = random.Random(f"{self.seed}:{index}")
+        latency = rng.lognormvariate(math.log(self.median), self.sigma) if self.median > 0 and self.sigma > 0 else self.median
+        outcome = rng.random()
+        if outcome < self.rate_limit_rate:
+            return latency, StubRateLimitError(self.retry_after)
+        if outcome < self.rate_limit_rate + self.error_rate:
+            return latency, StubUpstreamError("Upstream error (stub)")
+        return latency, None
+
+    def describe(self) -> dict:
+        return {
+            "median": self.median,
+            "sigma": self.sigma,
+            "rate_limit_rate": self.rate_limit_rate,
+            "error_rate": self.error_rate,
+            "retry_after": self.retry_after,
+            "seed": self.seed,
+        }
+
+
+SENTENCES = [
+    "Officer Duffy arrived on scene at 704 McLaughlin Street.",
+    "The complainant reported a person carrying a weapon near the entrance.",
+    "The suspect was described as wearing a dark jacket and jeans.",
+    "No injuries were reported at the time of the call.",
+    "Units searched the area and located the suspect nearby.",
+]
+
+
+class StubTranscriptions:
+    """Async stand-in for AsyncGroq().audio.transcriptions."""
+
+    def __init__(self, profile: LatencyProfile):
+        self.profile = profile
+
+    async def create(self, file=None, model=None, prompt=None, response_format=None, language=None, temperature=None, timeout=None):
+        latency, error = self.profile.draw()
+        await asyncio.sleep(latency)
+        if error is not None:
+            raise error
+        return SimpleNamespace(text=" ".join(SENTENCES))
+
+
+def stub_groq_client(profile: LatencyProfile) -> SimpleNamespace:
+    """Return an object that can replace AsyncGroqClient.client."""
+    return SimpleNamespace(audio=SimpleNamespace(transcriptions=StubTranscriptions(profile)))
+
+
+class StubResponse:
+    def __init__(self, chunks: List[str], latency: float):
+        self._chunks = chunks
+        self._latency = latency
+
+    def __iter__(self) -> Iterator[str]:
+        for chunk in self._chunks:
+            time.sleep(self._latency / len(self._chunks))
+            yield chunk
+
+    def text(self) -> str:
+        time.sleep(self._latency)
+        return "".join(self._chunks)
+
+
+class StubModel:
+    """Stand-in for an llm model; prompt() blocks like the real client does."""
+
+    def __init__(self, model_id: str, profile: LatencyProfile, report: str):
+        self.model_id = model_id
+        self.profile = profile
+        self.report = report
+
+    def prompt(self, prompt: str, system: Optional[str] = None) -> StubResponse:
+        latency, error = self.profile.draw()
+        if error is not None:
+            time.sleep(latency)
+            raise error
+        return StubResponse([line + "\n" for line in self.report.split("\n")], latency)
+
+
+def synthetic_speech(seconds: float, sample_rate: int = 16000, seed: int = 0) -> np.ndarray:
+    """
+    Return int16 PCM that voice activity detection treats like speech.
+
+    Bursts of amplitude-modulated tones alternate with near-silent pauses, so VAD trims
+    some audio and live streams close windows at pauses, as they do with real recordings.
+    """
+    rng = np.random.default_rng(seed)
+    samples = np.zeros(int(seconds * sample_rate), dtype=np.float64)
+    position = 0
+    while position < len(samples):
+        burst = int(rng.uniform(1.0, 2.5) * sample_rate)
+        t = np.arange(min(burst, len(samples) - position)) / sample_rate
+        envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t)
+        tone = np.sin(2 * np.pi * rng.uniform(120, 300) * t) + 0.3 * np.sin(2 * np.pi * rng.uniform(600, 1200) * t)
+        samples[position:position + len(t)] = 6000 * envelope * tone
+        position += burst + int(rng.uniform(0.7, 1.5) * sample_rate)
+    samples += rng.normal(0, 20, len(samples))
+    return np.clip(samples, -32768, 32767).astype(np.int16)
@@ -0,0 +1,490 @@
+"""
+Chunked transcription of long recordings.
+
+Long audio is decoded to 16 kHz mono PCM, split into overlapping windows (cut at the
+quietest point near each window boundary), transcribed in parallel and stitched back
+together with the repeated words in each overlap removed. Given a transcoder.Transcoder,
+decoding and the encoding of each request payload run in its process pool, and payloads
+use its compact codec instead of WAV; clients that set accepts_pcm are sent the decoded
+samples themselves.
+"""
+
+import asyncio
+import io
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import wave
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .scheduler import PRIORITY_LIVE
+from .vad import SpeechMap, VadResult, detect_speech
+
+SAMPLE_RATE = 16000
+DEFAULT_WINDOW_SECONDS = float(os.getenv("TRANSCRIPTION_CHUNK_SECONDS", "600"))
+DEFAULT_OVERLAP_SECONDS = float(os.getenv("TRANSCRIPTION_CHUNK_OVERLAP_SECONDS", "5"))
+DEFAULT_MAX_WORKERS = int(os.getenv("TRANSCRIPTION_CHUNK_WORKERS", "4"))
+# Recordings with less silence than this are sent untrimmed
+VAD_MIN_SKIP_SECONDS = float(os.getenv("VAD_MIN_SKIP_SECONDS", "1"))
+
+# Fraction of the window, measured back from its end, searched for a quiet split point
+SILENCE_SEARCH_FRACTION = 0.1
+SILENCE_FRAME_SECONDS = 0.03
+MAX_STITCH_WORDS = 40
+SEGMENT_GAP_SECONDS = 1.0  # A pause this long between timed words starts a new segment
+SENTENCE_END = re.compile(r"[.?!]$")
+FEED_CHUNK_SIZE = 1024 * 1024  # Bytes of an upload written to ffmpeg at a time
+
+
+class AudioDecodeError(Exception):
+    """Raised when audio cannot be decoded to PCM."""
+
+
+class PcmAudio:
+    """
+    Mono 16-bit PCM audio.
+
+    Attributes:
+        samples (np.ndarray): The int16 samples.
+        sample_rate (int): The sample rate in Hz.
+    """
+
+    def __init__(self, samples: np.ndarray, sample_rate: int = SAMPLE_RATE):
+        self.samples = samples
+        self.sample_rate = sample_rate
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / self.sample_rate
+
+
+def pcm_to_wav(samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """Wrap mono int16 samples in a WAV container."""
+    wav_data = io.BytesIO()
+    with wave.open(wav_data, 'wb') as wav_file:
+        wav_file.setnchannels(1)  # Mono
+        wav_file.setsampwidth(2)  # 16-bit
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(np.ascontiguousarray(samples, dtype='<i2').tobytes())
+    return wav_data.getvalue()
+
+
+def _decode_wav(audio_file) -> PcmAudio:
+    with wave.open(audio_file, 'rb') as wav_file:
+        if wav_file.getsampwidth() != 2:
+            raise AudioDecodeError("Only 16-bit WAV files can be decoded without ffmpeg")
+        channels = wav_file.getnchannels()
+        sample_rate = wav_file.getframerate()
+        samples = np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype='<i2')
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    return PcmAudio(samples, sample_rate)
+
+
+def _feed(audio_file, pipe):
+    try:
+        while chunk := audio_file.read(FEED_CHUNK_SIZE):
+            pipe.write(chunk)
+    except BrokenPipeError:
+        pass  # ffmpeg stopped reading; its exit status says why
+    finally:
+        try:
+            pipe.close()
+        except BrokenPipeError:
+            pass
+
+
+def _decode_ffmpeg(audio_file) -> PcmAudio:
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        raise AudioDecodeError("ffmpeg is required to decode this audio format")
+    # A file on disk is read by ffmpeg itself; anything else, such as a spooled upload, is
+    # streamed to its stdin a chunk at a time, so the upload is never held in memory whole
+    path = getattr(audio_file, "name", None)
+    source = path if isinstance(path, str) and os.path.isfile(path) else "pipe:0"
+    command = [
+        ffmpeg, "-nostdin", "-loglevel", "error", "-i", source,
+        "-vn", "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1",
+    ]
+    with tempfile.TemporaryFile() as errors:
+        process = subprocess.Popen(
+            command, stdin=subprocess.PIPE if source == "pipe:0" else subprocess.DEVNULL,
+            stdout=subprocess.PIPE, stderr=errors,
+        )
+        feeder = None
+        if source == "pipe:0":
+            feeder = threading.Thread(target=_feed, args=(audio_file, process.stdin), daemon=True)
+            feeder.start()
+        output = process.stdout.read()
+        process.stdout.close()
+        returncode = process.wait()
+        if feeder is not None:
+            feeder.join()
+        if returncode != 0:
+            errors.seek(0)
+            raise AudioDecodeError(f"ffmpeg failed: {errors.read().decode(errors='replace').strip()}")
+    return PcmAudio(np.frombuffer(output, dtype='<i2'), SAMPLE_RATE)
+
+
+def decode_audio(audio_file, filename: str) -> PcmAudio:
+    """
+    Decode an audio file to mono 16-bit PCM.
+
+    WAV files are read directly; every other format goes through ffmpeg.
+
+    Args:
+        audio_file: A readable, seekable binary file object.
+        filename (str): The original file name, used to detect the format.
+
+    Returns:
+        PcmAudio: The decoded audio.
+
+    Raises:
+        AudioDecodeError: If the audio cannot be decoded.
+    """
+    audio_file.seek(0)
+    try:
+        if filename.lower().endswith('.wav'):
+            try:
+                return _decode_wav(audio_file)
+            except wave.Error as e:
+                raise AudioDecodeError(str(e))
+        return _decode_ffmpeg(audio_file)
+    finally:
+        audio_file.seek(0)
+
+
+async def _encode_upload(client: Any, audio: PcmAudio, start: int, end: int, name: str, transcoder: Any = None) -> Any:
+    """The payload sent for audio.samples[start:end]: the PCM for clients that accept it, otherwise a (filename, bytes) file."""
+    if getattr(client, "accepts_pcm", False):
+        return PcmAudio(audio.samples[start:end], audio.sample_rate)
+    if transcoder is not None:
+        payload, extension = await transcoder.encode(audio.samples[start:end], audio.sample_rate)
+        return (f"{name}.{extension}", payload)
+    return (f"{name}.wav", await asyncio.to_thread(pcm_to_wav, audio.samples[start:end], audio.sample_rate))
+
+
+def detect_wav_speech(data: bytes) -> Optional[VadResult]:
+    """
+    Run voice activity detection on a WAV payload.
+
+    Returns:
+        Optional[VadResult]: The speech regions, or None if data is not a decodable WAV file.
+    """
+    try:
+        audio = _decode_wav(io.BytesIO(data))
+    except (wave.Error, EOFError, AudioDecodeError):
+        return None
+    return detect_speech(audio.samples, audio.sample_rate)
+
+
+def _quietest_sample(samples: np.ndarray, start: int, end: int, frame: int) -> int:
+    """Return the start of the lowest-energy frame in samples[start:end]."""
+    region = samples[start:end].astype(np.float32)
+    frames = len(region) // frame
+    if frames < 2:
+        return end
+    energy = np.square(region[:frames * frame].reshape(frames, frame)).mean(axis=1)
+    return start + int(np.argmin(energy)) * frame
+
+
+def plan_chunks(
+    audio: PcmAudio,
+    window_seconds: float = DEFAULT_WINDOW_SECONDS,
+    overlap_seconds: float = DEFAULT_OVERLAP_SECONDS,
+    split_on_silence: bool = True,
+) -> List[Tuple[int, int]]:
+    """
+    Split audio into overlapping windows.
+
+    Args:
+        audio (PcmAudio): The audio to split.
+        window_seconds (float): The maximum length of a window.
+        overlap_seconds (float): How much consecutive windows overlap.
+        split_on_silence (bool): Move each cut to the quietest frame near the end of its window.
+
+    Returns:
+        List[Tuple[int, int]]: (start, end) sample offsets of each window.
+    """
+    if overlap_seconds >= window_seconds:
+        raise ValueError("overlap_seconds must be smaller than window_seconds")
+
+    total = len(audio.samples)
+    window = int(window_seconds * audio.sample_rate)
+    overlap = int(overlap_seconds * audio.sample_rate)
+    frame = max(1, int(SILENCE_FRAME_SECONDS * audio.sample_rate))
+    search = int(window * SILENCE_SEARCH_FRACTION)
+
+    chunks = []
+    start = 0
+    while start < total:
+        end = min(start + window, total)
+        if end < total and split_on_silence and search > overlap:
+            end = _quietest_sample(audio.samples, end - search, end, frame)
+        chunks.append((start, end))
+        if end >= total:
+            break
+        start = max(end - overlap, start + 1)
+    return chunks
+
+
+def _normalize_word(word: str) -> str:
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def stitch_texts(previous: str, current: str, max_words: int = MAX_STITCH_WORDS) -> str:
+    """
+    Remove from current the words that repeat the end of previous.
+
+    Overlapping windows transcribe the same audio twice, so the head of each chunk
+    usually repeats the tail of the one before it. The longest run of matching words
+    between the two edges is located and everything in current up to its end is dropped.
+
+    Args:
+        previous (str): The text of the preceding chunk.
+        current (str): The text of the following chunk.
+        max_words (int): How many words at each edge are compared.
+
+    Returns:
+        str: current without the duplicated prefix.
+    """
+    previous_words = previous.split()[-max_words:]
+    current_words = current.split()
+    head = current_words[:max_words]
+    if not previous_words or not head:
+        return current.strip()
+
+    matcher = SequenceMatcher(
+        None,
+        [_normalize_word(w) for w in previous_words],
+        [_normalize_word(w) for w in head],
+        autojunk=False,
+    )
+    match = matcher.find_longest_match(0, len(previous_words), 0, len(head))
+    if match.size < 2:
+        return current.strip()
+    return " ".join(current_words[match.b + match.size:])
+
+
+def words_to_segments(words: List[Dict[str, Any]], max_gap: float = SEGMENT_GAP_SECONDS) -> List[Dict[str, Any]]:
+    """Group timed words into segments at sentence ends and pauses."""
+    segments = []
+    current = []
+    for word in words:
+        if current and word["start"] - current[-1]["end"] >= max_gap:
+            segments.append(current)
+            current = []
+        current.append(word)
+        if SENTENCE_END.search(word["word"]):
+            segments.append(current)
+            current = []
+    if current:
+        segments.append(current)
+    return [
+        {
+            "id": i,
+            "start": group[0]["start"],
+            "end": group[-1]["end"],
+            "text": " ".join(word["word"] for word in group),
+            "words": group,
+        }
+        for i, group in enumerate(segments)
+    ]
+
+
+async def _transcribe_timestamped_chunks(
+    client: Any,
+    audio: PcmAudio,
+    chunks: List[Tuple[int, int]],
+    language: Optional[str],
+    max_workers: int,
+    speech_map: Optional[SpeechMap],
+    transcoder: Any,
+    priority: int,
+    max_retries: Optional[int],
+) -> Tuple[str, List[Dict[str, Any]]]:
+    semaphore = asyncio.Semaphore(max_workers)
+
+    async def transcribe(index: int, start: int, end: int) -> Dict[str, Any]:
+        async with semaphore:
+            upload = await _encode_upload(client, audio, start, end, f"chunk_{index}", transcoder)
+            return await client.transcribe_timestamped(upload, language=language, priority=priority, max_retries=max_retries)
+
+    results = await asyncio.gather(*(transcribe(i, start, end) for i, (start, end) in enumerate(chunks)))
+
+    rate = audio.sample_rate
+    words = []
+    for (chunk_start, _), result in zip(chunks, results):
+        for word in result["words"]:
+            start = chunk_start + int(word["start"] * rate)
+            end = max(chunk_start + int(word["end"] * rate), start + 1)
+            if speech_map is not None:
+                start, end = speech_map.to_original(start), speech_map.to_original(end - 1) + 1
+            # Words in the overlap were already taken from the previous chunk
+            if words and start / rate < words[-1]["end"]:
+                continue
+            words.append({"word": word["word"], "start": round(start / rate, 3), "end": round(end / rate, 3)})
+
+    segments = words_to_segments(words)
+    return " ".join(segment["text"] for segment in segments), segments
+
+
+async def transcribe_chunks(
+    client: Any,
+    audio: PcmAudio,
+    chunks: List[Tuple[int, int]],
+    language: Optional[str] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    speech_map: Optional[SpeechMap] = None,
+    transcoder: Any = None,
+    priority: int = PRIORITY_LIVE,
+    max_retries: Optional[int] = None,
+) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Transcribe windows of audio in parallel and stitch the results.
+
+    Args:
+        client: A client exposing an async transcribe_audio(audio_file, language=..., priority=...) method.
+        audio (PcmAudio): The decoded audio.
+        chunks (List[Tuple[int, int]]): Sample offsets from plan_chunks.
+        language (Optional[str]): The spoken language.
+        max_workers (int): The maximum number of chunks transcribed at once.
+        speech_map (Optional[SpeechMap]): Maps offsets back to the original recording when audio holds only its speech regions.
+        transcoder (Optional[Transcoder]): Encodes each chunk with a compact codec; chunks are sent as WAV without one.
+        priority (int): Upstream scheduling priority of the requests, scheduler.PRIORITY_LIVE or PRIORITY_BATCH.
+        max_retries (Optional[int]): Retries of rate-limited requests, when the caller retries them itself instead.
+
+    Returns:
+        Tuple[str, List[Dict[str, Any]]]: The stitched text and one segment per chunk with start and end offsets
+            in seconds. Clients with word timestamps produce segments per sentence, each with its "words".
+    """
+    if getattr(client, "supports_timestamps", False):
+        return await _transcribe_timestamped_chunks(client, audio, chunks, language, max_workers, speech_map, transcoder, priority, max_retries)
+
+    semaphore = asyncio.Semaphore(max_workers)
+
+    async def transcribe(index: int, start: int, end: int) -> str:
+        async with semaphore:
+            upload = await _encode_upload(client, audio, start, end, f"chunk_{index}", transcoder)
+            return await client.transcribe_audio(upload, language=language, priority=priority, max_retries=max_retries)
+
+    texts = await asyncio.gather(*(transcribe(i, start, end) for i, (start, end) in enumerate(chunks)))
+
+    segments = []
+    previous_text = ""
+    previous_end = 0.0
+    for i, ((start, end), text) in enumerate(zip(chunks, texts)):
+        if speech_map is not None:
+            start, end = speech_map.to_original(start), speech_map.to_original(end - 1) + 1
+        text = stitch_texts(previous_text, text or "") if previous_text else (text or "").strip()
+        start_seconds = max(start / audio.sample_rate, previous_end)
+        end_seconds = end / audio.sample_rate
+        if text:
+            segments.append({"id": len(segments), "start": round(start_seconds, 3), "end": round(end_seconds, 3), "text": text})
+            previous_text = text
+        previous_end = end_seconds
+
+    return " ".join(segment["text"] for segment in segments), segments
+
+
+async def _single_upload(client: Any, audio: Any, pcm: PcmAudio, max_request_size: int, transcoder: Any) -> Any:
+    """What to send for a recording that fits in one window, or None if it has to be chunked to fit in a request."""
+    if transcoder is None and not getattr(client, "accepts_pcm", False):
+        return audio.as_upload() if audio.size <= max_request_size else None
+    upload = await _encode_upload(client, pcm, 0, len(pcm.samples), "audio", transcoder)
+    if isinstance(upload, PcmAudio):
+        return upload
+    if audio.size <= len(upload[1]):
+        # The upload is already at least as compact, e.g. a low-bitrate MP3
+        return audio.as_upload() if audio.size <= max_request_size else None
+    return upload if len(upload[1]) <= max_request_size else None
+
+
+async def transcribe_recording(
+    client: Any,
+    audio: Any,
+    max_request_size: int,
+    language: Optional[str] = None,
+    window_seconds: float = DEFAULT_WINDOW_SECONDS,
+    overlap_seconds: float = DEFAULT_OVERLAP_SECONDS,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    transcoder: Any = None,
+    priority: int = PRIORITY_LIVE,
+    max_retries: Optional[int] = None,
+) -> Tuple[str, List[Dict[str, Any]], float]:
+    """
+    Transcribe an uploaded recording of any length.
+
+    Decodable recordings are passed through voice activity detection first: silent
+    recordings make no request at all and long silences are cut out before chunking.
+    Recordings that fit in a single window and a single request and have nothing worth
+    trimming are sent in one request, re-encoded by the transcoder when that makes them
+    smaller and as uploaded otherwise; the rest are chunked and transcribed in parallel.
+
+    Args:
+        client: A client exposing an async transcribe_audio(audio_file, language=..., priority=...) method.
+        audio (IngestedAudio): The buffered upload.
+        max_request_size (int): The largest payload the transcription API accepts.
+        language (Optional[str]): The spoken language.
+        window_seconds (float): The maximum length of a chunk.
+        overlap_seconds (float): How much consecutive chunks overlap.
+        max_workers (int): The maximum number of chunks transcribed at once.
+        transcoder (Optional[Transcoder]): Decodes the recording and encodes request payloads in its process pool.
+        priority (int): Upstream scheduling priority of the requests, scheduler.PRIORITY_LIVE or PRIORITY_BATCH.
+        max_retries (Optional[int]): Retries of rate-limited requests, when the caller retries them itself instead.
+
+    Returns:
+        Tuple[str, List[Dict[str, Any]], float]: The transcription, its timestamped segments and the seconds of silence skipped.
+
+    Raises:
+        AudioDecodeError: If the recording is too large for one request and cannot be decoded for chunking.
+    """
+    try:
+        if transcoder is not None:
+            pcm = await transcoder.decode(audio.buffer, audio.filename)
+        else:
+            pcm = await asyncio.to_thread(decode_audio, audio.buffer, audio.filename)
+    except AudioDecodeError:
+        if audio.size > max_request_size:
+            raise
+        # Not decodable locally, but small enough to send as-is
+        if getattr(client, "supports_timestamps", False):
+            result = await client.transcribe_timestamped(audio.as_upload(), language=language, priority=priority, max_retries=max_retries)
+            return result["text"], result["segments"], 0.0
+        text = await client.transcribe_audio(audio.as_upload(), language=language, priority=priority, max_retries=max_retries)
+        return text, [], 0.0
+
+    vad = await asyncio.to_thread(detect_speech, pcm.samples, pcm.sample_rate)
+    if not vad.has_speech:
+        return "", [], vad.skipped_seconds
+
+    speech_map = None
+    skipped_seconds = 0.0
+    if vad.skipped_seconds >= VAD_MIN_SKIP_SECONDS:
+        samples, speech_map = vad.compact(pcm.samples)
+        pcm = PcmAudio(samples, pcm.sample_rate)
+        skipped_seconds = vad.skipped_seconds
+
+    chunks = plan_chunks(pcm, window_seconds, overlap_seconds)
+    upload = None
+    if speech_map is None and len(chunks) == 1:
+        upload = await _single_upload(client, audio, pcm, max_request_size, transcoder)
+    if upload is not None:
+        if getattr(client, "supports_timestamps", False):
+            result = await client.transcribe_timestamped(upload, language=language, priority=priority, max_retries=max_retries)
+            return result["text"], result["segments"], skipped_seconds
+        text = await client.transcribe_audio(upload, language=language, priority=priority, max_retries=max_retries)
+        segments = [{"id": 0, "start": 0.0, "end": round(pcm.duration, 3), "text": text.strip()}] if text.strip() else []
+        return text, segments, skipped_seconds
+
+    text, segments = await transcribe_chunks(
+        client, pcm, chunks, language=language, max_workers=max_workers, speech_map=speech_map, transcoder=transcoder,
+        priority=priority, max_retries=max_retries,
+    )
+    return text, segments, skipped_seconds
@@ -0,0 +1,108 @@
+"""
+Streaming ingestion of uploaded audio files.
+
+Uploads are read in fixed-size chunks into a spooled buffer that stays in memory
+up to a threshold, so the transcription client receives the audio without a
+round-trip through the working directory.
+"""
+
+import os
+import tempfile
+from typing import Optional, Tuple, IO
+from fastapi import UploadFile
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024  # 1 MB
+DEFAULT_SPOOL_MAX_MEMORY = int(os.getenv("UPLOAD_SPOOL_MAX_MEMORY", str(8 * 1024 * 1024)))
+ALLOWED_EXTENSIONS = {'mp3', 'wav', 'ogg', 'flac', 'm4a', 'mp4', 'mpeg', 'mpga', 'webm'}
+
+
+def allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+
+class UploadTooLargeError(ValueError):
+    """Raised as soon as an upload is known to exceed the size limit."""
+
+    def __init__(self, size: int, max_size: int):
+        super().__init__(f"Upload of at least {size} bytes exceeds the limit of {max_size} bytes")
+        self.size = size
+        self.max_size = max_size
+
+
+class IngestedAudio:
+    """
+    An uploaded audio file held in a spooled buffer.
+
+    Attributes:
+        filename (str): The sanitized name of the uploaded file.
+        buffer (IO[bytes]): The spooled buffer, rewound to the start.
+        size (int): The number of bytes read.
+    """
+
+    def __init__(self, filename: str, buffer: IO[bytes], size: int):
+        self.filename = filename
+        self.buffer = buffer
+        self.size = size
+
+    def as_upload(self) -> Tuple[str, IO[bytes]]:
+        """Return a (filename, file) tuple accepted by the transcription clients."""
+        self.buffer.seek(0)
+        return (self.filename, self.buffer)
+
+    def read(self) -> bytes:
+        self.buffer.seek(0)
+        return self.buffer.read()
+
+    def close(self):
+        self.buffer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+async def spool_upload(
+    file: UploadFile,
+    max_size: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_memory: Optional[int] = None,
+) -> IngestedAudio:
+    """
+    Stream an UploadFile into a spooled buffer, enforcing the size limit while reading.
+
+    Args:
+        file (UploadFile): The uploaded file.
+        max_size (int): The maximum accepted size in bytes.
+        chunk_size (int): The number of bytes read per chunk.
+        max_memory (Optional[int]): Bytes kept in memory before the buffer rolls over to disk.
+
+    Returns:
+        IngestedAudio: The buffered upload.
+
+    Raises:
+        UploadTooLargeError: If the upload exceeds max_size. Raised before reading when the size is known up front.
+    """
+    declared_size = getattr(file, "size", None)
+    if declared_size is not None and declared_size > max_size:
+        raise UploadTooLargeError(declared_size, max_size)
+
+    buffer = tempfile.SpooledTemporaryFile(max_size=max_memory or DEFAULT_SPOOL_MAX_MEMORY)
+    size = 0
+    try:
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_size:
+                raise UploadTooLargeError(size, max_size)
+            buffer.write(chunk)
+    except BaseException:
+        buffer.close()
+        raise
+
+    buffer.seek(0)
+    filename = os.path.basename(file.filename or "audio")
+    return IngestedAudio(filename, buffer, size)
@@ -0,0 +1,301 @@
+"""
+Bulk transcription of archived recordings.
+
+BatchRunner fans files out over a thread pool of GroqClient calls. Concurrency adapts to
+the upstream quota: it grows by one after as many consecutive successes as there are
+requests in flight, and halves on a 429, when every worker also waits out Retry-After.
+Recordings over the 25 MB request limit are decoded and transcribed in chunks by
+audio_chunker, each chunk request going through the same limiter. Each result is appended
+to a JSONL file as soon as it is known, which doubles as the checkpoint: files already
+recorded as succeeded are skipped when the batch is run again.
+
+Usage:
+    python -m src.batch RECORDINGS_DIR --output results.jsonl [--report-type "General Occurrence"]
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .audio_chunker import transcribe_recording
+from .audio_ingest import IngestedAudio, allowed_file
+from .scheduler import PRIORITY_BATCH, retry_after_seconds
+
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "16"))
+DEFAULT_INITIAL_CONCURRENCY = int(os.getenv("BATCH_INITIAL_CONCURRENCY", "4"))
+DEFAULT_MAX_ATTEMPTS = int(os.getenv("BATCH_MAX_ATTEMPTS", "5"))
+MAX_REQUEST_SIZE = 25 * 1024 * 1024  # Groq's per-request limit
+
+
+class AdaptiveLimiter:
+    """
+    Additive-increase, multiplicative-decrease bound on concurrent requests.
+
+    Args:
+        initial (int): Requests allowed in flight at first.
+        maximum (int): Upper bound on the limit.
+        minimum (int): Lower bound on the limit.
+    """
+
+    def __init__(self, initial: int, maximum: int, minimum: int = 1):
+        self.minimum = minimum
+        self.maximum = max(maximum, minimum)
+        self.limit = min(max(initial, minimum), self.maximum)
+        self.in_flight = 0
+        self.resume_at = 0.0
+        self.rate_limited = 0
+        self._successes = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """Block until a request may start."""
+        with self._condition:
+            while True:
+                wait = self.resume_at - time.monotonic()
+                if wait > 0:
+                    self._condition.wait(wait)
+                elif self.in_flight < self.limit:
+                    self.in_flight += 1
+                    return
+                else:
+                    self._condition.wait()
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self):
+        with self._condition:
+            self._successes += 1
+            if self._successes >= self.limit and self.limit < self.maximum:
+                self.limit += 1
+                self._successes = 0
+                self._condition.notify_all()
+
+    def on_rate_limited(self, retry_after: float):
+        with self._condition:
+            now = time.monotonic()
+            # Requests already in flight when the quota ran out fail together; back off once
+            if now >= self.resume_at:
+                self.limit = max(self.minimum, self.limit // 2)
+            self._successes = 0
+            self.rate_limited += 1
+            self.resume_at = max(self.resume_at, now + retry_after)
+
+
+class BatchRunner:
+    """
+    Transcribes many recordings, and optionally writes a report for each, into a JSONL file.
+
+    Args:
+        client: A GroqClient, or anything with the same transcribe_audio(audio_file, language, priority, max_retries) method.
+        output_path (str): The JSONL file results are appended to.
+        report_type (Optional[str]): Also generate a report of this type from each transcription.
+        language (str): The language of the recordings.
+        max_concurrency (int): Upper bound on concurrent transcription requests.
+        initial_concurrency (int): Concurrent requests before any feedback from the API.
+        max_attempts (int): Attempts per request before a rate-limited file is recorded as failed.
+        report_generator (Optional[Callable[[str, str], str]]): Defaults to llm_prompts.generate_report.
+        transcoder (Optional[Transcoder]): Decodes and re-encodes recordings too large for one request.
+
+    Raises:
+        ValueError: If max_attempts is less than 1.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        output_path: str,
+        report_type: Optional[str] = None,
+        language: str = "en",
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        initial_concurrency: int = DEFAULT_INITIAL_CONCURRENCY,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        report_generator: Optional[Callable[[str, str], str]] = None,
+        transcoder: Any = None,
+    ):
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        self.client = client
+        self.output_path = output_path
+        self.report_type = report_type
+        self.language = language
+        self.max_concurrency = max_concurrency
+        self.max_attempts = max_attempts
+        self.limiter = AdaptiveLimiter(initial_concurrency, max_concurrency)
+        if report_type and report_generator is None:
+            from .llm_prompts import generate_report
+            report_generator = functools.partial(generate_report, priority=PRIORITY_BATCH)
+        self.report_generator = report_generator
+        self.transcoder = transcoder
+        self._write_lock = threading.Lock()
+
+    def completed_ids(self) -> Set[str]:
+        """Return the ids already recorded as succeeded in the output file."""
+        completed = set()
+        if not os.path.exists(self.output_path):
+            return completed
+        with open(self.output_path, encoding="utf-8") as output:
+            for line in output:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # A line cut short by an interrupted run
+                if record.get("status") == "succeeded":
+                    completed.add(record["id"])
+        return completed
+
+    def run(self, items: Iterable[Tuple[str, str]], progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Process every (id, path) pair not already completed.
+
+        Args:
+            items (Iterable[Tuple[str, str]]): A stable id and the file path of each recording.
+            progress (Optional[Callable]): Called with each record as it is written.
+
+        Returns:
+            Dict[str, Any]: Counts of skipped, succeeded and failed files, 429 responses and elapsed seconds.
+        """
+        started = time.monotonic()
+        completed = self.completed_ids()
+        pending = [(item_id, path) for item_id, path in items if item_id not in completed]
+        summary = {"skipped": len(completed), "succeeded": 0, "failed": 0}
+        directory = os.path.dirname(self.output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(self.output_path, "a", encoding="utf-8") as output, \
+                ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            futures = [executor.submit(self._process, item_id, path) for item_id, path in pending]
+            for future in as_completed(futures):
+                record = future.result()
+                with self._write_lock:
+                    output.write(json.dumps(record) + "\n")
+                    output.flush()
+                summary[record["status"]] += 1
+                if progress:
+                    progress(record)
+
+        summary["rate_limited"] = self.limiter.rate_limited
+        summary["seconds"] = round(time.monotonic() - started, 3)
+        return summary
+
+    def _request(self, audio_file: Tuple[str, Any]) -> Tuple[str, int]:
+        """Send one transcription request within the limiter, retrying it after 429s; return the text and attempts."""
+        file = audio_file[1]
+        position = file.tell() if hasattr(file, "seek") else None
+        for attempt in range(1, self.max_attempts + 1):
+            self.limiter.acquire()
+            try:
+                if position is not None:
+                    file.seek(position)
+                text = self.client.transcribe_audio(
+                    audio_file, language=self.language, priority=PRIORITY_BATCH,
+                    max_retries=0,  # Retried here, so the limiter sees every 429
+                )
+            except Exception as e:
+                retry_after = retry_after_seconds(e)
+                if retry_after is None or attempt == self.max_attempts:
+                    raise
+                self.limiter.on_rate_limited(retry_after)
+                continue
+            finally:
+                self.limiter.release()
+            self.limiter.on_success()
+            return text, attempt
+
+    def _transcribe(self, path: str) -> Tuple[str, int]:
+        size = os.path.getsize(path)
+        with open(path, "rb") as audio_file:
+            if size <= MAX_REQUEST_SIZE:
+                return self._request((os.path.basename(path), audio_file))
+            # Too large for one request: chunked, with every chunk request going through _request
+            chunk_client = _ChunkClient(self)
+            text, _, _ = asyncio.run(transcribe_recording(
+                chunk_client, IngestedAudio(os.path.basename(path), audio_file, size), max_request_size=MAX_REQUEST_SIZE,
+                language=self.language, transcoder=self.transcoder, priority=PRIORITY_BATCH, max_retries=0,
+            ))
+            return text, chunk_client.attempts
+
+    def _process(self, item_id: str, path: str) -> Dict[str, Any]:
+        started = time.monotonic()
+        record = {"id": item_id, "path": path}
+        try:
+            record["text"], record["attempts"] = self._transcribe(path)
+            if self.report_type:
+                record["report"] = self.report_generator(record["text"], self.report_type)
+            record["status"] = "succeeded"
+        except Exception as e:
+            record["status"] = "failed"
+            record["error"] = str(e) or type(e).__name__
+        record["seconds"] = round(time.monotonic() - started, 3)
+        return record
+
+
+class _ChunkClient:
+    # The async client audio_chunker expects, sending each chunk through the runner's limiter from a worker thread
+
+    def __init__(self, runner: BatchRunner):
+        self.runner = runner
+        self.attempts = 0  # The most attempts any chunk needed
+
+    async def transcribe_audio(self, audio_file, language=None, priority=PRIORITY_BATCH, max_retries=0) -> str:
+        text, attempts = await asyncio.to_thread(self.runner._request, audio_file)
+        self.attempts = max(self.attempts, attempts)
+        return text
+
+
+def find_recordings(directory: str) -> List[Tuple[str, str]]:
+    """Return (id, path) for every supported audio file under directory, keyed by relative path."""
+    recordings = []
+    for root, _, filenames in os.walk(directory):
+        for filename in filenames:
+            if allowed_file(filename):
+                path = os.path.join(root, filename)
+                recordings.append((os.path.relpath(path, directory), path))
+    return sorted(recordings)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Transcribe every recording in a directory into a JSONL file.")
+    parser.add_argument("directory", help="Directory searched recursively for audio files")
+    parser.add_argument("--output", default="results.jsonl", help="JSONL file results are appended to; also the resume checkpoint")
+    parser.add_argument("--report-type", choices=["General Occurrence", "Crown Brief"], help="Also generate a report of this type")
+    parser.add_argument("--language", default="en")
+    parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY)
+    parser.add_argument("--initial-concurrency", type=int, default=DEFAULT_INITIAL_CONCURRENCY)
+    args = parser.parse_args(argv)
+
+    from .groq_client import GroqClient
+    from .transcoder import get_transcoder
+    from .transcription_cache import TranscriptionCache
+
+    runner = BatchRunner(
+        GroqClient(cache=TranscriptionCache.from_env()),
+        args.output,
+        report_type=args.report_type,
+        language=args.language,
+        max_concurrency=args.max_concurrency,
+        initial_concurrency=args.initial_concurrency,
+        transcoder=get_transcoder(),
+    )
+    recordings = find_recordings(args.directory)
+
+    def progress(record):
+        print(f"{record['status']}: {record['id']} ({record['seconds']}s, concurrency {runner.limiter.limit})")
+
+    summary = runner.run(recordings, progress=progress)
+    print(json.dumps(summary))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,12 @@
 import json
+import queue
 import re
-from typing import List, Dict, Callable, Any, Union
+import threading
+import time
+from typing import List, Dict, Callable, Any, Iterable, Iterator, Optional, Tuple, Union
 from pydantic import BaseModel
 import concurrent.futures
+import functools
 
 
 class FusionChainResult(BaseModel):
@@ -11,6 +15,8 @@ class FusionChainResult(BaseModel):
     all_context_filled_prompts: List[List[str]]
     performance_scores: List[float]
     llm_identifiers: List[str]
+    errors: List[Optional[str]] = []
+    served_tier: Optional[int] = None  # In a cascade, the index of the model whose response was returned
 
 
 class FusionChain:
@@ -44,6 +50,7 @@ class FusionChain:
         Returns:
             FusionChainResult: A FusionChainResult object containing the top response, all outputs, all context-filled prompts, performance scores, and model names.
         """
+        prompts = _compile_prompts(prompts)
         all_outputs = []
         all_context_filled_prompts = []
 
@@ -96,6 +103,7 @@ class FusionChain:
         Returns:
             FusionChainResult: A FusionChainResult object containing the top response, all outputs, all context-filled prompts, performance scores, and model names.
         """
+        prompts = _compile_prompts(prompts)
 
         def process_model(model):
             outputs, context_filled_prompts = MinimalChainable.run(
@@ -107,10 +115,9 @@ class FusionChain:
         all_context_filled_prompts = []
 
         with concurrent.futures.ThreadPoolExecutor(max_workers=num_workers) as executor:
-            future_to_model = {
-                executor.submit(process_model, model): model for model in models
-            }
-            for future in concurrent.futures.as_completed(future_to_model):
+            # Collect in submission order so outputs line up with the model names
+            futures = [executor.submit(process_model, model) for model in models]
+            for future in futures:
                 outputs, context_filled_prompts = future.result()
                 all_outputs.append(outputs)
                 all_context_filled_prompts.append(context_filled_prompts)
@@ -129,6 +136,332 @@ class FusionChain:
             llm_identifiers=model_names,
         )
 
+    @staticmethod
+    def run_concurrent(
+        context: Dict[str, Any],
+        models: List[Any],
+        callable: Callable,
+        prompts: List[str],
+        evaluator: Callable[[List[str]], List[float]],
+        get_model_name: Callable[[Any], str],
+        num_workers: Optional[int] = None,
+        timeout: Optional[float] = None,
+        quorum: Optional[int] = None,
+        score_threshold: Optional[float] = None,
+        stream_callable: Optional[Callable[[Any, str], Iterable[str]]] = None,
+        on_token: Optional[Callable[[int, str], None]] = None,
+    ) -> FusionChainResult:
+        """
+        Run a competition between models concurrently, with deadlines and optional early return.
+
+        Every model runs its chain in its own worker. Results always line up with the order of
+        models: a model that fails, misses its deadline or is abandoned by an early return gets
+        empty outputs, a score of 0.0 and an entry in errors. Only models that finished are
+        passed to the evaluator.
+
+        Args:
+            context (Dict[str, Any]): The context for the prompts.
+            models (List[Any]): List of models to compete.
+            callable (Callable): The function to call for each prompt.
+            prompts (List[str]): List of prompts to process.
+            evaluator (Callable[[List[str]], Tuple[Any, List[float]]]): Function to evaluate model outputs, returning the top response and the scores.
+            get_model_name (Callable[[Any], str]): Function to get the name of a model.
+            num_workers (Optional[int]): Number of parallel workers. Defaults to one per model.
+            timeout (Optional[float]): Seconds each model has to finish its chain, measured from submission.
+            quorum (Optional[int]): Return as soon as this many models have finished (and the threshold, if any, is met).
+            score_threshold (Optional[float]): With a quorum, only return early once the best score reaches this value.
+            stream_callable (Optional[Callable[[Any, str], Iterable[str]]]): Streams the last prompt of each chain, see MinimalChainable.run.
+            on_token (Optional[Callable[[int, str], None]]): Receives the model index and each streamed chunk.
+
+        Returns:
+            FusionChainResult: A FusionChainResult object containing the top response, all outputs, all context-filled prompts, performance scores, model names and per-model errors.
+
+        Raises:
+            RuntimeError: If no model finished its chain.
+        """
+        model_names = [get_model_name(model) for model in models]
+        all_outputs: List[List[Any]] = [[] for _ in models]
+        all_context_filled_prompts: List[List[str]] = [[] for _ in models]
+        errors: List[Optional[str]] = [None] * len(models)
+        finished: List[int] = []
+
+        def evaluate():
+            indices = sorted(finished)
+            top_response, scores = evaluator([all_outputs[i][-1] for i in indices])
+            return top_response, dict(zip(indices, scores))
+
+        prompts = _compile_prompts(prompts)
+
+        def process_model(index: int, model: Any):
+            model_on_token = None
+            if on_token is not None:
+                model_on_token = lambda chunk: on_token(index, chunk)
+            return MinimalChainable.run(context, model, callable, prompts, stream_callable, model_on_token)
+
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=num_workers or len(models) or 1)
+        try:
+            future_to_index = {
+                executor.submit(process_model, i, model): i
+                for i, model in enumerate(models)
+            }
+            deadline = time.monotonic() + timeout if timeout is not None else None
+            pending = set(future_to_index)
+            evaluation = None
+            timed_out = False
+
+            while pending:
+                remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+                done, pending = concurrent.futures.wait(
+                    pending, timeout=remaining, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                if not done:
+                    timed_out = True
+                    break
+
+                for future in done:
+                    index = future_to_index[future]
+                    try:
+                        all_outputs[index], all_context_filled_prompts[index] = future.result()
+                        finished.append(index)
+                    except Exception as e:
+                        errors[index] = f"{type(e).__name__}: {e}"
+
+                if quorum is not None and pending and len(finished) >= quorum:
+                    evaluation = evaluate()
+                    if score_threshold is None or max(evaluation[1].values()) >= score_threshold:
+                        break
+                evaluation = None
+
+            for future in pending:
+                future.cancel()
+                errors[future_to_index[future]] = "Timed out" if timed_out else "Abandoned after early return"
+        finally:
+            # Do not wait for abandoned models; their threads finish in the background
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if not finished:
+            raise RuntimeError(f"No model produced a response: {'; '.join(e for e in errors if e)}")
+
+        top_response, scores_by_index = evaluation or evaluate()
+        return FusionChainResult(
+            top_response=top_response,
+            all_prompt_responses=all_outputs,
+            all_context_filled_prompts=all_context_filled_prompts,
+            performance_scores=[scores_by_index.get(i, 0.0) for i in range(len(models))],
+            llm_identifiers=model_names,
+            errors=errors,
+        )
+
+    @staticmethod
+    def run_cascade(
+        context: Dict[str, Any],
+        models: List[Any],
+        callable: Callable,
+        prompts: List[str],
+        evaluator: Callable[[List[str]], List[float]],
+        get_model_name: Callable[[Any], str],
+        score_threshold: float,
+        timeouts: Optional[List[Optional[float]]] = None,
+        on_model_done: Optional[Callable[[int, float, Optional[str]], None]] = None,
+    ) -> FusionChainResult:
+        """
+        Run models one at a time, escalating to the next only while the answers score below a threshold.
+
+        Models are tried in list order, so the cheapest or fastest should come first. Each
+        model's last output is scored on its own; the first to reach score_threshold is returned
+        and the remaining models are never called. A model that fails or misses its deadline is
+        skipped. If no model reaches the threshold, the outputs of every model that finished are
+        evaluated together and the best is returned. Results line up with the order of models:
+        models that were not called get empty outputs, a score of 0.0 and no error.
+
+        Args:
+            context (Dict[str, Any]): The context for the prompts.
+            models (List[Any]): The models, in the order to try them.
+            callable (Callable): The function to call for each prompt.
+            prompts (List[str]): List of prompts to process.
+            evaluator (Callable[[List[str]], Tuple[Any, List[float]]]): Function to evaluate model outputs, returning the top response and the scores.
+            get_model_name (Callable[[Any], str]): Function to get the name of a model.
+            score_threshold (float): Score at which an answer is accepted without trying further models.
+            timeouts (Optional[List[Optional[float]]]): Seconds each model has to finish its chain; None for no deadline.
+            on_model_done (Optional[Callable[[int, float, Optional[str]], None]]): Receives the model index,
+                the seconds it took and its error, if any, once each model has finished, failed or timed out.
+
+        Returns:
+            FusionChainResult: A FusionChainResult object containing the top response, all outputs, all context-filled prompts, performance scores, model names, per-model errors and the index of the model that served the response.
+
+        Raises:
+            RuntimeError: If no model finished its chain.
+        """
+        model_names = [get_model_name(model) for model in models]
+        all_outputs: List[List[Any]] = [[] for _ in models]
+        all_context_filled_prompts: List[List[str]] = [[] for _ in models]
+        errors: List[Optional[str]] = [None] * len(models)
+        scores = [0.0] * len(models)
+        finished: List[int] = []
+        top_response = served = None
+        prompts = _compile_prompts(prompts)
+
+        # Each model runs in its own worker so a missed deadline does not hold up the next one
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=len(models) or 1)
+        try:
+            for index, model in enumerate(models):
+                started = time.monotonic()
+                future = executor.submit(MinimalChainable.run, context, model, callable, prompts)
+                try:
+                    all_outputs[index], all_context_filled_prompts[index] = future.result(
+                        timeout=timeouts[index] if timeouts else None
+                    )
+                except concurrent.futures.TimeoutError:
+                    future.cancel()
+                    errors[index] = "Timed out"
+                except Exception as e:
+                    errors[index] = f"{type(e).__name__}: {e}"
+                if on_model_done is not None:
+                    on_model_done(index, time.monotonic() - started, errors[index])
+                if errors[index] is not None:
+                    continue
+
+                finished.append(index)
+                response, (scores[index],) = evaluator([all_outputs[index][-1]])
+                if scores[index] >= score_threshold:
+                    top_response, served = response, index
+                    break
+        finally:
+            # Do not wait for models that missed their deadline; their threads finish in the background
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if not finished:
+            raise RuntimeError(f"No model produced a response: {'; '.join(e for e in errors if e)}")
+
+        if served is None:
+            # No answer was good enough on its own, so keep the best of those that finished
+            top_response, joint_scores = evaluator([all_outputs[i][-1] for i in finished])
+            for i, score in zip(finished, joint_scores):
+                scores[i] = score
+            served = finished[joint_scores.index(max(joint_scores))]
+
+        return FusionChainResult(
+            top_response=top_response,
+            all_prompt_responses=all_outputs,
+            all_context_filled_prompts=all_context_filled_prompts,
+            performance_scores=scores,
+            llm_identifiers=model_names,
+            errors=errors,
+            served_tier=served,
+        )
+
+    @staticmethod
+    def stream(
+        context: Dict[str, Any],
+        models: List[Any],
+        callable: Callable,
+        stream_callable: Callable[[Any, str], Iterable[str]],
+        prompts: List[str],
+        evaluator: Callable[[List[str]], List[float]],
+        get_model_name: Callable[[Any], str],
+        **kwargs: Any,
+    ) -> Iterator[Tuple[str, Any]]:
+        """
+        Run a concurrent competition while streaming the last stage of every chain.
+
+        Yields ("token", (model_name, chunk)) events as chunks arrive from any model, then a
+        single ("result", FusionChainResult) event once the evaluation is done. Remaining
+        keyword arguments are passed to run_concurrent.
+        """
+        model_names = [get_model_name(model) for model in models]
+        events: "queue.Queue[Tuple[str, Any]]" = queue.Queue()
+
+        def run():
+            try:
+                result = FusionChain.run_concurrent(
+                    context, models, callable, prompts, evaluator, get_model_name,
+                    stream_callable=stream_callable,
+                    on_token=lambda index, chunk: events.put(("token", (model_names[index], chunk))),
+                    **kwargs,
+                )
+                events.put(("result", result))
+            except Exception as e:
+                events.put(("error", e))
+
+        threading.Thread(target=run, daemon=True).start()
+        while True:
+            kind, payload = events.get()
+            if kind == "error":
+                raise payload
+            yield kind, payload
+            if kind == "result":
+                return
+
+
+_PLACEHOLDER_PATTERN = re.compile(r"\{\{([^{}]+)\}\}")
+_OUTPUT_REFERENCE_PATTERN = re.compile(r"output\[-(\d+)\](?:\.(.+))?")
+
+
+class CompiledPrompt:
+    """
+    A prompt template parsed once into literal and placeholder segments.
+
+    Supports {{key}} for context values, {{output[-n]}} for the n-th previous output (dict
+    outputs are JSON-encoded) and {{output[-n].field}} for a field of a dict output.
+    Placeholders that cannot be resolved are left in the prompt unchanged.
+    """
+
+    def __init__(self, template: str):
+        self.template = template
+        # Each segment is a literal string or a (raw placeholder, name, output index, field) tuple
+        self.segments: List[Union[str, Tuple[str, str, Optional[int], Optional[str]]]] = []
+        position = 0
+        for match in _PLACEHOLDER_PATTERN.finditer(template):
+            if match.start() > position:
+                self.segments.append(template[position:match.start()])
+            name = match.group(1)
+            reference = _OUTPUT_REFERENCE_PATTERN.fullmatch(name)
+            if reference:
+                self.segments.append((match.group(0), name, int(reference.group(1)), reference.group(2)))
+            else:
+                self.segments.append((match.group(0), name, None, None))
+            position = match.end()
+        if position < len(template):
+            self.segments.append(template[position:])
+
+    def render(self, context: Dict[str, Any], outputs: List[Any]) -> str:
+        parts = []
+        for segment in self.segments:
+            if isinstance(segment, str):
+                parts.append(segment)
+                continue
+            raw, name, index, field = segment
+            if name in context:
+                parts.append(str(context[name]))
+            elif index is not None and 1 <= index <= len(outputs):
+                previous_output = outputs[-index]
+                if field is None:
+                    parts.append(json.dumps(previous_output) if isinstance(previous_output, dict) else str(previous_output))
+                elif isinstance(previous_output, dict) and field in previous_output:
+                    parts.append(str(previous_output[field]))
+                else:
+                    parts.append(raw)
+            else:
+                parts.append(raw)
+        return "".join(parts)
+
+
+@functools.lru_cache(maxsize=256)
+def compile_prompt(template: str) -> CompiledPrompt:
+    """
+    Return the compiled form of a static prompt template, cached across requests by its text.
+
+    Per-request values belong in the context the template is rendered with. Prompts that
+    already embed them, such as a rendered transcript, are compiled with CompiledPrompt instead,
+    so the cache never holds request data.
+    """
+    return CompiledPrompt(template)
+
+
+def _compile_prompts(prompts: List[Union[str, CompiledPrompt]]) -> List[CompiledPrompt]:
+    # Compiled once per call and shared by every model, without caching: these usually embed request data
+    return [prompt if isinstance(prompt, CompiledPrompt) else CompiledPrompt(prompt) for prompt in prompts]
+
 
 class MinimalChainable:
     """
@@ -137,59 +470,45 @@ class MinimalChainable:
 
     @staticmethod
     def run(
-        context: Dict[str, Any], model: Any, callable: Callable, prompts: List[str]
+        context: Dict[str, Any],
+        model: Any,
+        callable: Callable,
+        prompts: List[Union[str, CompiledPrompt]],
+        stream_callable: Optional[Callable[[Any, str], Iterable[str]]] = None,
+        on_token: Optional[Callable[[str], None]] = None,
     ) -> List[Any]:
+        """
+        Run a chain of prompts against a model, filling each prompt from the context and earlier outputs.
+
+        Prompts may be passed compiled; strings are compiled for this run only.
+
+        When stream_callable is given, the last prompt is sent through it instead of callable and
+        every chunk it yields is passed to on_token as it arrives.
+        """
         # Initialize an empty list to store the outputs
         output = []
         context_filled_prompts = []
 
         # Iterate over each prompt with its index
-        for i, prompt in enumerate(prompts):
-            # Iterate over each key-value pair in the context
-            for key, value in context.items():
-                # Check if the key is in the prompt
-                if "{{" + key + "}}" in prompt:
-                    # Replace the key with its value
-                    prompt = prompt.replace("{{" + key + "}}", str(value))
-
-            # Replace references to previous outputs
-            # Iterate from the current index down to 1
-            for j in range(i, 0, -1):
-                # Get the previous output
-                previous_output = output[i - j]
-
-                # Handle JSON (dict) output references
-                # Check if the previous output is a dictionary
-                if isinstance(previous_output, dict):
-                    # Check if the reference is in the prompt
-                    if f"{{{{output[-{j}]}}}}" in prompt:
-                        # Replace the reference with the JSON string
-                        prompt = prompt.replace(
-                            f"{{{{output[-{j}]}}}}", json.dumps(previous_output)
-                        )
-                    # Iterate over each key-value pair in the previous output
-                    for key, value in previous_output.items():
-                        # Check if the key reference is in the prompt
-                        if f"{{{{output[-{j}].{key}}}}}" in prompt:
-                            # Replace the key reference with its value
-                            prompt = prompt.replace(
-                                f"{{{{output[-{j}].{key}}}}}", str(value)
-                            )
-                # If not a dict, use the original string
-                else:
-                    # Check if the reference is in the prompt
-                    if f"{{{{output[-{j}]}}}}" in prompt:
-                        # Replace the reference with the previous output
-                        prompt = prompt.replace(
-                            f"{{{{output[-{j}]}}}}", str(previous_output)
-                        )
+        for i, prompt in enumerate(_compile_prompts(prompts)):
+            # Fill context keys and references to previous outputs in a single pass
+            prompt = prompt.render(context, output)
 
             # Append the context filled prompt to the list
             context_filled_prompts.append(prompt)
 
             # Call the provided callable with the processed prompt
             # Get the result by calling the callable with the model and prompt
-            result = callable(model, prompt)
+            if stream_callable is not None and i == len(prompts) - 1:
+                # Stream the final stage, forwarding chunks as they arrive
+                chunks = []
+                for chunk in stream_callable(model, prompt):
+                    chunks.append(chunk)
+                    if on_token is not None:
+                        on_token(chunk)
+                result = "".join(chunks)
+            else:
+                result = callable(model, prompt)
 
             # Try to parse the result as JSON, handling markdown-wrapped JSON
             try:
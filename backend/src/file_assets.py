@@ -0,0 +1,58 @@
+"""
+Lazily loaded files that reload when they change on disk.
+"""
+
+import os
+import threading
+from typing import Any, Callable, Optional
+
+
+class FileAsset:
+    """
+    A file read on first use, parsed once and re-read only when its modification time changes.
+
+    Args:
+        path (str): The file to load.
+        parse (Optional[Callable[[str], Any]]): Turns the file text into the cached value. Defaults to str.strip.
+    """
+
+    def __init__(self, path: str, parse: Optional[Callable[[str], Any]] = None):
+        self.path = path
+        self.parse = parse or str.strip
+        self._value = None
+        self._mtime_ns = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Any:
+        mtime_ns = os.stat(self.path).st_mtime_ns
+        if mtime_ns != self._mtime_ns:
+            with self._lock:
+                if mtime_ns != self._mtime_ns:
+                    with open(self.path, 'r') as file:
+                        self._value = self.parse(file.read())
+                    self._mtime_ns = mtime_ns
+        return self._value
+
+    def derive(self, parse: Callable[[Any], Any]) -> "DerivedAsset":
+        """Return an asset computed from this one and recomputed whenever it reloads."""
+        return DerivedAsset(self, parse)
+
+
+class DerivedAsset:
+    """A value computed from a FileAsset and cached until the file changes."""
+
+    def __init__(self, source: FileAsset, parse: Callable[[Any], Any]):
+        self.source = source
+        self.parse = parse
+        self._value = None
+        self._source_value = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Any:
+        source_value = self.source.get()
+        if source_value is not self._source_value:
+            with self._lock:
+                if source_value is not self._source_value:
+                    self._value = self.parse(source_value)
+                    self._source_value = source_value
+        return self._value
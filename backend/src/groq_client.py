@@ -1,29 +1,137 @@
 import os
+import asyncio
+import httpx
 from dotenv import load_dotenv
-from groq import Groq
+from groq import Groq, AsyncGroq
+from .transcription_cache import TranscriptionCache, hash_audio
+from .transcription_backends import TranscriptionBackend
+from .scheduler import PRIORITY_LIVE, get_scheduler
+
+TRANSCRIPTION_MODEL = "distil-whisper-large-v3-en"
+TRANSCRIPTION_PROMPT = "Transcribe the following audio for a police report"
+
+def _cache_key(audio_file, language, prompt):
+    return TranscriptionCache.make_key(hash_audio(audio_file), TRANSCRIPTION_MODEL, language or "en", prompt)
+
+def _rewinder(audio_file):
+    # Returns a function that puts a file object back where it started, so a retried upload sends the whole file
+    file = audio_file[1] if isinstance(audio_file, tuple) else audio_file
+    if not hasattr(file, "seek"):
+        return lambda: None
+    position = file.tell()
+    return lambda: file.seek(position)
 
 class GroqClient:
-    def __init__(self):
+    def __init__(self, cache=None, scheduler=None):
         load_dotenv()  # Load environment variables from .env file
         api_key = os.getenv("GROQ_API_KEY")
         if not api_key:
             raise ValueError("GROQ_API_KEY environment variable is not set. Please check your backend/.env file.")
         self.client = Groq(api_key=api_key)
+        self.cache = cache
+        self.scheduler = scheduler or get_scheduler()
 
-    def transcribe_audio(self, audio_file, language=None):
-        try:
-            # Create a transcription request
-            transcription = self.client.audio.transcriptions.create(
+    def transcribe_audio(self, audio_file, language=None, priority=PRIORITY_LIVE, max_retries=None):
+        # max_retries overrides the scheduler's retries of rate-limited calls; 0 leaves them to the caller
+        cache_key = None
+        if self.cache:
+            cache_key = _cache_key(audio_file, language, TRANSCRIPTION_PROMPT)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        rewind = _rewinder(audio_file)
+
+        def create():
+            rewind()
+            return self.client.audio.transcriptions.create(
                 file=audio_file,
-                model="distil-whisper-large-v3-en",
-                prompt="Transcribe the following audio for a police report",
+                model=TRANSCRIPTION_MODEL,
+                prompt=TRANSCRIPTION_PROMPT,
                 response_format="json",
                 language=language or "en",
                 temperature=0.0
             )
+
+        try:
+            # Create a transcription request within the shared upstream budget
+            transcription = self.scheduler.call(TRANSCRIPTION_MODEL, create, priority=priority, max_retries=max_retries)
             
+            if cache_key:
+                self.cache.put(cache_key, transcription.text)
             # Extract the transcription from the response
             return transcription.text
         except Exception as e:
             print(f"Error during transcription: {str(e)}")
             raise  # Re-raise the exception to be handled by the caller
+
+class AsyncGroqClient(TranscriptionBackend):
+    """
+    Non-blocking counterpart of GroqClient for use inside the event loop.
+
+    All calls share one pooled HTTP connection, are bounded by a concurrency
+    semaphore and carry a per-call timeout, so a slow transcription only ties up
+    its own request instead of the whole worker. Calls also go through the shared
+    upstream scheduler, which budgets and retries rate-limited requests. Cache hits
+    return before either is consulted.
+    """
+
+    name = "groq"
+
+    def __init__(self, max_concurrency=None, timeout=None, max_connections=None, cache=None, scheduler=None):
+        load_dotenv()  # Load environment variables from .env file
+        api_key = os.getenv("GROQ_API_KEY")
+        if not api_key:
+            raise ValueError("GROQ_API_KEY environment variable is not set. Please check your backend/.env file.")
+        self.max_concurrency = max_concurrency or int(os.getenv("GROQ_MAX_CONCURRENCY", "4"))
+        self.timeout = timeout or float(os.getenv("GROQ_TIMEOUT", "60"))
+        max_connections = max_connections or self.max_concurrency
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=httpx.Timeout(self.timeout, connect=10.0),
+        )
+        self.client = AsyncGroq(api_key=api_key, http_client=self.http_client, max_retries=0)
+        self.cache = cache
+        self.scheduler = scheduler or get_scheduler()
+        self._semaphore = None
+
+    @property
+    def semaphore(self):
+        # Created lazily so the semaphore binds to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def transcribe_audio(self, audio_file, language=None, timeout=None, prompt=None, priority=PRIORITY_LIVE, max_retries=None):
+        cache_key = None
+        if self.cache:
+            cache_key = await asyncio.to_thread(_cache_key, audio_file, language, prompt or TRANSCRIPTION_PROMPT)
+            cached = await asyncio.to_thread(self.cache.get, cache_key)
+            if cached is not None:
+                return cached
+        rewind = _rewinder(audio_file)
+
+        async def create():
+            # The budget is granted before a concurrency slot is taken, so waiting never holds a slot
+            async with self.semaphore:
+                rewind()
+                return await self.client.audio.transcriptions.create(
+                    file=audio_file,
+                    model=TRANSCRIPTION_MODEL,
+                    prompt=prompt or TRANSCRIPTION_PROMPT,
+                    response_format="json",
+                    language=language or "en",
+                    temperature=0.0,
+                    timeout=timeout or self.timeout,
+                )
+
+        try:
+            transcription = await self.scheduler.call_async(TRANSCRIPTION_MODEL, create, priority=priority, max_retries=max_retries)
+            if cache_key:
+                await asyncio.to_thread(self.cache.put, cache_key, transcription.text)
+            return transcription.text
+        except Exception as e:
+            print(f"Error during transcription: {str(e)}")
+            raise  # Re-raise the exception to be handled by the caller
+
+    async def aclose(self):
+        await self.http_client.aclose()
@@ -0,0 +1,292 @@
+"""
+Background jobs for transcription and report generation.
+
+Submitting a job stores it in an embedded SQLite database and returns its id at once. A
+bounded pool of asyncio workers takes queued jobs in priority order ("live" before
+"batch") and records the result or error, which clients fetch by polling or long-polling.
+Jobs that were queued or running when the worker stopped are queued again on start.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, BinaryIO, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+LANES = {"live": 0, "batch": 1}
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+DEFAULT_MAX_RETRIES = 5
+
+
+class RetryLater(Exception):
+    """Raised by a handler to run the job again once delay seconds have passed."""
+
+    def __init__(self, delay: float, reason: str = "Rate limited"):
+        super().__init__(reason)
+        self.delay = delay
+
+
+class JobStore:
+    """
+    SQLite-backed job records.
+
+    Args:
+        db_path (str): The SQLite database file.
+    """
+
+    def __init__(self, db_path: str):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT NOT NULL, lane TEXT NOT NULL, status TEXT NOT NULL, "
+                "payload TEXT NOT NULL, input_path TEXT, result TEXT, error TEXT, "
+                "created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            self._db.commit()
+
+    def _execute(self, sql: str, parameters=()):
+        with self._lock:
+            cursor = self._db.execute(sql, parameters)
+            self._db.commit()
+            return cursor
+
+    def create(self, kind: str, lane: str, payload: Dict[str, Any], input_path: Optional[str] = None, job_id: Optional[str] = None) -> str:
+        job_id = job_id or uuid.uuid4().hex
+        self._execute(
+            "INSERT INTO jobs (id, kind, lane, status, payload, input_path, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, lane, QUEUED, json.dumps(payload), input_path, time.time()),
+        )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def mark_queued(self, job_id: str):
+        self._execute("UPDATE jobs SET status = ?, started_at = NULL WHERE id = ?", (QUEUED, job_id))
+
+    def mark_running(self, job_id: str):
+        self._execute("UPDATE jobs SET status = ?, started_at = ? WHERE id = ?", (RUNNING, time.time(), job_id))
+
+    def mark_succeeded(self, job_id: str, result: Any):
+        self._execute(
+            "UPDATE jobs SET status = ?, result = ?, finished_at = ? WHERE id = ?",
+            (SUCCEEDED, json.dumps(result), time.time(), job_id),
+        )
+
+    def save_result(self, job_id: str, result: Any):
+        """Store a partial result without changing the job's status."""
+        self._execute("UPDATE jobs SET result = ? WHERE id = ?", (json.dumps(result), job_id))
+
+    def mark_failed(self, job_id: str, error: str):
+        self._execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+            (FAILED, error, time.time(), job_id),
+        )
+
+    def requeue_interrupted(self) -> int:
+        """Return jobs left running by a previous worker to the queue."""
+        return self._execute("UPDATE jobs SET status = ?, started_at = NULL WHERE status = ?", (QUEUED, RUNNING)).rowcount
+
+    def queued(self):
+        with self._lock:
+            rows = self._db.execute("SELECT id, lane FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)).fetchall()
+        return [(row["id"], row["lane"]) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    def close(self):
+        self._db.close()
+
+
+def _remove(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+class JobQueue:
+    """
+    A bounded pool of workers running persisted jobs in priority order.
+
+    Handlers are registered per job kind and receive the job record; whatever JSON-serializable
+    value they return becomes the job result. A handler that raises RetryLater, typically on
+    a 429, puts its job back in the queue and holds every worker until the delay has passed,
+    since they all draw on the same upstream quota. A handler can save_progress before a step
+    that may fail; a retried job gets that partial result back as job["result"], and a job
+    that fails keeps it. The store is only touched from worker
+    threads, so SQLite never blocks the event loop.
+
+    Args:
+        store (JobStore): Where jobs are persisted.
+        data_dir (str): Where job input files are kept until the job finishes.
+        workers (int): Number of jobs run at once.
+        max_retries (int): RetryLater attempts allowed before the job fails.
+    """
+
+    def __init__(self, store: JobStore, data_dir: str, workers: int = 2, max_retries: int = DEFAULT_MAX_RETRIES):
+        self.store = store
+        self.data_dir = data_dir
+        self.workers = workers
+        self.max_retries = max_retries
+        self.resume_at = 0.0
+        self._retries: Dict[str, int] = {}
+        self.handlers: Dict[str, Callable[[Dict[str, Any]], Awaitable[Any]]] = {}
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._tasks = []
+        self._waiters: Dict[str, asyncio.Event] = {}
+        self._sequence = itertools.count()
+        os.makedirs(data_dir, exist_ok=True)
+
+    def register(self, kind: str, handler: Callable[[Dict[str, Any]], Awaitable[Any]]):
+        self.handlers[kind] = handler
+
+    def _enqueue(self, job_id: str, lane: str):
+        self._queue.put_nowait((LANES.get(lane, LANES["batch"]), next(self._sequence), job_id))
+
+    async def start(self):
+        self._queue = asyncio.PriorityQueue()
+        requeued = await asyncio.to_thread(self.store.requeue_interrupted)
+        if requeued:
+            logger.info(f"Re-queued {requeued} interrupted jobs")
+        for job_id, lane in await asyncio.to_thread(self.store.queued):
+            self._enqueue(job_id, lane)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, kind: str, payload: Dict[str, Any], lane: str = "live", input_file: Optional[BinaryIO] = None) -> str:
+        """
+        Persist a job and queue it.
+
+        Args:
+            kind (str): The registered handler to run.
+            payload (Dict[str, Any]): JSON-serializable job parameters.
+            lane (str): "live" or "batch"; live jobs are always taken first.
+            input_file (Optional[BinaryIO]): Binary input, such as audio, copied alongside the job from its current position.
+
+        Returns:
+            str: The job id.
+
+        Raises:
+            ValueError: If the kind or lane is unknown.
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if lane not in LANES:
+            raise ValueError(f"Invalid lane. Must be one of: {', '.join(LANES)}")
+        job_id = uuid.uuid4().hex
+        input_path = None
+        if input_file is not None:
+            input_path = os.path.join(self.data_dir, job_id)
+            with open(input_path, "wb") as stored:
+                shutil.copyfileobj(input_file, stored)
+        self.store.create(kind, lane, payload, input_path=input_path, job_id=job_id)
+        if self._queue is not None:
+            self._enqueue(job_id, lane)
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def save_progress(self, job_id: str, result: Any):
+        """Persist a running job's partial result, so a retry can resume from it."""
+        await asyncio.to_thread(self.store.save_result, job_id, result)
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Return the job once it has finished, or as it stands after timeout seconds."""
+        job = await self.get(job_id)
+        if job is None or job["status"] in (SUCCEEDED, FAILED) or timeout <= 0:
+            return job
+        event = self._waiters.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return await self.get(job_id)
+
+    async def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "jobs": await asyncio.to_thread(self.store.counts),
+        }
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            priority, sequence, job_id = await self._queue.get()
+            try:
+                wait = self.resume_at - loop.time()
+                if wait > 0:
+                    # Put the job back so a live job submitted meanwhile still goes first
+                    self._queue.put_nowait((priority, sequence, job_id))
+                    await asyncio.sleep(wait)
+                    continue
+                await self._run(job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        job = await self.get(job_id)
+        if job is None or job["status"] != QUEUED:
+            return
+        await asyncio.to_thread(self.store.mark_running, job_id)
+        try:
+            result = await self.handlers[job["kind"]](job)
+            await asyncio.to_thread(self.store.mark_succeeded, job_id, result)
+        except asyncio.CancelledError:
+            # Left as running so the next start re-queues it
+            raise
+        except RetryLater as e:
+            retries = self._retries.get(job_id, 0) + 1
+            if retries <= self.max_retries:
+                self._retries[job_id] = retries
+                logger.warning(f"Job {job_id} will be retried in {e.delay} seconds: {str(e)}")
+                self.resume_at = max(self.resume_at, asyncio.get_running_loop().time() + e.delay)
+                await asyncio.to_thread(self.store.mark_queued, job_id)
+                self._enqueue(job_id, job["lane"])
+                return
+            await asyncio.to_thread(self.store.mark_failed, job_id, str(e))
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}", exc_info=True)
+            await asyncio.to_thread(self.store.mark_failed, job_id, str(e) or type(e).__name__)
+        self._retries.pop(job_id, None)
+        if job["input_path"]:
+            await asyncio.to_thread(_remove, job["input_path"])
+        event = self._waiters.pop(job_id, None)
+        if event is not None:
+            event.set()
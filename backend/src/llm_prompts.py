@@ -2,26 +2,78 @@
 This module contains system and user prompts for LLMs used in police report generation.
 """
 
+import functools
+import logging
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-import llm
-from .chain import FusionChain
-from typing import List, Dict, Any
+from .chain import FusionChain, compile_prompt
+from .file_assets import FileAsset
+from .ollama_client import MODEL_PREFIX as OLLAMA_MODEL_PREFIX, OllamaModel
+from .report_evaluator import ReportTemplate, choose
+from .metrics import REPORT_CASCADE, REPORT_CHUNKS, REPORT_UPDATES, time_stage, timed
+from .model_routing import REPORT_CASCADE_THRESHOLD, REPORT_ROUTING, get_router
+from .response_cache import ResponseCache
+from .report_sections import ReportStore, ReportUpdate, StoredReport, format_sections
+from .report_facts import (
+    REPORT_MAP_WORKERS, Facts, count_grounded, format_fact_sheet, merge_facts, needs_map_reduce, parse_facts,
+    split_transcript,
+)
+from .scheduler import PRIORITY_LIVE, estimate_tokens, get_scheduler
+from typing import TYPE_CHECKING, List, Dict, Any, Callable, Iterator, Optional, Tuple
 
-# Load system prompt from file
+if TYPE_CHECKING:
+    import llm
+
+# Prompt files are loaded on first use and reloaded when they change on disk
 current_dir = os.path.dirname(os.path.abspath(__file__))
 system_prompt_path = os.path.join(current_dir, 'SYSTEM_PROMPT.md')
 user_prompt_path = os.path.join(current_dir, 'USER_PROMPT.md')
 example_report_path = os.path.join(current_dir, 'example_report.md')
+section_update_prompt_path = os.path.join(current_dir, 'SECTION_UPDATE_PROMPT.md')
+fact_extraction_prompt_path = os.path.join(current_dir, 'FACT_EXTRACTION_PROMPT.md')
+
+DEFAULT_REPORT_MODELS = "groq-mixtral,groq-gemma2,groq-llama3.1-70b"
+
+logger = logging.getLogger(__name__)
+
+_system_prompt = FileAsset(system_prompt_path)
+_user_prompt_template = FileAsset(user_prompt_path)
+# The static templates are compiled once per version of their file; request values go in the render context
+_user_prompt_compiled = _user_prompt_template.derive(compile_prompt)
+_example_report = FileAsset(example_report_path)
+_report_template = _example_report.derive(ReportTemplate)
+_section_update_compiled = FileAsset(section_update_prompt_path).derive(compile_prompt)
+_fact_extraction_compiled = FileAsset(fact_extraction_prompt_path).derive(compile_prompt)
+_report_store = None
 
-with open(system_prompt_path, 'r') as file:
-    POLICE_REPORT_SYSTEM_PROMPT = file.read().strip()
+_ASSETS = {
+    "POLICE_REPORT_SYSTEM_PROMPT": _system_prompt,
+    "POLICE_REPORT_USER_PROMPT_TEMPLATE": _user_prompt_template,
+    "EXAMPLE_REPORT": _example_report,
+}
 
-with open(user_prompt_path, 'r') as file:
-    POLICE_REPORT_USER_PROMPT_TEMPLATE = file.read().strip()
+def __getattr__(name: str) -> Any:
+    # Keeps the prompt constants importable while loading them lazily
+    if name in _ASSETS:
+        return _ASSETS[name].get()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-with open(example_report_path, 'r') as file:
-    EXAMPLE_REPORT = file.read().strip()
+_models = None
+_models_lock = threading.Lock()
+# Opened on first use rather than at import
+_response_cache = None
+_response_cache_built = False
+_caches_lock = threading.Lock()
+
+# Concurrent fusion settings: per-model deadline in seconds, and an optional early return
+# once REPORT_QUORUM models have answered with a best score of at least REPORT_SCORE_THRESHOLD
+REPORT_MODEL_TIMEOUT = float(os.getenv("REPORT_MODEL_TIMEOUT", "120"))
+REPORT_QUORUM = int(os.getenv("REPORT_QUORUM", "0")) or None
+REPORT_SCORE_THRESHOLD = float(os.getenv("REPORT_SCORE_THRESHOLD")) if os.getenv("REPORT_SCORE_THRESHOLD") else None
+REPORT_OUTPUT_TOKENS = 2000  # Budgeted completion length of one report
 
 def generate_user_prompt(transcription: str, report_type: str) -> str:
     """
@@ -41,76 +93,475 @@ def generate_user_prompt(transcription: str, report_type: str) -> str:
     if report_type not in valid_report_types:
         raise ValueError(f"Invalid report_type. Must be one of: {', '.join(valid_report_types)}")
     
-    return POLICE_REPORT_USER_PROMPT_TEMPLATE.format(
-        transcription=transcription,
-        reportType=report_type,
-        example_report=EXAMPLE_REPORT
-    )
+    values = {
+        "transcription": transcription,
+        "reportType": report_type,
+        "example_report": _example_report.get(),
+    }
+    return _user_prompt_compiled.get().render(values, [])
+
+def generate_section_update_prompt(stored: StoredReport, update: ReportUpdate) -> str:
+    """
+    Generate a user prompt asking for only the parts of a report a transcript edit affects.
+
+    Args:
+        stored (StoredReport): The report being updated.
+        update (ReportUpdate): The affected sections and paragraphs, and the edits.
+
+    Returns:
+        str: The formatted prompt.
+    """
+    changes = []
+    for before, after in update.changes:
+        if not before:
+            changes.append(f'- Added: "{after}"')
+        elif not after:
+            changes.append(f'- Removed: "{before}"')
+        else:
+            changes.append(f'- "{before}" is now "{after}"')
+    values = {
+        "reportType": stored.report_type,
+        "changes": "\n".join(changes),
+        "excerpt": "\n".join(update.excerpt),
+        "sections": format_sections(stored.sections, update.keys),
+    }
+    return _section_update_compiled.get().render(values, [])
+
+def generate_fact_extraction_prompt(chunk: str, chunk_number: int, chunk_count: int) -> str:
+    """
+    Generate a user prompt asking for the facts of one chunk of a long transcription as JSON.
+
+    Args:
+        chunk (str): The chunk of the transcription.
+        chunk_number (int): Its position, counting from 1.
+        chunk_count (int): The number of chunks the transcription was split into.
+
+    Returns:
+        str: The formatted prompt.
+    """
+    values = {
+        "chunkNumber": str(chunk_number),
+        "chunkCount": str(chunk_count),
+        "transcription": chunk,
+    }
+    return _fact_extraction_compiled.get().render(values, [])
+
+def generate_report_prompt(transcription: str, report_type: str, priority: int = PRIORITY_LIVE) -> str:
+    """
+    Generate the user prompt of a report, from the transcription itself or, when it is too long, from its fact sheet.
+
+    Transcriptions over REPORT_MAP_REDUCE_TOKENS estimated tokens are split into chunks whose
+    facts the models extract concurrently (see build_fact_sheet); the merged fact sheet then
+    takes the place of the transcription in the prompt. Blocks on those model calls, so async
+    callers should run it in a worker thread. priority is the upstream scheduling priority of those calls.
+
+    Raises:
+        ValueError: If an invalid report_type is provided.
+    """
+    if not needs_map_reduce(transcription):
+        return generate_user_prompt(transcription, report_type)
+    generate_user_prompt("", report_type)  # Reject an invalid report type before any model is called
+    return generate_user_prompt(build_fact_sheet(transcription, priority), report_type)
+
+def score_reports(outputs: List[str], transcription: Optional[str] = None) -> Dict[str, List[float]]:
+    """
+    Score candidate reports against the example report, dimension by dimension.
+
+    Args:
+        outputs (List[str]): List of outputs from different models.
+        transcription (Optional[str]): The transcription the reports were generated from, used to check their facts.
+
+    Returns:
+        Dict[str, List[float]]: The overall "score" and the "similarity", "section_coverage",
+        "field_completeness" and "fidelity" scores of each output (fidelity is None without a transcription).
+    """
+    return _report_template.get().score(outputs, transcription)
 
-def evaluator(outputs: List[str]) -> tuple[str, List[float]]:
+@timed("evaluator")
+def evaluator(outputs: List[str], transcription: Optional[str] = None) -> tuple[str, List[float]]:
     """
-    Evaluate the outputs from different models and return the one most similar to the example report format.
+    Evaluate the outputs from different models and return the one that best matches the example report.
 
     Args:
         outputs (List[str]): List of outputs from different models.
+        transcription (Optional[str]): The transcription the reports were generated from, used to check their facts.
 
     Returns:
         tuple[str, List[float]]: A tuple containing the top response and a list of scores for each output.
     """
-    with open(example_report_path, 'r') as file:
-        example_report = file.read().strip()
+    scores = score_reports(outputs, transcription)["score"]
+
+    top_index, top_response = choose(outputs, scores)
+    logger.info(f"Chosen output: {top_index + 1} (Score: {scores[top_index]:.4f})")
+    return top_response, scores
+
+def _get_model(model_id: str) -> Any:
+    if model_id.startswith(OLLAMA_MODEL_PREFIX):
+        return OllamaModel(model_id[len(OLLAMA_MODEL_PREFIX):])
+    # Imported here: loading llm and its plugins is most of the cost of importing this module
+    import llm
+    return llm.get_model(model_id)
+
+def build_models() -> List["llm.Model"]:
+    """
+    Return the report models, resolving them once per process.
+
+    The model ids come from REPORT_MODELS (comma-separated), defaulting to the three Groq models.
+    Ids starting with "ollama/" run on the local Ollama server through the shared OllamaClient.
+    """
+    global _models
+    if _models is None:
+        with _models_lock:
+            if _models is None:
+                load_dotenv()
+                model_ids = os.getenv("REPORT_MODELS", DEFAULT_REPORT_MODELS).split(",")
+                _models = [_get_model(model_id.strip()) for model_id in model_ids if model_id.strip()]
+    return list(_models)
+
+def clear_caches():
+    """Drop the cached model handles and responses so the next call resolves and prompts the models again."""
+    global _models
+    with _models_lock:
+        _models = None
+    if _response_cache is not None:
+        _response_cache.clear()
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Return the cache of model responses, opening it on first use, or None if REPORT_CACHE_SIZE and REPORT_CACHE_DB disable it."""
+    global _response_cache, _response_cache_built
+    with _caches_lock:
+        if not _response_cache_built:
+            _response_cache = ResponseCache.from_env()
+            _response_cache_built = True
+        return _response_cache
+
+def get_report_store() -> ReportStore:
+    """Return the store of generated reports, building it on first use."""
+    global _report_store
+    with _caches_lock:
+        if _report_store is None:
+            _report_store = ReportStore.from_env()
+        return _report_store
+
+def _cached_response(model: Any, prompt: str, system_prompt: str) -> Tuple[Optional[str], Optional[str]]:
+    """Return the cache key of a prompt to a model and the stored response, if there is one."""
+    cache = get_response_cache()
+    if cache is None:
+        return None, None
+    key = ResponseCache.make_key(model.model_id, system_prompt, prompt)
+    return key, cache.get(key)
+
+def _estimate_report_tokens(prompt: str, system_prompt: str) -> int:
+    return estimate_tokens(prompt, system_prompt) + REPORT_OUTPUT_TOKENS
+
+def _scheduled_prompt(model: Any, prompt: str, system_prompt: str, priority: int = PRIORITY_LIVE,
+                      record: Optional[Callable[[float, bool], None]] = None) -> str:
+    """
+    Prompt a model within its upstream budget, retrying after rate limits, unless its response is cached.
+
+    The outcome of the call goes to record, or straight to the router without one.
+    """
+    key, cached = _cached_response(model, prompt, system_prompt)
+    if cached is not None:
+        return cached
+
+    def call() -> str:
+        # Only calls that reach the model feed the router, so cache hits do not shorten its deadlines
+        started = time.monotonic()
+        succeeded = False
+        try:
+            with time_stage("report_model", model=model.model_id):
+                text = model.prompt(prompt, system=system_prompt).text()
+            succeeded = True
+            return text
+        finally:
+            (record or functools.partial(get_router().record, model.model_id))(time.monotonic() - started, succeeded)
 
-    scores = []
-    for output in outputs:
-        # Calculate a simple similarity score based on shared lines
-        output_lines = set(output.split('\n'))
-        example_lines = set(example_report.split('\n'))
-        similarity = len(output_lines.intersection(example_lines)) / len(example_lines)
-        scores.append(similarity)
+    text = get_scheduler().call(model.model_id, call, tokens=_estimate_report_tokens(prompt, system_prompt), priority=priority)
+    if key is not None and text:
+        get_response_cache().put(key, text)
+    return text
 
-    top_index = scores.index(max(scores))
-    print(f"Chosen output: {top_index + 1} (Score: {scores[top_index]:.4f})")
-    return outputs[top_index], scores
+def _extract_facts(chunk: str, chunk_number: int, chunk_count: int, priority: int = PRIORITY_LIVE) -> Optional[Facts]:
+    """Have every report model list the facts of a chunk and keep the answer with the most facts found in it."""
+    def evaluate(outputs: List[Any]) -> Tuple[Any, List[float]]:
+        counts = [count_grounded(parse_facts(output), chunk) for output in outputs]
+        best = max(counts)
+        return outputs[counts.index(best)], [count / (best or 1) for count in counts]
 
-def build_models():
-    load_dotenv()
+    return parse_facts(_run_report_models(generate_fact_extraction_prompt(chunk, chunk_number, chunk_count), evaluate, priority))
 
-    mixtral_model: llm.Model = llm.get_model("groq-mixtral")
-    gemma_model: llm.Model = llm.get_model("groq-gemma2")
-    groq_llama3_1_405b_model: llm.Model = llm.get_model("groq-llama3.1-70b")
+@timed("fact_extraction")
+def build_fact_sheet(transcription: str, priority: int = PRIORITY_LIVE) -> str:
+    """
+    Extract the facts of a long transcription chunk by chunk and merge them into one fact sheet.
 
-    return [mixtral_model, gemma_model, groq_llama3_1_405b_model]
+    Chunks are processed concurrently, up to REPORT_MAP_WORKERS at a time, so the time taken
+    depends on the chunk size rather than the length of the transcription. The call is blocking.
 
-def generate_report(transcription: str, report_type: str) -> str:
+    Args:
+        transcription (str): The transcribed audio content.
+        priority (int): Upstream scheduling priority of the model calls.
+
+    Returns:
+        str: The fact sheet, listing people, times, locations and events.
+    """
+    chunks = split_transcript(transcription)
+    REPORT_CHUNKS.inc(len(chunks))
+    with ThreadPoolExecutor(max_workers=max(1, min(len(chunks), REPORT_MAP_WORKERS))) as executor:
+        chunk_facts = list(executor.map(
+            lambda number_and_chunk: _extract_facts(number_and_chunk[1], number_and_chunk[0], len(chunks), priority),
+            enumerate(chunks, start=1),
+        ))
+    return format_fact_sheet(merge_facts(chunk_facts), len(chunks))
+
+def generate_report(transcription: str, report_type: str, priority: int = PRIORITY_LIVE) -> str:
     """
     Generate a police report using FusionChain with multiple LLM models.
 
+    The models run concurrently; the call is blocking, so async callers should run it in a worker thread.
+    Transcriptions too long for one prompt are reported from a fact sheet, see generate_report_prompt.
+
     Args:
         transcription (str): The transcribed audio content.
         report_type (str): The type of report to generate.
+        priority (int): Upstream scheduling priority of the model calls; batch work passes scheduler.PRIORITY_BATCH.
 
     Returns:
         str: The generated police report.
     """
-    user_prompt = generate_user_prompt(transcription, report_type)
+    user_prompt = generate_report_prompt(transcription, report_type, priority)
+    return _run_report_models(user_prompt, functools.partial(evaluator, transcription=transcription), priority)
+
+def _run_report_models(user_prompt: str, evaluate: Callable[[List[str]], Tuple[str, List[float]]],
+                       priority: int = PRIORITY_LIVE) -> str:
+    """
+    Run the report models on a prompt and return the output the evaluator chose.
+
+    With REPORT_ROUTING=cascade the models are tried one at a time until one scores at least
+    REPORT_CASCADE_THRESHOLD (see _run_cascade); otherwise they all run concurrently.
+    """
+    system_prompt = _system_prompt.get()
     
     # Create models
     models = build_models()
 
-    def prompt_model(model: Any, prompt: str) -> str:
-        return model.prompt(prompt, system=POLICE_REPORT_SYSTEM_PROMPT).text()
+    def prompt_model(model: Any, prompt: str, record: Optional[Callable[[float, bool], None]] = None) -> str:
+        return _scheduled_prompt(model, prompt, system_prompt, priority, record)
+
+    if REPORT_ROUTING == "cascade":
+        return _run_cascade(models, prompt_model, user_prompt, evaluate)
 
-    result = FusionChain.run(
+    result = FusionChain.run_concurrent(
         context={},
         models=models,
         callable=prompt_model,
         prompts=[user_prompt],
-        evaluator=evaluator,
-        get_model_name=lambda model: model.model_id
+        evaluator=evaluate,
+        get_model_name=lambda model: model.model_id,
+        timeout=REPORT_MODEL_TIMEOUT,
+        quorum=REPORT_QUORUM,
+        score_threshold=REPORT_SCORE_THRESHOLD,
+    )
+
+    return result.top_response
+
+class _RecordOnce:
+    """Records a model call with the router once, whichever ends first: the call or its deadline."""
+
+    def __init__(self, router: Any, model_id: str):
+        self.router = router
+        self.model_id = model_id
+        self._recorded = False
+        self._lock = threading.Lock()
+
+    def __call__(self, seconds: float, succeeded: bool):
+        with self._lock:
+            if self._recorded:
+                return
+            self._recorded = True
+        self.router.record(self.model_id, seconds, succeeded)
+
+def _run_cascade(models: List[Any], prompt_model: Callable[[Any, str, Callable[[float, bool], None]], str], user_prompt: str,
+                 evaluate: Callable[[List[str]], Tuple[str, List[float]]]) -> str:
+    """Try the report models in the router's order, escalating while answers score below the threshold."""
+    router = get_router()
+    models = [models[index] for index in router.order([model.model_id for model in models])]
+    records = {model.model_id: _RecordOnce(router, model.model_id) for model in models}
+
+    def on_model_done(index: int, seconds: float, error: Optional[str]):
+        # Completed and failed calls record themselves; a missed deadline is a failure, and the
+        # abandoned call no longer counts when it returns
+        if error == "Timed out":
+            records[models[index].model_id](seconds, False)
+
+    result = FusionChain.run_cascade(
+        context={},
+        models=models,
+        callable=lambda model, prompt: prompt_model(model, prompt, records[model.model_id]),
+        prompts=[user_prompt],
+        evaluator=evaluate,
+        get_model_name=lambda model: model.model_id,
+        score_threshold=REPORT_CASCADE_THRESHOLD,
+        timeouts=[router.timeout(model.model_id, REPORT_MODEL_TIMEOUT) for model in models],
+        on_model_done=on_model_done,
     )
 
+    model_id = result.llm_identifiers[result.served_tier]
+    router.record_served(model_id)
+    REPORT_CASCADE.inc(model=model_id, tier=str(result.served_tier))
+    logger.info(
+        f"Cascade served by tier {result.served_tier} ({model_id}) "
+        f"with score {result.performance_scores[result.served_tier]:.4f}"
+    )
     return result.top_response
 
+def _update_sections(stored: StoredReport, update: ReportUpdate, transcription: str) -> Optional[str]:
+    """Regenerate the sections an edit affects and splice the best answer into the stored report."""
+    def evaluate(outputs: List[str]) -> Tuple[str, List[float]]:
+        # Outputs missing a requested section score as empty reports
+        reports = [stored.splice(update.keys, output) or "" for output in outputs]
+        return evaluator(reports, transcription)
+
+    report = _run_report_models(generate_section_update_prompt(stored, update), evaluate)
+    return report or None
+
+def update_report(transcription: str, report_type: str, report_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Generate a police report, regenerating only the affected sections of an earlier one when possible.
+
+    Reports are kept in memory under a report id. Given the id of an earlier report of the same
+    type, only the sections fed by the edited transcript sentences are sent back to the models,
+    with a short prompt holding the edits and those sections, and the rest of the report is reused.
+    The whole report is regenerated when the id is unknown, the report type differs, the edit
+    touches too much of the transcript, or no model returns every requested section.
+    The call is blocking, so async callers should run it in a worker thread.
+
+    Args:
+        transcription (str): The transcribed audio content.
+        report_type (str): The type of report to generate.
+        report_id (Optional[str]): The id of the report generated from an earlier version of the transcription.
+
+    Returns:
+        Dict[str, Any]: The "report", its "report_id", and "regenerated_sections", the keys of the
+        sections that were regenerated, or None if the whole report was.
+    """
+    store = get_report_store()
+    stored = store.get(report_id) if report_id else None
+    if stored is not None and stored.report_type == report_type:
+        update = stored.plan(transcription)
+        if update is not None and not update.keys:
+            REPORT_UPDATES.inc(mode="unchanged")
+            return {"report": stored.report, "report_id": report_id, "regenerated_sections": []}
+        if update is not None:
+            report = _update_sections(stored, update, transcription)
+            if report is not None:
+                store.put(StoredReport(transcription, report_type, report), report_id)
+                REPORT_UPDATES.inc(mode="incremental")
+                return {"report": report, "report_id": report_id, "regenerated_sections": update.keys}
+
+    report = generate_report(transcription, report_type)
+    report_id = store.put(StoredReport(transcription, report_type, report), report_id if stored is not None else None)
+    REPORT_UPDATES.inc(mode="full")
+    return {"report": report, "report_id": report_id, "regenerated_sections": None}
+
+def stream_report(transcription: str, report_type: str) -> Iterator[Dict[str, Any]]:
+    """
+    Generate a police report like generate_report, streaming model output as it arrives.
+
+    The report type is validated before any model is called, so a ValueError is raised
+    eagerly rather than from inside the stream. For a transcription too long for one prompt,
+    the fact extraction runs when the stream is first iterated and only the report is streamed.
+
+    Args:
+        transcription (str): The transcribed audio content.
+        report_type (str): The type of report to generate.
+
+    Returns:
+        Iterator[Dict[str, Any]]: "token" events ({"event", "model", "text"}) as chunks arrive, then one
+        "result" event with the chosen model, its report and the evaluator score of every model.
+
+    Raises:
+        ValueError: If an invalid report_type is provided.
+    """
+    generate_user_prompt("", report_type)
+    system_prompt = _system_prompt.get()
+
+    def prompt_model(model: Any, prompt: str) -> str:
+        return _scheduled_prompt(model, prompt, system_prompt)
+
+    def stream_model(model: Any, prompt: str) -> Iterator[str]:
+        key, cached = _cached_response(model, prompt, system_prompt)
+        if cached is not None:
+            yield cached
+            return
+        started = None
+
+        def open_stream() -> Tuple[Iterator[str], Optional[str]]:
+            # The request goes out with the first chunk, so rate limits are retried like
+            # _scheduled_prompt's until one arrives; a stream cut off later cannot be replayed
+            nonlocal started
+            started = time.monotonic()
+            stream = iter(model.prompt(prompt, system=system_prompt))
+            return stream, next(stream, None)
+
+        chunks = []
+        succeeded = False
+        try:
+            with time_stage("report_model", model=model.model_id):
+                stream, chunk = get_scheduler().call(
+                    model.model_id, open_stream, tokens=_estimate_report_tokens(prompt, system_prompt)
+                )
+                while chunk is not None:
+                    chunks.append(chunk)
+                    yield chunk
+                    chunk = next(stream, None)
+            succeeded = True
+        except GeneratorExit:
+            # Abandoned by an early return, which says nothing about the model
+            started = None
+            raise
+        finally:
+            if started is not None:
+                get_router().record(model.model_id, time.monotonic() - started, succeeded)
+        if key is not None and chunks:
+            get_response_cache().put(key, "".join(chunks))
+
+    def events() -> Iterator[Dict[str, Any]]:
+        # Resolved here rather than eagerly, in the thread iterating the stream: the first call imports
+        # llm and its plugins, and for a long transcription building the prompt runs the fact extraction
+        models = build_models()
+        user_prompt = generate_report_prompt(transcription, report_type)
+        for kind, payload in FusionChain.stream(
+            context={},
+            models=models,
+            callable=prompt_model,
+            stream_callable=stream_model,
+            prompts=[user_prompt],
+            evaluator=functools.partial(evaluator, transcription=transcription),
+            get_model_name=lambda model: model.model_id,
+            timeout=REPORT_MODEL_TIMEOUT,
+            quorum=REPORT_QUORUM,
+            score_threshold=REPORT_SCORE_THRESHOLD,
+        ):
+            if kind == "token":
+                model_name, chunk = payload
+                yield {"event": "token", "model": model_name, "text": chunk}
+            else:
+                scores = payload.performance_scores
+                # Chosen among the models that finished, as the evaluator chose the report
+                finished = [i for i, outputs in enumerate(payload.all_prompt_responses) if outputs]
+                _, chosen = choose(finished, [scores[i] for i in finished])
+                yield {
+                    "event": "result",
+                    "model": payload.llm_identifiers[chosen],
+                    "report": payload.top_response,
+                    "scores": dict(zip(payload.llm_identifiers, scores)),
+                    "errors": {name: error for name, error in zip(payload.llm_identifiers, payload.errors) if error},
+                }
+
+    return events()
+
 def get_available_models() -> list:
     """
     Get a list of available LLM models.
@@ -118,4 +569,5 @@ def get_available_models() -> list:
     Returns:
         list: A list of available model names.
     """
+    import llm
     return [model.name for model in llm.models()]
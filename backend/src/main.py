@@ -1,25 +1,45 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, WebSocket, Depends, Request, WebSocketDisconnect
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, WebSocket, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.docs import get_swagger_ui_html, get_redoc_html
 from fastapi.openapi.utils import get_openapi
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel, ValidationError
-from typing import List
+from typing import Any, List, Optional
+from contextlib import asynccontextmanager, contextmanager
 import os
 import asyncio
-import tempfile
+import math
+import threading
+import time
 from dotenv import load_dotenv
-from .groq_client import GroqClient
+from .transcription_backends import TranscriptionBackend, create_backend
+from .transcription_cache import TranscriptionCache
+from .audio_ingest import spool_upload, allowed_file, IngestedAudio, UploadTooLargeError
+from .audio_chunker import transcribe_recording, detect_wav_speech, AudioDecodeError
+from .transcoder import get_transcoder
+from .streaming import StreamingTranscriber
+from .sessions import StreamSession, get_session_manager
+from .ollama_client import close_client as close_ollama_client
+from .jobs import JobQueue, JobStore, RetryLater, LANES
+from .scheduler import PRIORITY_BATCH, PRIORITY_LIVE, get_scheduler, retry_after_seconds
+from . import metrics
+from .metrics import time_stage
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 import json
-import wave
-import io
 
 # Load environment variables
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await startup()
+    try:
+        yield
+    finally:
+        await shutdown()
+
 limiter = Limiter(key_func=get_remote_address)
 app = FastAPI(
     title="Police Transcription & Report Generation API",
@@ -27,7 +47,8 @@ app = FastAPI(
     version="1.0.0",
     docs_url=None,
     redoc_url=None,
-    openapi_url=None
+    openapi_url=None,
+    lifespan=lifespan,
 )
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
@@ -51,59 +72,239 @@ async def add_security_headers(request: Request, call_next):
     response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
     return response
 
+# Request metrics and on-demand profiling; registered last, so it runs first
+@app.middleware("http")
+async def record_metrics(request: Request, call_next):
+    profiled = metrics.PROFILING_ENABLED and metrics.PROFILE_HEADER in request.headers
+    if not metrics.ENABLED and not profiled:
+        return await call_next(request)
+
+    started = time.perf_counter()
+    status = 500
+    metrics.HTTP_IN_FLIGHT.inc()
+    try:
+        if profiled:
+            response, profile_path = await metrics.profile(
+                request.url.path, request.headers[metrics.PROFILE_HEADER], lambda: call_next(request)
+            )
+            if profile_path:
+                logger.info(f"Profile of {request.url.path} written to {profile_path}")
+                response.headers["X-Profile-File"] = os.path.basename(profile_path)
+        else:
+            response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        metrics.HTTP_IN_FLIGHT.dec()
+        # Label by route template so path parameters such as job ids do not create new series
+        route = request.scope.get("route")
+        endpoint = getattr(route, "path", "unmatched")
+        metrics.HTTP_REQUESTS.inc(method=request.method, endpoint=endpoint, status=status)
+        metrics.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, method=request.method, endpoint=endpoint)
+
 
-from .llm_prompts import generate_report
+from .llm_prompts import generate_report, generate_user_prompt, get_response_cache, stream_report, update_report
+from .model_routing import get_router
 
 class TranscriptionResponse(BaseModel):
     text: str
     segments: List[dict]
+    skipped_seconds: float = 0.0  # Silence removed before transcription
 
 class ReportRequest(BaseModel):
     transcription: str
     report_type: str
+    report_id: Optional[str] = None  # An earlier report to update rather than regenerate
 
 class ReportResponse(BaseModel):
     report: str
-
-ALLOWED_EXTENSIONS = {'mp3', 'wav', 'ogg', 'flac', 'm4a', 'mp4', 'mpeg', 'mpga', 'webm'}
-MAX_FILE_SIZE = 25 * 1024 * 1024  # 25 MB
-
-def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    report_id: str
+    regenerated_sections: Optional[List[str]] = None  # None when the whole report was generated
+
+class JobSubmitResponse(BaseModel):
+    job_id: str
+    status: str
+
+class BatchManifest(BaseModel):
+    paths: List[str]  # Relative to BATCH_ROOT
+    report_type: Optional[str] = None
+
+class BatchSubmitResponse(BaseModel):
+    job_ids: List[str]
+    rejected: List[dict] = []
+
+class JobResponse(BaseModel):
+    job_id: str
+    kind: str
+    lane: str
+    status: str  # queued, running, succeeded or failed
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+MAX_FILE_SIZE = 25 * 1024 * 1024  # 25 MB, the largest payload Groq accepts per request
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", str(500 * 1024 * 1024)))  # Larger uploads are chunked
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+MAX_JOB_WAIT_SECONDS = 30  # Longest a poll may block waiting for a job to finish
+BATCH_ROOT = os.getenv("BATCH_ROOT")  # Directory batch manifests may read from; unset disables manifests
 
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-groq_client = None
-
-def initialize_groq_client():
-    global groq_client
-    groq_client = GroqClient()
-
-def initialize_ollama_client():
-    global ollama_client
-    from .ollama_client import OllamaClient
-    ollama_client = OllamaClient()
-    global groq_client
+JOBS_DB = os.getenv("JOBS_DB", os.path.join("data", "jobs.sqlite"))
+JOBS_DIR = os.getenv("JOBS_DIR", os.path.join("data", "jobs"))
+
+# Clients are built at startup, not at import, so importing the app is cheap and has no side effects
+transcription_backend = None
+job_queue = None
+transcription_cache = None
+ready = False  # Set once startup has finished and the backend has warmed up
+_warm_up_task = None
+_job_queue_lock = threading.Lock()
+_transcription_cache_lock = threading.Lock()
+_transcription_cache_built = False
+
+def get_transcription_cache() -> Optional[TranscriptionCache]:
+    """Return the transcription cache, opening it on first use, or None if it is disabled."""
+    global transcription_cache, _transcription_cache_built
+    with _transcription_cache_lock:
+        if not _transcription_cache_built:
+            transcription_cache = TranscriptionCache.from_env()
+            _transcription_cache_built = True
+        return transcription_cache
+
+def initialize_transcription_backend():
+    """Build the transcription backend unless one has been set already."""
+    global transcription_backend
+    if transcription_backend is None:
+        try:
+            transcription_backend = create_backend(cache=get_transcription_cache())
+        except ValueError as e:
+            logger.error(f"Error initializing the transcription backend: {str(e)}")
+    return transcription_backend
+
+def get_transcription_backend():
+    if not transcription_backend:
+        raise HTTPException(status_code=500, detail="Transcription backend is not initialized. Please check TRANSCRIPTION_BACKEND and GROQ_API_KEY.")
+    return transcription_backend
+
+def get_job_queue() -> JobQueue:
+    """Return the job queue, opening its store on first use."""
+    global job_queue
+    with _job_queue_lock:
+        if job_queue is None:
+            queue = JobQueue(JobStore(JOBS_DB), JOBS_DIR, workers=JOB_WORKERS)
+            queue.register("transcription", run_transcription_job)
+            queue.register("report", run_report_job)
+            job_queue = queue
+        return job_queue
+
+def job_priority(job) -> int:
+    # Upstream calls of batch-lane jobs queue behind live requests for the same model
+    return PRIORITY_BATCH if job["lane"] == "batch" else PRIORITY_LIVE
+
+@contextmanager
+def retry_when_rate_limited():
+    # Rate-limited jobs are retried by the queue, which frees the worker meanwhile
     try:
-        groq_client = GroqClient()
-        logger.info("GroqClient initialized successfully")
-    except ValueError as e:
-        logger.error(f"Error initializing GroqClient: {str(e)}")
-        print("ERROR: GROQ_API_KEY environment variable is not set. Please set it in the backend/.env file and restart the application.")
-
-initialize_groq_client()
-initialize_ollama_client()
-
-if not groq_client:
-    print("WARNING: The application is running without a valid GROQ_API_KEY. Some features may not work correctly.")
-
-def get_groq_client():
-    if not groq_client:
-        raise HTTPException(status_code=500, detail="GroqClient is not initialized. Please check your GROQ_API_KEY.")
-    return groq_client
+        yield
+    except Exception as e:
+        retry_after = retry_after_seconds(e)
+        if retry_after is None:
+            raise
+        raise RetryLater(retry_after)
+
+async def run_transcription_job(job):
+    payload = job["payload"]
+    # A retried job resumes from the transcription it saved before its report step
+    result = job["result"]
+    if result is None:
+        if not transcription_backend:
+            raise RuntimeError("Transcription backend is not initialized. Please check TRANSCRIPTION_BACKEND and GROQ_API_KEY.")
+        # Uploaded audio is stored with the job; manifest entries are read where they are
+        path = job["input_path"] or payload["path"]
+        with retry_when_rate_limited(), open(path, "rb") as buffer:
+            audio = IngestedAudio(payload["filename"], buffer, os.path.getsize(path))
+            with time_stage("transcription", model=transcription_backend.name):
+                transcription, segments, skipped_seconds = await transcribe_recording(
+                    transcription_backend, audio, max_request_size=MAX_FILE_SIZE, language="en",
+                    transcoder=get_transcoder(), priority=job_priority(job), max_retries=0,
+                )
+        logger.info(f"Transcription job {job['id']} completed: {len(segments)} segments")
+        result = TranscriptionResponse(text=transcription, segments=segments, skipped_seconds=round(skipped_seconds, 3)).model_dump()
+        if payload.get("report_type"):
+            await get_job_queue().save_progress(job["id"], result)
+    if payload.get("report_type"):
+        with retry_when_rate_limited():
+            result["report"] = await asyncio.to_thread(generate_report, result["text"], payload["report_type"], job_priority(job))
+    return result
+
+async def run_report_job(job):
+    payload = job["payload"]
+    with retry_when_rate_limited():
+        report = await asyncio.to_thread(generate_report, payload["transcription"], payload["report_type"], job_priority(job))
+    return {"report": report}
+
+def check_lane(lane: str):
+    if lane not in LANES:
+        raise HTTPException(status_code=400, detail=f"Invalid lane. Must be one of: {', '.join(LANES)}")
+
+def check_report_type(report_type: Optional[str]):
+    if report_type is not None:
+        try:
+            generate_user_prompt("", report_type)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+async def startup():
+    """
+    Build the transcription backend and open the job store concurrently, start the job queue, and warm the backend up in the background.
+
+    The server accepts requests as soon as this returns; /ready reports when the warm-up has finished.
+    """
+    global ready, _warm_up_task
+    started = time.perf_counter()
+    queue, *_ = await asyncio.gather(
+        asyncio.to_thread(get_job_queue),
+        asyncio.to_thread(initialize_transcription_backend),
+    )
+    await queue.start()
+    logger.info(f"Started in {time.perf_counter() - started:.3f}s")
+
+    async def warm_up():
+        global ready
+        if not transcription_backend:
+            logger.error("Not ready: the transcription backend could not be initialized")
+            return
+        try:
+            await transcription_backend.warm_up()
+        except Exception as e:
+            logger.error(f"Not ready: warming up the transcription backend failed: {str(e)}", exc_info=True)
+            return
+        ready = True
+        logger.info(f"Ready after {time.perf_counter() - started:.3f}s")
+
+    ready = False
+    _warm_up_task = asyncio.create_task(warm_up())
+
+async def shutdown():
+    global ready, transcription_backend
+    ready = False
+    if _warm_up_task:
+        _warm_up_task.cancel()
+    # Let live streams finish what they have received while the backend is still open
+    await get_session_manager().shutdown()
+    if job_queue:
+        await job_queue.stop()
+    if transcription_backend:
+        await transcription_backend.aclose()
+        transcription_backend = None
+    close_ollama_client()
+    get_transcoder().shutdown()
 
 @app.get("/")
 @limiter.limit("10/minute")
@@ -114,165 +315,159 @@ async def read_root(request: Request):
 @limiter.limit("10/minute")
 async def health_check(request: Request):
     return {
-        "status": "healthy" if groq_client else "unhealthy",
-        "details": "GroqClient not initialized" if not groq_client else None,
+        "status": "healthy" if transcription_backend else "unhealthy",
+        "details": "Transcription backend not initialized" if not transcription_backend else None,
+        "transcription_backend": transcription_backend.name if transcription_backend else None,
         "api_version": "1.0.0",
-        "environment": os.getenv("ENVIRONMENT", "development")
+        "environment": os.getenv("ENVIRONMENT", "development"),
+        "transcription_cache": transcription_cache.stats() if transcription_cache else None,
+        "report_cache": get_response_cache().stats() if get_response_cache() else None,
+        "report_models": get_router().stats(),
+        "transcoder": get_transcoder().stats(),
+        "jobs": await job_queue.stats() if job_queue else None,
+        "streams": get_session_manager().stats(),
+        "upstream": get_scheduler().stats()
     }
 
+@app.get("/ready")
+async def readiness_check():
+    # Unlike /health, which only says the process is up, this fails until the app can serve requests
+    if not ready:
+        return JSONResponse(status_code=503, content={
+            "status": "starting" if transcription_backend else "unavailable",
+            "transcription_backend": transcription_backend.name if transcription_backend else None,
+        })
+    return {"status": "ready", "transcription_backend": transcription_backend.name}
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.post("/api/v1/upload-audio", response_model=TranscriptionResponse)
 @limiter.limit("5/minute")
-async def upload_audio(request: Request, file: UploadFile = File(...), groq_client: GroqClient = Depends(get_groq_client)):
+async def upload_audio(request: Request, file: UploadFile = File(...), backend: TranscriptionBackend = Depends(get_transcription_backend)):
     logger.info(f"Received file: {file.filename}")
     if not allowed_file(file.filename):
         logger.warning(f"Invalid file format: {file.filename}")
         raise HTTPException(status_code=400, detail="Invalid file format. Only supported audio files are allowed.")
     
-    content = await file.read()
-    if len(content) > MAX_FILE_SIZE:
-        logger.warning(f"File size exceeds limit: {len(content)} bytes")
-        raise HTTPException(status_code=400, detail="File size exceeds the maximum limit of 25 MB.")
-    
-    # Save the file temporarily
-    temp_file_path = f"temp_{file.filename}"
-    with open(temp_file_path, "wb") as temp_file:
-        temp_file.write(content)
-    logger.info(f"Temporary file saved: {temp_file_path}")
+    try:
+        with time_stage("upload_read"):
+            audio = await spool_upload(file, max_size=MAX_UPLOAD_SIZE)
+    except UploadTooLargeError as e:
+        logger.warning(f"File size exceeds limit: {e.size} bytes")
+        raise HTTPException(status_code=400, detail=f"File size exceeds the maximum limit of {MAX_UPLOAD_SIZE // (1024 * 1024)} MB.")
+    logger.info(f"Upload buffered: {audio.size} bytes")
     
     try:
         logger.info("Starting transcription")
-        with open(temp_file_path, "rb") as audio_file:
-            transcription = groq_client.transcribe_audio(audio_file, language="en")
-        logger.info("Transcription completed")
-        
-        # Prepare response
-        response = TranscriptionResponse(
-            text=transcription,
-            segments=[]  # Groq API doesn't provide segments, so we're leaving this empty
-        )
+        with time_stage("transcription", model=backend.name):
+            transcription, segments, skipped_seconds = await transcribe_recording(
+                backend, audio, max_request_size=MAX_FILE_SIZE, language="en", transcoder=get_transcoder()
+            )
+        logger.info(f"Transcription completed: {len(segments)} segments, {len(transcription)} characters, {skipped_seconds:.1f}s of silence skipped")
         
-        logger.info(f"Transcription result: {transcription}")
-        logger.info("Returning response")
-        return response
-    except HTTPException as http_exc:
-        if http_exc.status_code == 429:
-            retry_after = http_exc.headers.get("Retry-After", "60")
+        # Serialize here rather than through response_model, so the cost is timed and paid once
+        with time_stage("serialization"):
+            body = TranscriptionResponse(
+                text=transcription,
+                segments=segments,
+                skipped_seconds=round(skipped_seconds, 3)
+            ).model_dump_json()
+        return Response(content=body, media_type="application/json")
+    except AudioDecodeError as e:
+        logger.warning(f"Cannot chunk {file.filename}: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Files over 25 MB must be decodable for chunked transcription: {str(e)}")
+    except Exception as e:
+        # Upstream 429s (groq.RateLimitError once the scheduler's retries are used up) and
+        # HTTPException 429s alike carry how long the client should wait
+        retry_after = retry_after_seconds(e)
+        if retry_after is not None:
             logger.warning(f"Rate limit exceeded. Retry after: {retry_after} seconds")
             return JSONResponse(
                 status_code=429,
-                content={"detail": "Rate limit exceeded", "retry_after": retry_after}
+                content={"detail": "Rate limit exceeded", "retry_after": retry_after},
+                headers={"Retry-After": str(math.ceil(retry_after))},
             )
-        raise
-    except Exception as e:
+        if isinstance(e, HTTPException):
+            raise
         logger.error(f"Transcription failed: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
     finally:
-        # Clean up temporary file
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
-            logger.info(f"Temporary file removed: {temp_file_path}")
+        audio.close()
 
 @app.websocket("/api/v1/stream-audio")
-async def stream_audio(websocket: WebSocket, groq_client: GroqClient = Depends(get_groq_client)):
-    await websocket.accept()
-    temp_file_path = None
-    try:
-        while True:
+async def stream_audio(websocket: WebSocket, backend: TranscriptionBackend = Depends(get_transcription_backend)):
+    async def process(session: StreamSession):
+        transcriber = StreamingTranscriber(backend, language="en")
+
+        async def feed():
+            # Runs alongside the event loop below so new audio keeps arriving while windows are transcribed
             try:
-                audio_chunk = await asyncio.wait_for(websocket.receive_bytes(), timeout=5.0)
-                if not audio_chunk:
+                while (audio_chunk := await session.get()) is not None:
+                    await transcriber.feed(audio_chunk)
+                await transcriber.close()
+            except BaseException:
+                transcriber.cancel()
+                raise
+
+        feeder = asyncio.create_task(feed())
+        try:
+            while True:
+                try:
+                    async for event in transcriber.events():
+                        await session.emit(event)
                     break
-
-                # Convert the audio chunk to WAV format
-                wav_data = io.BytesIO()
-                with wave.open(wav_data, 'wb') as wav_file:
-                    wav_file.setnchannels(1)  # Mono
-                    wav_file.setsampwidth(2)  # 16-bit
-                    wav_file.setframerate(16000)  # 16kHz
-                    wav_file.writeframes(audio_chunk)
-
-                # Create a new temporary file for each chunk
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_file:
-                    temp_file_path = temp_file.name
-                    logger.info(f"Created temporary file: {temp_file_path}")
-                    temp_file.write(wav_data.getvalue())
-                    temp_file.flush()
-
-                # Transcribe the audio chunk
-                with open(temp_file_path, "rb") as audio_file:
-                    transcription = groq_client.transcribe_audio(audio_file, language="en")
-
-                # Send the transcription back to the client
-                if transcription.strip():  # Only send non-empty transcriptions
-                    await websocket.send_json({"status": "success", "transcription": transcription})
-
-                # Clean up temporary file
-                os.remove(temp_file_path)
-                logger.info(f"Temporary file removed: {temp_file_path}")
-
-            except asyncio.TimeoutError:
-                # No data received for 5 seconds, send a keep-alive message
-                await websocket.send_json({"status": "keep-alive"})
-            except HTTPException as http_exc:
-                if http_exc.status_code == 429:
-                    retry_after = http_exc.headers.get("Retry-After", "60")
+                except Exception as e:
+                    retry_after = retry_after_seconds(e)
+                    if retry_after is None:
+                        raise
                     logger.warning(f"Rate limit exceeded. Retry after: {retry_after} seconds")
-                    await websocket.send_json({
+                    await session.emit({
                         "status": "error",
                         "detail": "Rate limit exceeded",
                         "retry_after": retry_after
                     })
-                else:
-                    raise
+            await feeder
+            logger.info(
+                f"Stream finished after {transcriber.windows_submitted} transcription requests, "
+                f"{transcriber.skipped_seconds:.1f}s of silence skipped"
+            )
+            await session.emit({"status": "complete", "skipped_seconds": round(transcriber.skipped_seconds, 3)})
+        finally:
+            feeder.cancel()
+            transcriber.cancel()
 
-    except WebSocketDisconnect:
-        logger.info("WebSocket disconnected")
-    except Exception as e:
-        logger.error(f"Error in WebSocket connection: {str(e)}", exc_info=True)
-        await websocket.send_json({"status": "error", "message": str(e)})
-    finally:
-        # Ensure any remaining temporary file is cleaned up
-        if temp_file_path and os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
-            logger.info(f"Temporary file removed: {temp_file_path}")
+    await get_session_manager().serve(websocket, "/api/v1/stream-audio", process)
 
 @app.websocket("/api/v1/transcribe-stream")
-async def transcribe_stream(websocket: WebSocket):
-    await websocket.accept()
-    try:
-        while True:
-            audio_data = await websocket.receive_bytes()
-            
-            # Save the audio data to a temporary file
-            temp_file_path = "temp_audio.wav"
-            with open(temp_file_path, "wb") as temp_file:
-                temp_file.write(audio_data)
-            
-            try:
-                # Transcribe audio
-                with open(temp_file_path, "rb") as audio_file:
-                    transcription = groq_client.transcribe_audio(audio_file)
-                
+async def transcribe_stream(websocket: WebSocket, backend: TranscriptionBackend = Depends(get_transcription_backend)):
+    async def process(session: StreamSession):
+        try:
+            while (audio_data := await session.get()) is not None:
+                # Skip the API call entirely when a WAV message holds no speech
+                vad = detect_wav_speech(audio_data)
+                if vad is not None and not vad.has_speech:
+                    response = TranscriptionResponse(text="", segments=[], skipped_seconds=round(vad.skipped_seconds, 3))
+                    await session.emit(response.model_dump())
+                    continue
+
+                # Each message is transcribed from memory, so sessions never share files
+                with time_stage("transcription", model=backend.name):
+                    transcription = await backend.transcribe_audio(("audio.wav", audio_data))
+
                 if transcription is None:
                     raise Exception("Transcription failed")
-                
-                # Prepare and send response
+
                 response = TranscriptionResponse(
                     text=transcription,
                     segments=[]  # Groq API doesn't provide segments, so we're leaving this empty
                 )
-                await websocket.send_json(response.dict())
-            finally:
-                # Clean up temporary file
-                if os.path.exists(temp_file_path):
-                    os.remove(temp_file_path)
-            
-            # Small delay to prevent overwhelming the server
-            await asyncio.sleep(0.1)
-    except Exception as e:
-        await websocket.send_json({"error": str(e)})
-    finally:
-        await websocket.close()
+                await session.emit(response.model_dump())
+        except Exception as e:
+            await session.emit({"error": str(e)})
+
+    await get_session_manager().serve(websocket, "/api/v1/transcribe-stream", process)
 
 @app.get("/openapi.json", include_in_schema=False)
 async def get_open_api_endpoint():
@@ -290,10 +485,127 @@ async def get_redoc_documentation():
 @limiter.limit("5/minute")
 async def generate_report_endpoint(request: Request, report_request: ReportRequest):
     try:
-        report = generate_report(report_request.transcription, report_request.report_type)
-        return {"report": report}
+        # The fusion chain blocks on the model calls, so keep it off the event loop
+        return await asyncio.to_thread(
+            update_report, report_request.transcription, report_request.report_type, report_request.report_id
+        )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/v1/generate_report/stream")
+@limiter.limit("5/minute")
+async def generate_report_stream_endpoint(request: Request, report_request: ReportRequest):
+    try:
+        events = stream_report(report_request.transcription, report_request.report_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def server_sent_events():
+        # A sync generator, so Starlette iterates it in a worker thread
+        try:
+            for event in events:
+                yield f"event: {event.pop('event')}\ndata: {json.dumps(event)}\n\n"
+        except Exception as e:
+            logger.error(f"Report streaming failed: {str(e)}", exc_info=True)
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+
+    return StreamingResponse(
+        server_sent_events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/api/v1/jobs/transcription", response_model=JobSubmitResponse, status_code=202)
+@limiter.limit("5/minute")
+async def submit_transcription_job(request: Request, file: UploadFile = File(...), lane: str = "live"):
+    check_lane(lane)
+    if not allowed_file(file.filename):
+        logger.warning(f"Invalid file format: {file.filename}")
+        raise HTTPException(status_code=400, detail="Invalid file format. Only supported audio files are allowed.")
+    try:
+        with time_stage("upload_read"):
+            audio = await spool_upload(file, max_size=MAX_UPLOAD_SIZE)
+    except UploadTooLargeError as e:
+        logger.warning(f"File size exceeds limit: {e.size} bytes")
+        raise HTTPException(status_code=400, detail=f"File size exceeds the maximum limit of {MAX_UPLOAD_SIZE // (1024 * 1024)} MB.")
+    with audio:
+        _, buffer = audio.as_upload()
+        job_id = await asyncio.to_thread(get_job_queue().submit, "transcription", {"filename": audio.filename}, lane, buffer)
+    logger.info(f"Queued transcription job {job_id} ({audio.size} bytes, {lane} lane)")
+    return {"job_id": job_id, "status": "queued"}
+
+@app.post("/api/v1/jobs/report", response_model=JobSubmitResponse, status_code=202)
+@limiter.limit("5/minute")
+async def submit_report_job(request: Request, report_request: ReportRequest, lane: str = "live"):
+    check_lane(lane)
+    check_report_type(report_request.report_type)
+    job_id = await asyncio.to_thread(
+        get_job_queue().submit,
+        "report",
+        {"transcription": report_request.transcription, "report_type": report_request.report_type},
+        lane,
+    )
+    logger.info(f"Queued report job {job_id} ({lane} lane)")
+    return {"job_id": job_id, "status": "queued"}
+
+@app.post("/api/v1/batch", response_model=BatchSubmitResponse, status_code=202)
+@limiter.limit("5/minute")
+async def submit_batch(request: Request, files: List[UploadFile] = File(...), report_type: Optional[str] = Form(None)):
+    # Every file becomes a batch-lane job, so live uploads are never stuck behind a back catalog
+    check_report_type(report_type)
+    job_ids, rejected = [], []
+    for file in files:
+        if not allowed_file(file.filename):
+            rejected.append({"filename": file.filename, "detail": "Invalid file format"})
+            continue
+        try:
+            audio = await spool_upload(file, max_size=MAX_UPLOAD_SIZE)
+        except UploadTooLargeError:
+            rejected.append({"filename": file.filename, "detail": f"File exceeds {MAX_UPLOAD_SIZE // (1024 * 1024)} MB"})
+            continue
+        with audio:
+            _, buffer = audio.as_upload()
+            payload = {"filename": audio.filename, "report_type": report_type}
+            job_ids.append(await asyncio.to_thread(get_job_queue().submit, "transcription", payload, "batch", buffer))
+    logger.info(f"Queued batch of {len(job_ids)} transcription jobs, {len(rejected)} files rejected")
+    return {"job_ids": job_ids, "rejected": rejected}
+
+@app.post("/api/v1/batch/manifest", response_model=BatchSubmitResponse, status_code=202)
+@limiter.limit("5/minute")
+async def submit_batch_manifest(request: Request, manifest: BatchManifest):
+    if not BATCH_ROOT:
+        raise HTTPException(status_code=404, detail="Batch manifests are disabled. Set BATCH_ROOT to enable them.")
+    check_report_type(manifest.report_type)
+    root = os.path.realpath(BATCH_ROOT)
+    job_ids, rejected = [], []
+    for relative_path in manifest.paths:
+        path = os.path.realpath(os.path.join(root, relative_path))
+        if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+            rejected.append({"filename": relative_path, "detail": "File not found"})
+        elif not allowed_file(path):
+            rejected.append({"filename": relative_path, "detail": "Invalid file format"})
+        else:
+            payload = {"filename": os.path.basename(path), "path": path, "report_type": manifest.report_type}
+            job_ids.append(await asyncio.to_thread(get_job_queue().submit, "transcription", payload, "batch"))
+    logger.info(f"Queued manifest of {len(job_ids)} transcription jobs, {len(rejected)} paths rejected")
+    return {"job_ids": job_ids, "rejected": rejected}
+
+@app.get("/api/v1/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, wait: float = 0):
+    # With wait > 0 the request blocks until the job finishes or the wait elapses
+    job = await get_job_queue().wait(job_id, min(max(wait, 0), MAX_JOB_WAIT_SECONDS))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobResponse(
+        job_id=job["id"],
+        kind=job["kind"],
+        lane=job["lane"],
+        status=job["status"],
+        result=job["result"],
+        error=job["error"],
+        created_at=job["created_at"],
+        started_at=job["started_at"],
+        finished_at=job["finished_at"],
+    )
@@ -0,0 +1,275 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Counters, gauges and histograms are kept per label combination behind a lock and
+rendered by GET /metrics. time_stage() times a stage of the hot path (upload read,
+transcription, a report model call, the evaluator, serialization) into one histogram
+labelled by stage and model. With METRICS_ENABLED=false every update returns at once.
+
+profile() runs a single request under pyinstrument (if installed) or cProfile when
+PROFILING_ENABLED is set and the request carries an X-Profile header, and writes the
+profile to PROFILE_DIR.
+"""
+
+import bisect
+import cProfile
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+ENABLED = os.getenv("METRICS_ENABLED", "true").lower() not in ("0", "false", "no")
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join("data", "profiles"))
+PROFILE_HEADER = "X-Profile"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+CONTENT_TYPE = "text/plain; version=0.0.4"  # Starlette appends the charset
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key: Tuple[str, ...], value: Any) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+    def value(self, **labels) -> Any:
+        with self._lock:
+            return self._values.get(self._key(labels))
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def inc(self, amount: float = 1, **labels):
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels) -> Iterator[None]:
+        """Count the block as in progress while it runs."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            sample = self._values.get(key)
+            if sample is None:
+                # Per-bucket counts (the last one is +Inf), sum and count
+                sample = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            sample[0][index] += 1
+            sample[1] += value
+            sample[2] += 1
+
+    def value(self, **labels) -> Optional[Dict[str, float]]:
+        with self._lock:
+            sample = self._values.get(self._key(labels))
+            return {"count": sample[2], "sum": sample[1]} if sample else None
+
+    def _render_sample(self, key: Tuple[str, ...], sample: Any) -> List[str]:
+        counts, total, count = sample
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            le = "+Inf" if bound == float("inf") else _format_value(bound)
+            bucket_labels = _format_labels(self.labelnames, key, 'le="' + le + '"')
+            lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> Any:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by route and status code.", ("method", "endpoint", "status")))
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Time until the response headers were ready, by route.", ("method", "endpoint")))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "HTTP requests being handled."))
+WEBSOCKET_SESSIONS = REGISTRY.register(Gauge(
+    "websocket_sessions_in_flight", "Open WebSocket sessions by route.", ("endpoint",)))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "stage_duration_seconds", "Time spent in each stage of request handling.", ("stage", "model")))
+UPSTREAM_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "upstream_request_duration_seconds", "Calls to upstream model APIs, excluding time queued for budget.", ("model",)))
+UPSTREAM_ERRORS = REGISTRY.register(Counter(
+    "upstream_errors_total", "Failed calls to upstream model APIs, by reason (rate_limited or error).", ("model", "reason")))
+TRANSCODE_BYTES = REGISTRY.register(Counter(
+    "transcode_bytes_total", "Audio bytes decoded from uploads and encoded for upstream requests.", ("direction",)))
+REPORT_UPDATES = REGISTRY.register(Counter(
+    "report_updates_total", "Report requests by how the report was produced (full, incremental or unchanged).", ("mode",)))
+REPORT_CASCADE = REGISTRY.register(Counter(
+    "report_cascade_served_total", "Report model runs in cascade mode, by the model and tier whose answer was used.", ("model", "tier")))
+REPORT_CHUNKS = REGISTRY.register(Counter(
+    "report_chunks_total", "Transcript chunks facts were extracted from, for reports on transcripts too long for one prompt."))
+
+
+@contextmanager
+def time_stage(stage: str, model: str = "") -> Iterator[None]:
+    """Record how long the block takes as one observation of stage_duration_seconds."""
+    if not ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage, model=model)
+
+
+def timed(stage: str) -> Callable[[Callable], Callable]:
+    """Decorator form of time_stage."""
+    def decorator(function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with time_stage(stage):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def render() -> str:
+    """Return every metric in the Prometheus text format."""
+    return REGISTRY.render()
+
+
+_profiling = threading.Lock()
+
+
+def _profile_path(name: str, extension: str) -> str:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    slug = "".join(c if c.isalnum() else "_" for c in name).strip("_") or "root"
+    return os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}-{time.perf_counter_ns() % 1000000}.{extension}")
+
+
+async def profile(name: str, engine: str, run: Callable[[], Any]) -> Tuple[Any, Optional[str]]:
+    """
+    Await run() under a profiler and save the profile.
+
+    Only one request is profiled at a time; while one is, others run unprofiled. Both
+    profilers see everything the event loop thread does meanwhile, so profile on a quiet server.
+
+    Args:
+        name (str): Used in the file name, usually the request path.
+        engine (str): "pyinstrument" or "cprofile"; anything else picks pyinstrument if it is installed.
+        run (Callable[[], Any]): Returns the awaitable to profile.
+
+    Returns:
+        Tuple[Any, Optional[str]]: The result of run() and the profile's path, or None if it was not profiled.
+    """
+    if not _profiling.acquire(blocking=False):
+        return await run(), None
+    try:
+        if engine.lower() != "cprofile":
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                Profiler = None
+            if Profiler is not None:
+                profiler = Profiler(async_mode="enabled")
+                profiler.start()
+                try:
+                    result = await run()
+                finally:
+                    profiler.stop()
+                path = _profile_path(name, "html")
+                with open(path, "w", encoding="utf-8") as output:
+                    output.write(profiler.output_html())
+                return result, path
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            result = await run()
+        finally:
+            profiler.disable()
+        path = _profile_path(name, "prof")
+        profiler.dump_stats(path)
+        return result, path
+    finally:
+        _profiling.release()
@@ -0,0 +1,134 @@
+"""
+Rolling latency and error statistics of the report models, for cascade routing.
+
+In cascade mode (REPORT_ROUTING=cascade) the report models are tried one at a time, in the
+order REPORT_MODELS lists them, which should be cheapest and fastest first. The router
+keeps the outcome of each model's last REPORT_CASCADE_WINDOW runs and adjusts that order
+per request. A model failing more than REPORT_CASCADE_MAX_ERROR_RATE of its recent runs
+is tried after the healthy ones. Once a model has MIN_SAMPLES runs, it is placed among the
+healthy models by its recent p95 latency, fastest first, ahead of the models not yet measured,
+which keep their configured order; and it gets REPORT_CASCADE_LATENCY_FACTOR times that p95
+to answer before the cascade moves on, capped at REPORT_MODEL_TIMEOUT.
+"""
+
+import os
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+REPORT_ROUTING = os.getenv("REPORT_ROUTING", "fusion")  # fusion: every model competes; cascade: escalate on low scores
+REPORT_CASCADE_THRESHOLD = float(os.getenv("REPORT_CASCADE_THRESHOLD", "0.6"))
+REPORT_CASCADE_WINDOW = int(os.getenv("REPORT_CASCADE_WINDOW", "50"))
+REPORT_CASCADE_MAX_ERROR_RATE = float(os.getenv("REPORT_CASCADE_MAX_ERROR_RATE", "0.5"))
+REPORT_CASCADE_LATENCY_FACTOR = float(os.getenv("REPORT_CASCADE_LATENCY_FACTOR", "3"))
+MIN_SAMPLES = 5  # Runs a model needs before its statistics affect routing
+
+
+def _percentile(values: Sequence[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class _ModelWindow:
+    def __init__(self, size: int):
+        self.outcomes: Deque[Tuple[float, bool]] = deque(maxlen=size)  # (seconds, succeeded)
+        self.served = 0
+
+    def error_rate(self) -> float:
+        return sum(1 for _, ok in self.outcomes if not ok) / len(self.outcomes) if self.outcomes else 0.0
+
+    def p95(self) -> Optional[float]:
+        latencies = [seconds for seconds, ok in self.outcomes if ok]
+        return _percentile(latencies, 0.95) if latencies else None
+
+
+class ModelRouter:
+    """
+    Orders the cascade tiers by health and latency, and sets their deadlines, from each model's recent runs.
+
+    Args:
+        window (int): Runs remembered per model.
+        max_error_rate (float): Error rate above which a model is tried after the healthy ones.
+        latency_factor (float): Multiple of a model's recent p95 latency it gets before the cascade moves on.
+    """
+
+    def __init__(self, window: int = REPORT_CASCADE_WINDOW, max_error_rate: float = REPORT_CASCADE_MAX_ERROR_RATE,
+                 latency_factor: float = REPORT_CASCADE_LATENCY_FACTOR):
+        self.window = window
+        self.max_error_rate = max_error_rate
+        self.latency_factor = latency_factor
+        self._models: Dict[str, _ModelWindow] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, model: str) -> _ModelWindow:
+        state = self._models.get(model)
+        if state is None:
+            state = self._models[model] = _ModelWindow(self.window)
+        return state
+
+    def record(self, model: str, seconds: float, succeeded: bool):
+        """Record the outcome of one run of a model; timeouts count as failures."""
+        with self._lock:
+            self._state(model).outcomes.append((seconds, succeeded))
+
+    def record_served(self, model: str):
+        with self._lock:
+            self._state(model).served += 1
+
+    def _unhealthy(self, state: _ModelWindow) -> bool:
+        return len(state.outcomes) >= MIN_SAMPLES and state.error_rate() > self.max_error_rate
+
+    def _measured_p95(self, state: _ModelWindow) -> Optional[float]:
+        return state.p95() if len(state.outcomes) >= MIN_SAMPLES else None
+
+    def order(self, models: List[str]) -> List[int]:
+        """
+        Return the indices of models in the order to try them.
+
+        Healthy models come first: those with MIN_SAMPLES runs by recent p95 latency, then the
+        rest in configured order, so a tier the cascade rarely reaches is not tried early just
+        to measure it. Failing models come last, in the same order.
+        """
+        with self._lock:
+            keys = []
+            for index, model in enumerate(models):
+                state = self._state(model)
+                p95 = self._measured_p95(state)
+                keys.append((self._unhealthy(state), p95 is None, p95 or 0.0, index))
+        return sorted(range(len(models)), key=lambda index: keys[index])
+
+    def timeout(self, model: str, limit: Optional[float]) -> Optional[float]:
+        """Return how long a model gets to answer: a multiple of its recent p95 latency, at most limit."""
+        with self._lock:
+            p95 = self._measured_p95(self._state(model))
+        if p95 is None:
+            return limit
+        deadline = self.latency_factor * p95
+        return deadline if limit is None else min(deadline, limit)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            stats = {}
+            for model, state in self._models.items():
+                p95 = state.p95()
+                stats[model] = {
+                    "runs": len(state.outcomes),
+                    "error_rate": round(state.error_rate(), 3),
+                    "p95_seconds": round(p95, 3) if p95 is not None else None,
+                    "served": state.served,
+                    "healthy": not self._unhealthy(state),
+                }
+            return stats
+
+
+_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> ModelRouter:
+    """Return the process-wide router, configured from the environment on first use."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ModelRouter()
+        return _router
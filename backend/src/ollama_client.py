@@ -1,34 +1,215 @@
-import subprocess
+"""
+Client for a local Ollama server over its HTTP API.
+
+One long-lived client per process holds a pooled keep-alive connection to the server,
+asks Ollama to keep models resident between prompts, streams generated text as it
+arrives, bounds the number of prompts in flight and caches the model list for a short
+TTL. OllamaModel adapts it to the model interface the report FusionChain uses, so
+"ollama/<name>" entries in REPORT_MODELS run against the local server.
+"""
+
 import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+
+DEFAULT_OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+DEFAULT_OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+DEFAULT_OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "2"))
+DEFAULT_OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "300"))
+DEFAULT_MODELS_TTL = float(os.getenv("OLLAMA_MODELS_TTL", "60"))
+
+MODEL_PREFIX = "ollama/"
+
 
 class OllamaClient:
-    def __init__(self):
-        self.base_command = ["ollama"]
+    """
+    Pooled HTTP client for the Ollama API.
+
+    Args:
+        host (str): Base URL of the Ollama server.
+        keep_alive (str): How long Ollama keeps a model loaded after each request, e.g. "30m" or "-1" for ever.
+        max_concurrency (int): Prompts allowed in flight at once; further calls wait for a slot.
+        timeout (float): Seconds to wait for the server between streamed chunks.
+        models_ttl (float): Seconds list_models results are reused.
+    """
+
+    def __init__(
+        self,
+        host: str = DEFAULT_OLLAMA_HOST,
+        keep_alive: str = DEFAULT_OLLAMA_KEEP_ALIVE,
+        max_concurrency: int = DEFAULT_OLLAMA_MAX_CONCURRENCY,
+        timeout: float = DEFAULT_OLLAMA_TIMEOUT,
+        models_ttl: float = DEFAULT_MODELS_TTL,
+    ):
+        self.keep_alive = keep_alive
+        self.max_concurrency = max_concurrency
+        self.models_ttl = models_ttl
+        # One spare connection so list_models never waits behind long generations
+        connections = max_concurrency + 1
+        self.http_client = httpx.Client(
+            base_url=host,
+            limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections),
+            timeout=httpx.Timeout(timeout, connect=5.0),
+        )
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._models: Optional[List[str]] = None
+        self._models_fetched_at = 0.0
+        self._models_lock = threading.Lock()
+
+    def _payload(self, model_name: str, prompt: str, system: Optional[str], stream: bool, options: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        payload = {"model": model_name, "prompt": prompt, "stream": stream, "keep_alive": self.keep_alive}
+        if system:
+            payload["system"] = system
+        if options:
+            payload["options"] = options
+        return payload
 
-    def run_ollama_model(self, model_name, prompt):
-        command = self.base_command + ["run", model_name, prompt]
+    def generate(self, model_name: str, prompt: str, system: Optional[str] = None, options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Return the full completion of a prompt.
+
+        Raises:
+            httpx.HTTPError: If the server cannot be reached or answers with an error status.
+        """
+        with self._slots:
+            response = self.http_client.post("/api/generate", json=self._payload(model_name, prompt, system, False, options))
+            response.raise_for_status()
+            return response.json().get("response", "")
+
+    def stream(self, model_name: str, prompt: str, system: Optional[str] = None, options: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """
+        Yield the completion of a prompt chunk by chunk as the server produces it.
+
+        The concurrency slot is held until the stream is exhausted or closed.
+
+        Raises:
+            httpx.HTTPError: If the server cannot be reached or answers with an error status.
+            RuntimeError: If the server reports an error mid-stream.
+        """
+        with self._slots:
+            payload = self._payload(model_name, prompt, system, True, options)
+            with self.http_client.stream("POST", "/api/generate", json=payload) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if "error" in chunk:
+                        raise RuntimeError(f"Ollama error: {chunk['error']}")
+                    if chunk.get("response"):
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        return
+
+    def run_ollama_model(self, model_name: str, prompt: str) -> Optional[str]:
         try:
-            result = subprocess.run(command, capture_output=True, text=True, check=True)
-            return result.stdout.strip()
-        except subprocess.CalledProcessError as e:
+            return self.generate(model_name, prompt).strip()
+        except httpx.HTTPError as e:
             print(f"Error running Ollama model: {e}")
             return None
 
-    def list_models(self):
-        command = self.base_command + ["list"]
-        try:
-            result = subprocess.run(command, capture_output=True, text=True, check=True)
-            models = [line.split()[0] for line in result.stdout.strip().split('\n')[1:]]
-            return models
-        except subprocess.CalledProcessError as e:
-            print(f"Error listing Ollama models: {e}")
-            return []
-
-    def switch_model(self, model_name):
-        # In Ollama, switching models is just a matter of using a different model name
-        # We'll just check if the model exists
-        if model_name in self.list_models():
-            return True
-        else:
+    def list_models(self, refresh: bool = False) -> List[str]:
+        """Return the names of the installed models, reusing the last answer for models_ttl seconds."""
+        with self._models_lock:
+            if not refresh and self._models is not None and time.monotonic() - self._models_fetched_at < self.models_ttl:
+                return list(self._models)
+            try:
+                response = self.http_client.get("/api/tags")
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                print(f"Error listing Ollama models: {e}")
+                return []
+            self._models = [model["name"] for model in response.json().get("models", [])]
+            self._models_fetched_at = time.monotonic()
+            return list(self._models)
+
+    def load_model(self, model_name: str):
+        """Load a model into memory ahead of its first prompt."""
+        with self._slots:
+            response = self.http_client.post("/api/generate", json={"model": model_name, "keep_alive": self.keep_alive})
+            response.raise_for_status()
+
+    def switch_model(self, model_name: str) -> bool:
+        # Check the (cached) model list, then load the model so the next prompt finds it resident
+        if model_name not in self.list_models():
             print(f"Model {model_name} not found")
             return False
+        try:
+            self.load_model(model_name)
+        except httpx.HTTPError as e:
+            print(f"Error loading Ollama model: {e}")
+            return False
+        return True
+
+    def close(self):
+        self.http_client.close()
+
+
+class OllamaResponse:
+    """A prompt response with the text() and iteration interface of llm responses."""
+
+    def __init__(self, client: OllamaClient, model_name: str, prompt: str, system: Optional[str]):
+        self.client = client
+        self.model_name = model_name
+        self.prompt = prompt
+        self.system = system
+        self._text: Optional[str] = None
+
+    def __iter__(self) -> Iterator[str]:
+        if self._text is not None:
+            yield self._text
+            return
+        chunks = []
+        for chunk in self.client.stream(self.model_name, self.prompt, system=self.system):
+            chunks.append(chunk)
+            yield chunk
+        self._text = "".join(chunks)
+
+    def text(self) -> str:
+        if self._text is None:
+            self._text = self.client.generate(self.model_name, self.prompt, system=self.system)
+        return self._text
+
+
+class OllamaModel:
+    """
+    A local Ollama model usable wherever the report pipeline expects an llm model.
+
+    Args:
+        model_name (str): The Ollama model name, e.g. "llama3.1:8b".
+        client (Optional[OllamaClient]): Defaults to the process-wide client.
+    """
+
+    def __init__(self, model_name: str, client: Optional[OllamaClient] = None):
+        self.model_name = model_name
+        self.model_id = MODEL_PREFIX + model_name
+        self.client = client or get_client()
+
+    def prompt(self, prompt: str, system: Optional[str] = None) -> OllamaResponse:
+        return OllamaResponse(self.client, self.model_name, prompt, system)
+
+
+_client: Optional[OllamaClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> OllamaClient:
+    """Return the process-wide OllamaClient, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OllamaClient()
+        return _client
+
+
+def close_client():
+    """Close the process-wide OllamaClient if one was created; the next get_client() creates a new one."""
+    global _client
+    with _client_lock:
+        client, _client = _client, None
+    if client is not None:
+        client.close()
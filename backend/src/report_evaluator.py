@@ -0,0 +1,202 @@
+"""
+Scoring of candidate reports against the example report.
+
+ReportTemplate parses the example once: its section headings, its "**Field:** value"
+labels and a TF-IDF vector of its word unigrams and bigrams, with IDF taken over the
+example's own lines so boilerplate shared by many lines counts for less. Candidates are
+then scored together, with their term counts gathered into one matrix, on four
+dimensions between 0 and 1:
+
+- similarity: cosine similarity of TF-IDF vectors, insensitive to whitespace, case and punctuation
+- section_coverage: share of the example's sections the candidate contains
+- field_completeness: share of the example's fields the candidate fills in ("Not provided" counts half)
+- fidelity: agreement of the numbers and proper nouns in the candidate with the transcript
+
+The overall score is a weighted mean of the dimensions; fidelity is left out when no
+transcript is given.
+"""
+
+import functools
+import itertools
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+WEIGHTS = {"similarity": 0.3, "section_coverage": 0.2, "field_completeness": 0.3, "fidelity": 0.2}
+DIMENSIONS = list(WEIGHTS)
+
+TOKEN = re.compile(r"[a-z0-9]+|\n")
+PUNCTUATION = str.maketrans({character: " " for character in "!\"#$%&'()*+,-./:;<=>?@[\\]^_`{|}~"})
+FACT = re.compile(r"[0-9]+|[A-Z][A-Za-z'-]+")
+HEADING = re.compile(r"^\s*(?:#+\s*(.+?)|\*\*([^*]+?)\*\*)\s*:?\s*$")
+BOLD_FIELD = re.compile(r"\*\*([^*:\n]{1,80}):\*\*[ \t]*([^*\n]*)")
+FIELD = re.compile(r"^[\s>#-]*([^:*]{1,80}?)\s*:\s*(.*?)\s*$")
+PLACEHOLDERS = {"not provided", "n a", "na", "unknown", "none", "not applicable", "not available", "tbd"}
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "from", "he", "her", "his", "i", "if", "in",
+    "is", "it", "its", "my", "no", "not", "of", "on", "or", "our", "she", "so", "that", "the", "their", "then",
+    "there", "they", "this", "to", "uh", "um", "was", "we", "were", "what", "when", "where", "which", "who",
+    "with", "yes", "you", "okay", "ok", "mr", "mrs", "ms",
+}
+
+
+def _tokens(text: str) -> List[str]:
+    """Lowercase words, with "\\n" marking line breaks."""
+    return TOKEN.findall(text.lower())
+
+
+def _terms(tokens: List[str]) -> List[str]:
+    """Unigrams and the bigrams within each line."""
+    words = [token for token in tokens if token != "\n"]
+    return words + [f"{first} {second}" for first, second in zip(tokens, tokens[1:]) if first != "\n" and second != "\n"]
+
+
+@functools.lru_cache(maxsize=4096)
+def _label(text: str) -> str:
+    return " ".join(text.lower().translate(PUNCTUATION).split())
+
+
+def _fields(text: str, bold_only: bool = False) -> Dict[str, str]:
+    """Map each normalized "**Label:** value" (or plain "Label: value") label in a report to its value."""
+    fields = {}
+
+    def add(label: str, value: str):
+        label = _label(label)
+        value = value.strip(" -")
+        if label and (value or label not in fields):
+            fields[label] = value
+
+    matches = BOLD_FIELD.findall(text)
+    for label, value in matches:
+        add(label, value)
+    if not matches and not bold_only:
+        # A report written without Markdown emphasis
+        for line in text.split("\n"):
+            match = FIELD.match(line)
+            if match:
+                add(match.group(1), match.group(2))
+    return fields
+
+
+def _facts(text: str, ignore: Set[str]) -> Set[str]:
+    return {fact for fact in (match.lower() for match in FACT.findall(text)) if fact not in STOPWORDS and fact not in ignore}
+
+
+class ReportTemplate:
+    """
+    The example report, preprocessed for scoring candidates against it.
+
+    Args:
+        text (str): The example report in Markdown.
+    """
+
+    def __init__(self, text: str):
+        lines = [line for line in text.split("\n") if line.strip()]
+
+        self.sections = []
+        for line in lines:
+            match = HEADING.match(line)
+            if match:
+                label = _label(match.group(1) or match.group(2))
+                if label and label not in self.sections:
+                    self.sections.append(label)
+        self.fields = [label for label, value in _fields(text, bold_only=True).items() if value]
+        self.label_words = {word for label in self.sections + self.fields for word in label.split()}
+
+        # IDF over the template's lines; terms the template lacks get the highest weight
+        line_terms = [_terms(_tokens(line)) for line in lines]
+        document_frequency = Counter(term for terms in line_terms for term in set(terms))
+        documents = max(len(lines), 1)
+        self.vocabulary = {term: index for index, term in enumerate(sorted(document_frequency))}
+        self.idf = np.array([
+            math.log((1 + documents) / (1 + document_frequency[term])) + 1 for term in sorted(document_frequency)
+        ])
+        self.unknown_idf = math.log(1 + documents) + 1
+        counts = np.zeros(len(self.vocabulary))
+        for term, count in Counter(term for terms in line_terms for term in terms).items():
+            counts[self.vocabulary[term]] = count
+        self.vector = self._weigh(counts) * self.idf
+        self.vector /= np.linalg.norm(self.vector) or 1.0
+
+    @staticmethod
+    def _weigh(counts: np.ndarray) -> np.ndarray:
+        # Sublinear term frequency, so a repeated phrase does not dominate
+        weighted = np.zeros_like(counts, dtype=float)
+        present = counts > 0
+        weighted[present] = 1 + np.log(counts[present])
+        return weighted
+
+    def _similarity(self, term_lists: List[List[str]]) -> np.ndarray:
+        counts = np.zeros((len(term_lists), len(self.vocabulary)))
+        unknown_norms = np.zeros(len(term_lists))
+        for row, terms in enumerate(term_lists):
+            term_counts = Counter(terms)
+            indices = np.fromiter(map(self.vocabulary.get, term_counts, itertools.repeat(-1)), dtype=np.int64, count=len(term_counts))
+            values = np.fromiter(term_counts.values(), dtype=float, count=len(term_counts))
+            known = indices >= 0
+            counts[row, indices[known]] = values[known]
+            unknown_norms[row] = np.sum((self._weigh(values[~known]) * self.unknown_idf) ** 2)
+
+        weights = self._weigh(counts) * self.idf
+        norms = np.sqrt(np.sum(weights ** 2, axis=1) + unknown_norms)
+        norms[norms == 0] = 1.0
+        return weights @ self.vector / norms
+
+    def score(self, outputs: List[str], transcription: Optional[str] = None) -> Dict[str, List[float]]:
+        """
+        Score candidate reports.
+
+        Args:
+            outputs (List[str]): The candidate reports.
+            transcription (Optional[str]): The transcript the reports were written from, for the fidelity dimension.
+
+        Returns:
+            Dict[str, List[float]]: The overall "score" and each dimension's score, one entry per candidate.
+        """
+        if not outputs:
+            return {name: [] for name in ["score"] + DIMENSIONS}
+        texts = [output if isinstance(output, str) else str(output) for output in outputs]
+
+        scores = np.zeros((len(texts), len(DIMENSIONS)))
+        tokens = [_tokens(text) for text in texts]
+        scores[:, 0] = self._similarity([_terms(candidate) for candidate in tokens])
+
+        for row, (text, candidate) in enumerate(zip(texts, tokens)):
+            padded = " " + " ".join(candidate).replace(" \n ", " ") + " "
+            if self.sections:
+                scores[row, 1] = sum(f" {section} " in padded for section in self.sections) / len(self.sections)
+            if self.fields:
+                fields = _fields(text)
+                filled = 0.0
+                for label in self.fields:
+                    value = fields.get(label)
+                    if value:
+                        filled += 0.5 if _label(value) in PLACEHOLDERS else 1.0
+                scores[row, 2] = filled / len(self.fields)
+
+        weights = np.array([WEIGHTS[name] for name in DIMENSIONS])
+        if transcription:
+            transcript_facts = _facts(transcription, self.label_words)
+            for row, text in enumerate(texts):
+                report_facts = _facts(text, self.label_words)
+                recall = len(report_facts & transcript_facts) / len(transcript_facts) if transcript_facts else 1.0
+                precision = len(report_facts & transcript_facts) / len(report_facts) if report_facts else 0.0
+                scores[row, 3] = (recall + precision) / 2
+        else:
+            weights[3] = 0.0
+
+        overall = np.clip(scores, 0.0, 1.0) @ weights / weights.sum()
+        result = {"score": overall.round(4).tolist()}
+        for column, name in enumerate(DIMENSIONS):
+            result[name] = scores[:, column].round(4).tolist() if name != "fidelity" or transcription else [None] * len(texts)
+        return result
+
+
+def choose(outputs: List[str], scores: Iterable[float]) -> Tuple[int, str]:
+    """Return the index and text of the best-scoring output; ties go to the earliest."""
+    scores = list(scores)
+    top_index = scores.index(max(scores))
+    return top_index, outputs[top_index]
@@ -0,0 +1,232 @@
+"""
+Map-reduce report generation for transcripts too long for one prompt.
+
+A long transcript is split at sentence boundaries into chunks of at most REPORT_CHUNK_TOKENS
+estimated tokens, each starting with the last REPORT_CHUNK_OVERLAP_TOKENS of the one before
+it, so a fact stated across a boundary is whole in at least one chunk. The models extract
+the people, times, locations and events of every chunk as JSON, all chunks at once. The
+facts are merged in transcript order, with the duplicates the overlap and repeated mentions
+produce folded together, and the report is written from the merged fact sheet instead of
+the transcript, so no prompt grows with the length of the recording.
+"""
+
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional, Set, Union
+
+from .report_sections import _words, split_sentences
+from .scheduler import estimate_tokens
+
+FACT_KINDS = ("people", "times", "locations", "events")
+CHARS_PER_TOKEN = 4  # The estimate scheduler.estimate_tokens uses
+DUPLICATE_SIMILARITY = 0.7  # Share of distinctive words two facts must share to be merged
+GROUNDED_SHARE = 0.5  # Share of a fact's distinctive words that must appear in its chunk
+JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+
+# Transcripts estimated above REPORT_MAP_REDUCE_TOKENS tokens are reported through a fact sheet
+REPORT_MAP_REDUCE_TOKENS = int(os.getenv("REPORT_MAP_REDUCE_TOKENS", "4000"))
+REPORT_CHUNK_TOKENS = int(os.getenv("REPORT_CHUNK_TOKENS", "2000"))
+REPORT_CHUNK_OVERLAP_TOKENS = int(os.getenv("REPORT_CHUNK_OVERLAP_TOKENS", "200"))
+REPORT_MAP_WORKERS = int(os.getenv("REPORT_MAP_WORKERS", "8"))
+
+Facts = Dict[str, List[Any]]
+
+
+def needs_map_reduce(transcription: str, max_tokens: int = REPORT_MAP_REDUCE_TOKENS) -> bool:
+    """Whether a transcript is too long to send to the report models in full."""
+    return max_tokens > 0 and estimate_tokens(transcription) > max_tokens
+
+
+def _pieces(transcription: str, max_chars: int) -> List[str]:
+    """Sentences, with any longer than max_chars split between words."""
+    pieces = []
+    for sentence in split_sentences(transcription):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars + 1)
+            cut = cut if cut > 0 else max_chars
+            pieces.append(sentence[:cut])
+            sentence = sentence[cut:].lstrip()
+        if sentence:
+            pieces.append(sentence)
+    return pieces
+
+
+def split_transcript(transcription: str, max_tokens: int = REPORT_CHUNK_TOKENS,
+                     overlap_tokens: int = REPORT_CHUNK_OVERLAP_TOKENS) -> List[str]:
+    """
+    Split a transcript into overlapping chunks of whole sentences.
+
+    Args:
+        transcription (str): The transcript.
+        max_tokens (int): Largest estimated size of a chunk.
+        overlap_tokens (int): Estimated size of the sentences each chunk repeats from the end of the previous one.
+
+    Returns:
+        List[str]: The chunks in transcript order, sentences joined by spaces.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    overlap_chars = min(overlap_tokens, max_tokens // 2) * CHARS_PER_TOKEN
+    chunks = []
+    current: List[str] = []
+    size = 0
+    for piece in _pieces(transcription, max_chars):
+        if current and size + 1 + len(piece) > max_chars:
+            chunks.append(" ".join(current))
+            overlap, overlap_size = [], 0
+            for sentence in reversed(current):
+                if overlap_size + len(sentence) + 1 > overlap_chars or overlap_size + len(sentence) + 1 + len(piece) > max_chars:
+                    break
+                overlap.insert(0, sentence)
+                overlap_size += len(sentence) + 1
+            current, size = overlap, overlap_size
+        current.append(piece)
+        size += len(piece) + 1
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def _clean(value: Any) -> Optional[str]:
+    if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+        text = " ".join(str(value).split())
+        return text or None
+    return None
+
+
+def parse_facts(output: Union[str, Dict[str, Any]]) -> Optional[Facts]:
+    """
+    Parse the JSON fact list a model returned for one chunk.
+
+    Code fences and any text around the JSON object are ignored, as are entries of the wrong shape.
+    Outputs the fusion chain has already decoded from JSON are accepted as they are.
+
+    Returns:
+        Optional[Facts]: "people" as {"name", "details"} dicts and the other kinds as strings,
+        or None if the output holds no JSON object.
+    """
+    data = output
+    if not isinstance(data, dict):
+        match = JSON_OBJECT.search(output or "")
+        if not match:
+            return None
+        try:
+            data = json.loads(match.group(0))
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(data, dict):
+            return None
+
+    facts: Facts = {kind: [] for kind in FACT_KINDS}
+    for entry in data.get("people") or []:
+        if isinstance(entry, dict):
+            name = _clean(entry.get("name"))
+            details = entry.get("details") or []
+            details = [details] if isinstance(details, str) else details
+            details = [text for text in map(_clean, details if isinstance(details, list) else []) if text]
+        else:
+            name, details = _clean(entry), []
+        if name:
+            facts["people"].append({"name": name, "details": details})
+    for kind in FACT_KINDS[1:]:
+        entries = data.get(kind) or []
+        facts[kind] = [text for text in map(_clean, entries if isinstance(entries, list) else []) if text]
+    return facts
+
+
+def _fact_texts(facts: Facts) -> List[str]:
+    texts = []
+    for person in facts["people"]:
+        texts.append(person["name"])
+        texts.extend(person["details"])
+    for kind in FACT_KINDS[1:]:
+        texts.extend(facts[kind])
+    return texts
+
+
+def count_grounded(facts: Optional[Facts], chunk: str) -> int:
+    """Number of facts whose distinctive words mostly appear in the chunk they were extracted from."""
+    if not facts:
+        return 0
+    chunk_words = _words(chunk)
+    grounded = 0
+    for text in _fact_texts(facts):
+        words = _words(text)
+        if words and len(words & chunk_words) >= GROUNDED_SHARE * len(words):
+            grounded += 1
+    return grounded
+
+
+def _similar(a: Set[str], b: Set[str]) -> bool:
+    if not a or not b:
+        return False
+    shared = len(a & b)
+    # One fact restating a shorter one in more detail counts as the same fact
+    return shared == min(len(a), len(b)) or shared >= DUPLICATE_SIMILARITY * len(a | b)
+
+
+def _merge_texts(merged: List[str], texts: List[str]):
+    """Append texts that are not near duplicates of earlier ones, keeping the more detailed wording of each."""
+    for text in texts:
+        words = _words(text) or {text.lower()}
+        for index, existing in enumerate(merged):
+            if _similar(words, _words(existing) or {existing.lower()}):
+                if len(text) > len(existing):
+                    merged[index] = text
+                break
+        else:
+            merged.append(text)
+
+
+def _same_person(a: str, b: str) -> bool:
+    a_words, b_words = set(a.lower().split()), set(b.lower().split())
+    # "SMITH" alone could be anyone of that name; "John SMITH" and "John Allan SMITH" are one person
+    return a_words == b_words or (min(len(a_words), len(b_words)) >= 2 and (a_words <= b_words or b_words <= a_words))
+
+
+def merge_facts(chunk_facts: List[Optional[Facts]]) -> Facts:
+    """
+    Merge the facts of every chunk in transcript order, folding duplicates together.
+
+    People with the same name, or one name contained in the other, become one entry with the
+    longer name and the details of both. Other facts sharing most of their distinctive words
+    are kept once, in the more detailed wording, at the position of the first mention.
+    """
+    merged: Facts = {kind: [] for kind in FACT_KINDS}
+    for facts in chunk_facts:
+        if not facts:
+            continue
+        for person in facts["people"]:
+            for existing in merged["people"]:
+                if _same_person(existing["name"], person["name"]):
+                    if len(person["name"]) > len(existing["name"]):
+                        existing["name"] = person["name"]
+                    _merge_texts(existing["details"], person["details"])
+                    break
+            else:
+                details: List[str] = []
+                _merge_texts(details, person["details"])
+                merged["people"].append({"name": person["name"], "details": details})
+        for kind in FACT_KINDS[1:]:
+            _merge_texts(merged[kind], facts[kind])
+    return merged
+
+
+def format_fact_sheet(facts: Facts, chunk_count: int) -> str:
+    """Render merged facts as the text the report models are given in place of the transcript."""
+    lines = [
+        f"FACT SHEET: The transcription was too long to include in full, so these facts were extracted "
+        f"from its {chunk_count} parts. Events are listed in the order they occur in the transcription.",
+    ]
+    headings = {"people": "PEOPLE", "times": "TIMES", "locations": "LOCATIONS", "events": "EVENTS"}
+    for kind in FACT_KINDS:
+        lines.append("")
+        lines.append(headings[kind])
+        if not facts[kind]:
+            lines.append("- None mentioned")
+        for entry in facts[kind]:
+            if kind == "people":
+                lines.append(f"- {entry['name']}" + (f": {'; '.join(entry['details'])}" if entry["details"] else ""))
+            else:
+                lines.append(f"- {entry}")
+    return "\n".join(lines)
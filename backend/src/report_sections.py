@@ -0,0 +1,291 @@
+"""
+Incremental regeneration of reports after transcript edits.
+
+A report is split into units at the headings of the report format in USER_PROMPT.md
+("**Persons Details:**", "**Narrative:**", "**End of Report**", ...), with the header fields
+above the first heading as a unit of their own and each paragraph of the narrative as a
+separate unit. Each unit records the transcript sentences that fed it, meaning those
+sharing enough of its distinctive words and numbers. When the transcript is edited, the old
+and new sentences are diffed. Only the units that used a word the edit removed, or else the
+unit the edited sentence fed most, go back to the models; the rest of the stored report is
+reused verbatim.
+"""
+
+import difflib
+import os
+import re
+import threading
+import uuid
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+from .report_evaluator import HEADING, STOPWORDS, TOKEN
+
+HEADER = "header"  # Key of the fields above the first heading
+PROSE_SECTION = "narrative"  # Split into one unit per paragraph; takes edits that match no unit
+SENTENCE = re.compile(r"(?<=[.!?])\s+|\s*\n\s*")
+MARKER = re.compile(r"^[ \t]*===[ \t]*(.+?)[ \t]*===[ \t]*$", re.MULTILINE)
+FENCE = re.compile(r"^[ \t]*```[a-z]*[ \t]*$\n?", re.MULTILINE)
+MAX_UNIT_FREQUENCY = 3  # Words in more units than this are too common to tie an edit to a unit
+CONTEXT_SENTENCES = 1  # Unchanged sentences shown on each side of an edit
+
+# Largest share of transcript sentences an edit may touch before the whole report is regenerated
+REPORT_INCREMENTAL_MAX_CHANGE = float(os.getenv("REPORT_INCREMENTAL_MAX_CHANGE", "0.3"))
+
+Sections = List[Tuple[str, str]]
+
+
+def _words(text: str) -> Set[str]:
+    """Numbers and distinctive words of a sentence or unit."""
+    return {
+        token for token in TOKEN.findall(text.lower())
+        if token != "\n" and token not in STOPWORDS and (len(token) > 2 or token.isdigit())
+    }
+
+
+def split_sentences(transcription: str) -> List[str]:
+    """Split a transcript into sentences at terminal punctuation and line breaks."""
+    return [sentence for sentence in SENTENCE.split(transcription.strip()) if sentence]
+
+
+def split_sections(report: str) -> Sections:
+    """
+    Split a report into (key, text) units at its headings and narrative paragraphs.
+
+    The key is the normalized heading ("persons details"), with " #2", " #3"... appended to
+    repeated headings, HEADER for any text above the first heading, and "narrative 2",
+    "narrative 3"... for the narrative's paragraphs after the first. Joining the texts gives
+    back the report unchanged.
+
+    Args:
+        report (str): The report in Markdown.
+
+    Returns:
+        Sections: The units in report order.
+    """
+    sections = []
+    seen = {}
+    key, lines = HEADER, []
+    prose, paragraphs = None, 0
+    for line in report.splitlines(keepends=True):
+        match = HEADING.match(line)
+        if match:
+            label = " ".join(token for token in TOKEN.findall((match.group(1) or match.group(2)).lower()) if token != "\n")
+            seen[label] = seen.get(label, 0) + 1
+            if lines:
+                sections.append((key, "".join(lines)))
+            key, lines = label if seen[label] == 1 else f"{label} #{seen[label]}", []
+            prose, paragraphs = (key if label == PROSE_SECTION else None), 0
+        elif prose and line.strip():
+            paragraphs += 1
+            if paragraphs > 1:
+                sections.append((key, "".join(lines)))
+                key, lines = f"{prose} {paragraphs}", []
+        lines.append(line)
+    if lines:
+        sections.append((key, "".join(lines)))
+    return sections
+
+
+def _label_words(sections: Sections) -> Set[str]:
+    return {word for key, _ in sections for word in key.split() if not word.startswith("#") and not word.isdigit()}
+
+
+def _overlap(words: Set[str], unit_words: Set[str], frequency: Counter) -> float:
+    """Shared words, each weighted by one over the number of units it appears in."""
+    return sum(1 / frequency[word] for word in words & unit_words)
+
+
+def map_sources(sections: Sections, sentences: List[str]) -> Dict[str, List[int]]:
+    """
+    Map each unit to the indices of the transcript sentences that fed it.
+
+    A sentence feeds a unit when its shared words add up to at least one word found in no
+    other unit, so a name or year repeated throughout the report does not tie it to every unit.
+
+    Args:
+        sections (Sections): The report's units.
+        sentences (List[str]): The transcript's sentences.
+
+    Returns:
+        Dict[str, List[int]]: Sentence indices by unit key.
+    """
+    ignore = _label_words(sections)
+    unit_words = {key: _words(text) - ignore for key, text in sections}
+    frequency = Counter(word for words in unit_words.values() for word in words)
+    sentence_words = [_words(sentence) for sentence in sentences]
+    return {
+        key: [index for index, words in enumerate(sentence_words) if _overlap(words, unit_words[key], frequency) >= 1]
+        for key, _ in sections
+    }
+
+
+def format_sections(sections: Sections, keys: List[str]) -> str:
+    """Render the given units for a prompt, each under a "=== key ===" marker line."""
+    texts = dict(sections)
+    return "\n\n".join(f"=== {key} ===\n{texts[key].strip()}" for key in keys)
+
+
+def splice(sections: Sections, keys: List[str], updated: str) -> Optional[str]:
+    """
+    Replace the given units of a report with those a model returned under their marker lines.
+
+    Args:
+        sections (Sections): The report's units.
+        keys (List[str]): Keys of the units that were regenerated.
+        updated (str): The model's output, in the format of format_sections().
+
+    Returns:
+        Optional[str]: The spliced report, or None if the output lacks a requested unit.
+    """
+    updated = FENCE.sub("", updated)
+    markers = list(MARKER.finditer(updated))
+    returned = {
+        match.group(1).lower(): updated[match.end():markers[index + 1].start() if index + 1 < len(markers) else len(updated)].strip()
+        for index, match in enumerate(markers)
+    }
+    if any(not returned.get(key) for key in keys):
+        return None
+
+    parts = []
+    for key, text in sections:
+        if key in keys:
+            # Keep the spacing between units as it was
+            text = returned[key] + text[len(text.rstrip()):]
+        parts.append(text)
+    return "".join(parts)
+
+
+class ReportUpdate:
+    """
+    The units a transcript edit affects, and what to show the models about it.
+
+    Attributes:
+        keys (List[str]): Keys of the units to regenerate, in report order.
+        changes (List[Tuple[str, str]]): Each edit as (old text, new text); either may be empty.
+        excerpt (List[str]): The edited sentences of the new transcript with their neighbours.
+    """
+
+    def __init__(self, keys: List[str], changes: List[Tuple[str, str]], excerpt: List[str]):
+        self.keys = keys
+        self.changes = changes
+        self.excerpt = excerpt
+
+
+class StoredReport:
+    """
+    A generated report with the transcript it was generated from.
+
+    Args:
+        transcription (str): The transcript.
+        report_type (str): The type of the report.
+        report (str): The report.
+    """
+
+    def __init__(self, transcription: str, report_type: str, report: str):
+        self.transcription = transcription
+        self.report_type = report_type
+        self.report = report
+        self.sentences = split_sentences(transcription)
+        self.sections = split_sections(report)
+        self.sources = map_sources(self.sections, self.sentences)
+        ignore = _label_words(self.sections)
+        self._unit_words = {key: _words(text) - ignore for key, text in self.sections}
+        self._frequency = Counter(word for words in self._unit_words.values() for word in words)
+
+    def splice(self, keys: List[str], updated: str) -> Optional[str]:
+        """Replace the given units with those in a model's output; see splice()."""
+        return splice(self.sections, keys, updated)
+
+    def _fallback(self) -> str:
+        prose = [key for key, _ in self.sections if key.startswith(PROSE_SECTION)]
+        return prose[-1] if prose else max(self.sources, key=lambda key: len(self.sources[key]))
+
+    def _affected(self, old: List[str], new: List[str], neighbours: range) -> Set[str]:
+        old_words, new_words = _words(" ".join(old)), _words(" ".join(new))
+        # Units that used a fact the edit removed
+        removed = {word for word in old_words - new_words if self._frequency[word] <= MAX_UNIT_FREQUENCY}
+        hits = {key for key, words in self._unit_words.items() if removed & words}
+        if hits:
+            return hits
+        # Otherwise the unit the edited (or, for an insertion, neighbouring) sentences fed most
+        candidates = [key for key, indices in self.sources.items() if any(index in neighbours for index in indices)]
+        scores = {key: _overlap(old_words | new_words, self._unit_words[key], self._frequency) for key in candidates}
+        if scores and max(scores.values()) > 0:
+            return {max(scores, key=scores.get)}
+        return {self._fallback()}
+
+    def plan(self, transcription: str) -> Optional[ReportUpdate]:
+        """
+        Work out which units an edited transcript affects.
+
+        Args:
+            transcription (str): The edited transcript.
+
+        Returns:
+            Optional[ReportUpdate]: The units to regenerate (none if the sentences are unchanged),
+            or None if the edit is too large for an incremental update.
+        """
+        sentences = split_sentences(transcription)
+        if sentences == self.sentences:
+            return ReportUpdate(keys=[], changes=[], excerpt=[])
+        keys = {key for key, _ in self.sections}
+        if not self.sentences or not sentences or keys == {HEADER}:
+            return None
+
+        affected, changes, excerpt_indices = set(), [], set()
+        changed = 0
+        matcher = difflib.SequenceMatcher(None, self.sentences, sentences, autojunk=False)
+        for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+            if tag == "equal":
+                continue
+            changed += max(old_end - old_start, new_end - new_start)
+            neighbours = range(old_start, old_end) if old_end > old_start else range(old_start - 1, old_start + 1)
+            affected |= self._affected(self.sentences[old_start:old_end], sentences[new_start:new_end], neighbours)
+            changes.append((" ".join(self.sentences[old_start:old_end]), " ".join(sentences[new_start:new_end])))
+            excerpt_indices.update(range(max(new_start - CONTEXT_SENTENCES, 0), min(new_end + CONTEXT_SENTENCES, len(sentences))))
+
+        if changed > REPORT_INCREMENTAL_MAX_CHANGE * max(len(self.sentences), len(sentences)) or affected == keys:
+            return None
+        return ReportUpdate(
+            keys=[key for key, _ in self.sections if key in affected],
+            changes=changes,
+            excerpt=[sentences[index] for index in sorted(excerpt_indices)],
+        )
+
+
+class ReportStore:
+    """
+    In-memory LRU store of generated reports, keyed by report id.
+
+    Args:
+        max_entries (int): Reports kept; the least recently used are dropped first.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._reports = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "ReportStore":
+        return cls(max_entries=int(os.getenv("REPORT_STORE_SIZE", "256")))
+
+    def get(self, report_id: str) -> Optional[StoredReport]:
+        with self._lock:
+            stored = self._reports.get(report_id)
+            if stored is not None:
+                self._reports.move_to_end(report_id)
+            return stored
+
+    def put(self, stored: StoredReport, report_id: Optional[str] = None) -> str:
+        """Store a report, under a new id unless one is given, and return its id."""
+        report_id = report_id or uuid.uuid4().hex
+        if self.max_entries <= 0:
+            return report_id
+        with self._lock:
+            self._reports[report_id] = stored
+            self._reports.move_to_end(report_id)
+            while len(self._reports) > self.max_entries:
+                self._reports.popitem(last=False)
+        return report_id
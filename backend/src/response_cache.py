@@ -0,0 +1,45 @@
+"""
+Cache of report model responses.
+
+Entries are keyed by a SHA-256 of the model id, system prompt and rendered user prompt, so
+clicking "Generate" again, or retrying after some of the models failed, returns the stored
+output of every model that already answered instead of calling it again. Like transcriptions,
+responses are kept in a TieredCache; they also expire after a TTL, so prompt or model changes
+upstream are eventually picked up.
+"""
+
+import os
+from typing import Optional
+
+from .tiered_cache import TieredCache, digest_key
+
+
+class ResponseCache(TieredCache):
+    """
+    Two-tier LRU cache of model responses with a time to live.
+
+    Args:
+        max_entries (int): Entries kept in memory.
+        ttl (float): Seconds an entry stays valid; 0 keeps entries until they are evicted.
+        db_path (Optional[str]): SQLite file for the on-disk tier. None keeps the cache in memory only.
+        max_disk_bytes (int): Upper bound on the text stored on disk.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 86400, db_path: Optional[str] = None,
+                 max_disk_bytes: int = 100 * 1024 * 1024):
+        super().__init__("responses", max_entries, ttl=ttl, db_path=db_path, max_disk_bytes=max_disk_bytes)
+
+    @classmethod
+    def from_env(cls) -> Optional["ResponseCache"]:
+        """Build the cache from REPORT_CACHE_* settings, or return None if it is disabled."""
+        max_entries = int(os.getenv("REPORT_CACHE_SIZE", "256"))
+        db_path = os.getenv("REPORT_CACHE_DB") or None
+        if max_entries <= 0 and not db_path:
+            return None
+        ttl = float(os.getenv("REPORT_CACHE_TTL", "86400"))
+        max_disk_bytes = int(os.getenv("REPORT_CACHE_DB_MAX_BYTES", str(100 * 1024 * 1024)))
+        return cls(max_entries=max_entries, ttl=ttl, db_path=db_path, max_disk_bytes=max_disk_bytes)
+
+    @staticmethod
+    def make_key(model_id: str, system_prompt: Optional[str], prompt: str) -> str:
+        return digest_key(model_id, system_prompt, prompt)
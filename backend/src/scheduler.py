@@ -0,0 +1,325 @@
+"""
+Shared scheduler for calls to upstream model APIs.
+
+Each upstream model can be given a request budget and a token budget per minute, each
+enforced by a token bucket. Callers wait in a per-model priority queue until both
+budgets allow their call, so a burst is smoothed out instead of being answered with
+429s, and work for a model with budget left is never stuck behind a model without.
+A 429 holds the whole model until its Retry-After has passed, and calls are retried
+with jittered exponential backoff. The same scheduler serves threads and event loops.
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from . import metrics
+
+DEFAULT_MAX_RETRIES = int(os.getenv("UPSTREAM_MAX_RETRIES", "3"))
+DEFAULT_BACKOFF_SECONDS = float(os.getenv("UPSTREAM_BACKOFF_SECONDS", "1"))
+DEFAULT_RETRY_AFTER_SECONDS = 60.0
+BACKOFF_JITTER = 0.25  # Delays are stretched by up to this fraction so retries do not arrive together
+
+PRIORITY_LIVE = 0
+PRIORITY_BATCH = 1
+
+
+def retry_after_seconds(exc: Exception) -> Optional[float]:
+    """Return how long a 429 error asks us to wait, or None for any other exception."""
+    if getattr(exc, "status_code", None) != 429:
+        return None
+    headers = getattr(exc, "headers", None) or getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return max(float(headers.get("Retry-After")), 0.0)
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER_SECONDS
+
+
+def estimate_tokens(*texts: Optional[str]) -> int:
+    """Rough token count of prompt text, at four characters per token."""
+    return sum(len(text) for text in texts if text) // 4 + 1
+
+
+class TokenBucket:
+    """
+    A bucket refilled at a constant rate.
+
+    Args:
+        rate (float): Tokens added per second.
+        capacity (float): The most tokens the bucket holds, i.e. the largest burst.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Return how long until amount tokens are available (amounts over capacity wait for a full bucket)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+    def take(self, amount: float, now: float):
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+
+
+class _Waiter:
+    def __init__(self, priority: int, sequence: int, tokens: int, wake: Callable[[], None]):
+        self.priority = priority
+        self.sequence = sequence
+        self.tokens = tokens
+        self.wake = wake
+        self.enqueued = time.monotonic()
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+
+class _ModelState:
+    def __init__(self):
+        self.requests: Optional[TokenBucket] = None
+        self.tokens: Optional[TokenBucket] = None
+        self.blocked_until = 0.0
+        self.waiters: List[_Waiter] = []
+        self.granted = 0
+        self.rate_limited = 0
+        self.retries = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+
+class UpstreamScheduler:
+    """
+    Per-model request and token budgets with priority queueing and 429 backoff.
+
+    Models without a configured budget are only held back after a 429.
+
+    Args:
+        max_retries (int): Retries of a rate-limited call before the 429 is raised to the caller.
+        backoff (float): Backoff before the first retry when the 429 carries no longer Retry-After; doubled per retry.
+    """
+
+    def __init__(self, max_retries: int = DEFAULT_MAX_RETRIES, backoff: float = DEFAULT_BACKOFF_SECONDS):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._models: Dict[str, _ModelState] = {}
+        self._lock = threading.Lock()
+        self._sequence = itertools.count()
+
+    @classmethod
+    def from_env(cls) -> "UpstreamScheduler":
+        """
+        Build a scheduler with budgets from UPSTREAM_RATE_LIMITS.
+
+        The setting is a comma-separated list of model=requests_per_minute[/tokens_per_minute],
+        e.g. "distil-whisper-large-v3-en=20,mixtral-8x7b-32768=30/5000".
+        """
+        scheduler = cls()
+        for entry in os.getenv("UPSTREAM_RATE_LIMITS", "").split(","):
+            model, _, budget = entry.strip().rpartition("=")
+            if not model:
+                continue
+            requests_per_minute, _, tokens_per_minute = budget.partition("/")
+            scheduler.configure(
+                model,
+                requests_per_minute=float(requests_per_minute) if requests_per_minute else None,
+                tokens_per_minute=float(tokens_per_minute) if tokens_per_minute else None,
+            )
+        return scheduler
+
+    def _state(self, model: str) -> _ModelState:
+        state = self._models.get(model)
+        if state is None:
+            state = self._models[model] = _ModelState()
+        return state
+
+    def configure(self, model: str, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        """Set a model's budgets; None leaves that dimension unlimited. Bursts of up to a minute's budget are allowed."""
+        with self._lock:
+            state = self._state(model)
+            state.requests = TokenBucket(requests_per_minute / 60, requests_per_minute) if requests_per_minute else None
+            state.tokens = TokenBucket(tokens_per_minute / 60, tokens_per_minute) if tokens_per_minute else None
+
+    def _poll(self, model: str, waiter: _Waiter) -> Optional[float]:
+        # Called with the lock held. Returns 0 once granted, the seconds until the budget allows
+        # the call when waiter is first in line, or None while others are ahead of it.
+        state = self._models[model]
+        if state.waiters[0] is not waiter:
+            return None
+        now = time.monotonic()
+        wait = state.blocked_until - now
+        if state.requests:
+            wait = max(wait, state.requests.wait_time(1, now))
+        if state.tokens and waiter.tokens:
+            wait = max(wait, state.tokens.wait_time(waiter.tokens, now))
+        if wait > 0:
+            return wait
+        if state.requests:
+            state.requests.take(1, now)
+        if state.tokens and waiter.tokens:
+            state.tokens.take(waiter.tokens, now)
+        heapq.heappop(state.waiters)
+        waited = now - waiter.enqueued
+        state.granted += 1
+        state.total_wait += waited
+        state.max_wait = max(state.max_wait, waited)
+        if state.waiters:
+            state.waiters[0].wake()
+        return 0.0
+
+    def _enqueue(self, model: str, tokens: int, priority: int, wake: Callable[[], None]) -> _Waiter:
+        with self._lock:
+            state = self._state(model)
+            waiter = _Waiter(priority, next(self._sequence), tokens, wake)
+            heapq.heappush(state.waiters, waiter)
+            return waiter
+
+    def _abandon(self, model: str, waiter: _Waiter):
+        with self._lock:
+            state = self._models[model]
+            if waiter in state.waiters:
+                head = state.waiters[0] is waiter
+                state.waiters.remove(waiter)
+                heapq.heapify(state.waiters)
+                if head and state.waiters:
+                    state.waiters[0].wake()
+
+    def acquire(self, model: str, tokens: int = 0, priority: int = PRIORITY_LIVE):
+        """Block the calling thread until a call to model fits its budgets."""
+        event = threading.Event()
+        waiter = self._enqueue(model, tokens, priority, event.set)
+        try:
+            while True:
+                with self._lock:
+                    wait = self._poll(model, waiter)
+                if wait == 0:
+                    return
+                event.wait(wait)
+                event.clear()
+        except BaseException:
+            self._abandon(model, waiter)
+            raise
+
+    async def acquire_async(self, model: str, tokens: int = 0, priority: int = PRIORITY_LIVE):
+        """Wait, without blocking the event loop, until a call to model fits its budgets."""
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        waiter = self._enqueue(model, tokens, priority, lambda: loop.call_soon_threadsafe(event.set))
+        try:
+            while True:
+                with self._lock:
+                    wait = self._poll(model, waiter)
+                if wait == 0:
+                    return
+                try:
+                    await asyncio.wait_for(event.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                event.clear()
+        except BaseException:
+            self._abandon(model, waiter)
+            raise
+
+    def rate_limited(self, model: str, retry_after: float):
+        """Hold every call to model until retry_after seconds from now."""
+        with self._lock:
+            state = self._state(model)
+            state.rate_limited += 1
+            state.blocked_until = max(state.blocked_until, time.monotonic() + retry_after)
+
+    def _backoff(self, model: str, exc: Exception, attempt: int, max_retries: Optional[int]) -> Optional[float]:
+        retry_after = retry_after_seconds(exc)
+        metrics.UPSTREAM_ERRORS.inc(model=model, reason="error" if retry_after is None else "rate_limited")
+        if retry_after is None:
+            return None
+        self.rate_limited(model, retry_after)
+        if attempt >= (self.max_retries if max_retries is None else max_retries):
+            return None
+        with self._lock:
+            self._models[model].retries += 1
+        return max(retry_after, self.backoff * 2 ** attempt) * (1 + random.uniform(0, BACKOFF_JITTER))
+
+    def call(self, model: str, function: Callable[[], Any], tokens: int = 0, priority: int = PRIORITY_LIVE,
+             max_retries: Optional[int] = None) -> Any:
+        """
+        Run function within model's budgets, retrying it after 429 responses.
+
+        Callers that retry rate-limited work themselves pass max_retries=0, so each 429 is
+        retried in one place; the model is still held until its Retry-After has passed.
+
+        Raises:
+            Exception: Whatever function raises, including the last 429 once the retries are used up.
+        """
+        attempt = 0
+        while True:
+            self.acquire(model, tokens, priority)
+            started = time.perf_counter()
+            try:
+                return function()
+            except Exception as e:
+                delay = self._backoff(model, e, attempt, max_retries)
+                if delay is None:
+                    raise
+            finally:
+                metrics.UPSTREAM_REQUEST_SECONDS.observe(time.perf_counter() - started, model=model)
+            time.sleep(delay)
+            attempt += 1
+
+    async def call_async(self, model: str, function: Callable[[], Awaitable[Any]], tokens: int = 0, priority: int = PRIORITY_LIVE,
+                         max_retries: Optional[int] = None) -> Any:
+        """Async counterpart of call; function returns a new awaitable on every attempt."""
+        attempt = 0
+        while True:
+            await self.acquire_async(model, tokens, priority)
+            started = time.perf_counter()
+            try:
+                return await function()
+            except Exception as e:
+                delay = self._backoff(model, e, attempt, max_retries)
+                if delay is None:
+                    raise
+            finally:
+                metrics.UPSTREAM_REQUEST_SECONDS.observe(time.perf_counter() - started, model=model)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                model: {
+                    "queue_depth": len(state.waiters),
+                    "granted": state.granted,
+                    "rate_limited": state.rate_limited,
+                    "retries": state.retries,
+                    "mean_wait_seconds": round(state.total_wait / state.granted, 3) if state.granted else 0.0,
+                    "max_wait_seconds": round(state.max_wait, 3),
+                    "blocked_for_seconds": round(max(0.0, state.blocked_until - now), 3),
+                }
+                for model, state in self._models.items()
+            }
+
+
+_scheduler: Optional[UpstreamScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> UpstreamScheduler:
+    """Return the process-wide scheduler, configured from the environment on first use."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = UpstreamScheduler.from_env()
+        return _scheduler
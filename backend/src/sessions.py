@@ -0,0 +1,409 @@
+"""
+Live WebSocket stream sessions with bounded queues, backpressure and resumption.
+
+Each connection to a streaming endpoint runs as a StreamSession owned by the worker's
+SessionManager. The socket's receive loop only queues incoming messages, up to
+STREAM_INBOUND_BYTES; a processor task consumes them and emits events, and a sender task
+delivers the events. When the inbound queue is full, the client is told to pause
+({"status": "backpressure", "paused": true}) and the receive loop stops reading, so TCP flow
+control pushes back as well; the client is told to carry on once the queue has drained to
+half. At most STREAM_OUTBOUND_EVENTS undelivered events are held, after which the processor
+waits for the client. A slow client therefore slows its own session down rather than
+growing the worker's memory, and other sessions are unaffected.
+
+Every event carries a sequence number ("seq"), and the last STREAM_OUTBOUND_EVENTS delivered
+events are kept. If the connection drops, the session keeps processing what it has already
+received for STREAM_RESUME_SECONDS. Reconnecting with ?session_id=...&last_seq=... replays
+the events the client missed and carries on where it left off.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import uuid
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from . import metrics
+
+STREAM_MAX_SESSIONS = int(os.getenv("STREAM_MAX_SESSIONS", "200"))
+STREAM_INBOUND_BYTES = int(os.getenv("STREAM_INBOUND_BYTES", str(1024 * 1024)))
+STREAM_OUTBOUND_EVENTS = int(os.getenv("STREAM_OUTBOUND_EVENTS", "64"))
+STREAM_RESUME_SECONDS = float(os.getenv("STREAM_RESUME_SECONDS", "30"))
+STREAM_DRAIN_SECONDS = float(os.getenv("STREAM_DRAIN_SECONDS", "10"))
+KEEPALIVE_SECONDS = 5.0  # A keep-alive message is sent after this long without data
+REFUSED_RETRY_AFTER = "5"  # Seconds a refused client is told to wait before reconnecting
+
+# Closing codes after which a session is ended rather than kept for the client to resume
+FINAL_CLOSE_CODES = (1000, 1001)
+
+logger = logging.getLogger(__name__)
+
+
+class StreamSession:
+    """
+    One live stream: its inbound messages, the events produced for it, and the connection they go to.
+
+    Args:
+        endpoint (str): The route the session belongs to; it can only be resumed there.
+        max_inbound_bytes (int): Bytes of queued messages before the receive loop pauses.
+            A single larger message is still accepted when the queue is empty.
+        max_outbound_events (int): Undelivered events held before emit() waits,
+            and delivered events kept for replay.
+    """
+
+    def __init__(self, endpoint: str, max_inbound_bytes: int = STREAM_INBOUND_BYTES,
+                 max_outbound_events: int = STREAM_OUTBOUND_EVENTS):
+        self.id = uuid.uuid4().hex
+        self.endpoint = endpoint
+        self.max_inbound_bytes = max_inbound_bytes
+        self.max_outbound_events = max_outbound_events
+        self.websocket: Optional[WebSocket] = None
+        self.paused = False
+        self.finished = False  # The processor has returned, so no more events will be emitted
+        self.processor: Optional[asyncio.Task] = None
+        self.expiry: Optional[asyncio.Task] = None
+        self._inbound: Deque[Optional[bytes]] = deque()
+        self._inbound_bytes = 0
+        self._events: Deque[Dict[str, Any]] = deque()
+        self._last_seq = 0  # Sequence number of the newest event
+        self._delivered = 0  # Sequence number of the newest event sent to the current connection
+        self._changed = asyncio.Condition()
+        self._send_lock = asyncio.Lock()
+
+    def _fits(self, size: int) -> bool:
+        return not self._inbound or self._inbound_bytes + size <= self.max_inbound_bytes
+
+    async def put(self, message: Optional[bytes]):
+        """Queue an inbound message, or None to end the input, waiting while the queue is full."""
+        size = len(message) if message else 0
+        async with self._changed:
+            pause = not self._fits(size) and not self.paused
+            if pause:
+                self.paused = True
+        if pause:
+            await self.send_control({"status": "backpressure", "paused": True})
+        async with self._changed:
+            await self._changed.wait_for(lambda: self._fits(size))
+            self._inbound.append(message)
+            self._inbound_bytes += size
+            self._changed.notify_all()
+
+    def end_input(self):
+        """End the input without waiting for room in the queue; messages already queued are still processed."""
+        self._inbound.append(None)
+        asyncio.ensure_future(self._notify())
+
+    async def _notify(self):
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def get(self) -> Optional[bytes]:
+        """Return the next inbound message, or None once the input has ended."""
+        async with self._changed:
+            await self._changed.wait_for(lambda: self._inbound)
+            message = self._inbound.popleft()
+            if message is None:
+                self._inbound.appendleft(None)  # Every later call sees the end too
+                return None
+            self._inbound_bytes -= len(message)
+            resume = self.paused and self._inbound_bytes <= self.max_inbound_bytes // 2
+            if resume:
+                self.paused = False
+            self._changed.notify_all()
+        if resume:
+            await self.send_control({"status": "backpressure", "paused": False})
+        return message
+
+    async def emit(self, event: Dict[str, Any]):
+        """Queue an event for the client, waiting while max_outbound_events are undelivered."""
+        async with self._changed:
+            await self._changed.wait_for(lambda: self._last_seq - self._delivered < self.max_outbound_events)
+            self._last_seq += 1
+            self._events.append(dict(event, seq=self._last_seq))
+            self._changed.notify_all()
+
+    async def finish(self):
+        """Mark the session's events complete; the sender returns once it has delivered them."""
+        async with self._changed:
+            self.finished = True
+            self._changed.notify_all()
+
+    def _trim(self):
+        # Keep the undelivered events and the last max_outbound_events delivered ones
+        while self._events and self._events[0]["seq"] <= self._delivered - self.max_outbound_events:
+            self._events.popleft()
+
+    def attach(self, websocket: WebSocket, last_seq: int = 0) -> int:
+        """
+        Deliver the session's events to a connection, starting after the event numbered last_seq.
+
+        Returns:
+            int: The number of events after last_seq that are no longer kept and will not be delivered.
+        """
+        first_kept = self._events[0]["seq"] if self._events else self._last_seq + 1
+        last_seq = min(max(last_seq, 0), self._last_seq)
+        self._delivered = max(last_seq, first_kept - 1)
+        self.websocket = websocket
+        return self._delivered - last_seq
+
+    def detach(self):
+        self.websocket = None
+
+    async def send(self, websocket: WebSocket, data: Dict[str, Any]):
+        async with self._send_lock:
+            await websocket.send_json(data)
+
+    async def send_control(self, data: Dict[str, Any]):
+        """Send a message outside the event sequence, if a client is connected; it is not replayed."""
+        websocket = self.websocket
+        if websocket is None:
+            return
+        try:
+            await self.send(websocket, data)
+        except Exception:
+            pass  # The receive loop or sender notices the connection is gone
+
+    async def deliver(self, websocket: WebSocket):
+        """Send events to a connection in order, returning once the session has finished and every event was sent."""
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: self._last_seq > self._delivered or self.finished)
+                if self._last_seq <= self._delivered:
+                    return
+                event = self._events[self._delivered + 1 - self._events[0]["seq"]]
+            await self.send(websocket, event)
+            async with self._changed:
+                self._delivered = event["seq"]
+                self._trim()
+                self._changed.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "attached": self.websocket is not None,
+            "paused": self.paused,
+            "inbound_bytes": self._inbound_bytes,
+            "undelivered_events": self._last_seq - self._delivered,
+        }
+
+
+class SessionLimitError(Exception):
+    """Raised when a worker is at its session limit or shutting down."""
+
+
+class SessionManager:
+    """
+    The live stream sessions of one worker.
+
+    Args:
+        max_sessions (int): Sessions, connected or waiting to be resumed, the worker runs at once.
+        max_inbound_bytes (int): Inbound queue size of each session, in bytes.
+        max_outbound_events (int): Outbound queue size of each session, in events.
+        resume_seconds (float): How long a session whose connection dropped waits to be resumed.
+        keepalive_seconds (float): Idle time after which a keep-alive message is sent.
+    """
+
+    def __init__(self, max_sessions: int = STREAM_MAX_SESSIONS, max_inbound_bytes: int = STREAM_INBOUND_BYTES,
+                 max_outbound_events: int = STREAM_OUTBOUND_EVENTS, resume_seconds: float = STREAM_RESUME_SECONDS,
+                 keepalive_seconds: float = KEEPALIVE_SECONDS):
+        self.max_sessions = max_sessions
+        self.max_inbound_bytes = max_inbound_bytes
+        self.max_outbound_events = max_outbound_events
+        self.resume_seconds = resume_seconds
+        self.keepalive_seconds = keepalive_seconds
+        self.sessions: Dict[str, StreamSession] = {}
+        self.draining = False
+        self.opened = 0
+        self.resumed = 0
+        self.rejected = 0
+        self.expired = 0
+
+    def open(self, endpoint: str) -> StreamSession:
+        """
+        Start a new session.
+
+        Raises:
+            SessionLimitError: If max_sessions are running or the worker is shutting down.
+        """
+        if self.draining or len(self.sessions) >= self.max_sessions:
+            self.rejected += 1
+            raise SessionLimitError("Too many concurrent streams" if not self.draining else "Server is shutting down")
+        session = StreamSession(endpoint, self.max_inbound_bytes, self.max_outbound_events)
+        self.sessions[session.id] = session
+        self.opened += 1
+        return session
+
+    def resume(self, session_id: str, endpoint: str) -> Optional[StreamSession]:
+        """Return a session waiting to be resumed on this endpoint, or None."""
+        session = self.sessions.get(session_id)
+        if session is None or session.endpoint != endpoint or session.websocket is not None:
+            return None
+        if session.expiry is not None:
+            session.expiry.cancel()
+            session.expiry = None
+        self.resumed += 1
+        return session
+
+    def close(self, session: StreamSession):
+        """Stop a session's processing and forget it."""
+        self.sessions.pop(session.id, None)
+        for task in (session.processor, session.expiry):
+            if task is not None and task is not asyncio.current_task():
+                task.cancel()
+
+    async def _expire(self, session: StreamSession):
+        await asyncio.sleep(self.resume_seconds)
+        self.expired += 1
+        logger.info(f"Stream session {session.id} expired without being resumed")
+        self.close(session)
+
+    async def _process(self, session: StreamSession, process: Callable[[StreamSession], Awaitable[None]]):
+        try:
+            await process(session)
+        except Exception as e:
+            logger.error(f"Error in stream session {session.id}: {str(e)}", exc_info=True)
+            await session.emit({"status": "error", "message": str(e)})
+        finally:
+            await session.finish()
+
+    async def _receive(self, session: StreamSession, websocket: WebSocket):
+        while True:
+            try:
+                message = await asyncio.wait_for(websocket.receive_bytes(), timeout=self.keepalive_seconds)
+            except asyncio.TimeoutError:
+                await session.send(websocket, {"status": "keep-alive"})
+                continue
+            # An empty message ends the input
+            await session.put(message or None)
+            if not message:
+                return
+
+    async def serve(self, websocket: WebSocket, endpoint: str, process: Callable[[StreamSession], Awaitable[None]]):
+        """
+        Run a WebSocket connection as a new session, or as a resumed one given ?session_id=&last_seq=.
+
+        The first message sent is {"status": "session", "session_id", "resumed", "missed_events"}.
+        process runs once per session: it reads messages with session.get() and sends events
+        with session.emit(). The socket is closed once process has returned and its events were
+        delivered. A connection refused because of the session limit gets an error and close code
+        1013; one naming an unknown or expired session gets an error and close code 1008.
+        """
+        await websocket.accept()
+        session_id = websocket.query_params.get("session_id")
+        try:
+            if session_id:
+                session = self.resume(session_id, endpoint)
+                if session is None:
+                    await websocket.send_json({"status": "error", "detail": "Unknown or expired session"})
+                    await websocket.close(code=1008)
+                    return
+                last_seq = int(websocket.query_params.get("last_seq") or 0)
+            else:
+                session = self.open(endpoint)
+                last_seq = 0
+        except SessionLimitError as e:
+            await websocket.send_json({"status": "error", "detail": str(e), "retry_after": REFUSED_RETRY_AFTER})
+            await websocket.close(code=1013)
+            return
+        except ValueError:
+            await websocket.send_json({"status": "error", "detail": "last_seq must be an integer"})
+            await websocket.close(code=1008)
+            return
+
+        missed = session.attach(websocket, last_seq)
+        metrics.WEBSOCKET_SESSIONS.inc(endpoint=endpoint)
+        receiver = sender = None
+        try:
+            await session.send(websocket, {
+                "status": "session", "session_id": session.id, "resumed": bool(session_id), "missed_events": missed,
+            })
+            if session.processor is None:
+                session.processor = asyncio.create_task(self._process(session, process))
+            receiver = asyncio.create_task(self._receive(session, websocket))
+            sender = asyncio.create_task(session.deliver(websocket))
+            pending = {receiver, sender}
+            while sender in pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()  # Surface a disconnect or failed send
+            self.close(session)
+            await websocket.close()
+        except WebSocketDisconnect as e:
+            if e.code in FINAL_CLOSE_CODES:
+                logger.info(f"Stream session {session.id} closed by the client")
+                self.close(session)
+            else:
+                self._detach(session)
+        except Exception as e:
+            # Sends to a connection that dropped without a close frame fail instead
+            logger.info(f"Stream session {session.id} lost its connection: {str(e)}")
+            self._detach(session)
+        finally:
+            for task in (receiver, sender):
+                if task is not None:
+                    task.cancel()
+            metrics.WEBSOCKET_SESSIONS.dec(endpoint=endpoint)
+
+    def _detach(self, session: StreamSession):
+        if session.id not in self.sessions:
+            return
+        session.detach()
+        session.expiry = asyncio.create_task(self._expire(session))
+        logger.info(f"Stream session {session.id} disconnected; it can be resumed for {self.resume_seconds:g}s")
+
+    async def shutdown(self, timeout: float = STREAM_DRAIN_SECONDS):
+        """
+        Stop accepting sessions and let every session finish what it has received, for up to timeout seconds.
+
+        Connected sessions deliver their remaining events and close normally. Sessions still
+        running after the timeout are closed with code 1012 (service restart).
+        """
+        self.draining = True
+        sessions = list(self.sessions.values())
+        for session in sessions:
+            session.end_input()
+        processors = [session.processor for session in sessions if session.processor is not None]
+        if processors:
+            await asyncio.wait(processors, timeout=timeout)
+        # Give connected clients a moment to receive the last events
+        deadline = asyncio.get_running_loop().time() + timeout
+        while any(session.websocket is not None for session in self.sessions.values()):
+            if asyncio.get_running_loop().time() >= deadline:
+                break
+            await asyncio.sleep(0.05)
+        for session in list(self.sessions.values()):
+            if session.websocket is not None:
+                try:
+                    await session.websocket.close(code=1012)
+                except Exception:
+                    pass
+            self.close(session)
+
+    def stats(self) -> Dict[str, Any]:
+        sessions = list(self.sessions.values())
+        return {
+            "active": len(sessions),
+            "connected": sum(1 for session in sessions if session.websocket is not None),
+            "paused": sum(1 for session in sessions if session.paused),
+            "max_sessions": self.max_sessions,
+            "opened": self.opened,
+            "resumed": self.resumed,
+            "rejected": self.rejected,
+            "expired": self.expired,
+        }
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_session_manager() -> SessionManager:
+    """Return the worker's session manager, configured from the environment on first use."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = SessionManager()
+        return _manager
@@ -0,0 +1,249 @@
+"""
+Sliding-window transcription of live 16 kHz PCM streams.
+
+Each connection owns a StreamingTranscriber. Incoming PCM accumulates in a ring buffer
+and is cut into windows at silence boundaries (or when a window reaches its maximum
+length). Windows are transcribed concurrently with the receive loop, while results are
+emitted strictly in submission order with offsets measured from the start of the stream.
+"""
+
+import asyncio
+import os
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Optional
+
+import numpy as np
+
+from .audio_chunker import SAMPLE_RATE, pcm_to_wav
+from .vad import DEFAULT_HANGOVER_SECONDS, DEFAULT_MIN_RMS, speech_frames
+
+DEFAULT_MIN_WINDOW_SECONDS = float(os.getenv("STREAM_MIN_WINDOW_SECONDS", "2"))
+DEFAULT_MAX_WINDOW_SECONDS = float(os.getenv("STREAM_MAX_WINDOW_SECONDS", "15"))
+DEFAULT_SILENCE_SECONDS = float(os.getenv("STREAM_SILENCE_SECONDS", "0.6"))
+DEFAULT_SILENCE_RMS = float(os.getenv("STREAM_SILENCE_RMS", str(DEFAULT_MIN_RMS)))
+DEFAULT_PARTIAL_INTERVAL_SECONDS = float(os.getenv("STREAM_PARTIAL_INTERVAL_SECONDS", "3"))
+DEFAULT_MAX_PENDING = int(os.getenv("STREAM_MAX_PENDING", "4"))
+
+FRAME_SECONDS = 0.03
+CONTEXT_CHARS = 200
+
+
+class PcmRingBuffer:
+    """
+    Fixed-capacity ring buffer of int16 samples addressed by absolute stream offset.
+
+    Offsets count every sample ever written, so a window keeps the same offsets no
+    matter how much of the buffer has been consumed or overwritten since.
+    """
+
+    def __init__(self, capacity: int):
+        self._data = np.zeros(capacity, dtype=np.int16)
+        self.capacity = capacity
+        self.start = 0  # Oldest retained offset
+        self.end = 0  # One past the newest offset
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def write(self, samples: np.ndarray):
+        """Append samples, dropping the oldest ones if the buffer overflows."""
+        if len(samples) > self.capacity:
+            self.end += len(samples) - self.capacity
+            samples = samples[-self.capacity:]
+        position = self.end % self.capacity
+        first = min(len(samples), self.capacity - position)
+        self._data[position:position + first] = samples[:first]
+        self._data[:len(samples) - first] = samples[first:]
+        self.end += len(samples)
+        self.start = max(self.start, self.end - self.capacity)
+
+    def read(self, start: int, end: int) -> np.ndarray:
+        """Return a copy of the samples between two absolute offsets."""
+        if start < self.start or end > self.end or start > end:
+            raise IndexError(f"Samples {start}:{end} are outside the buffer ({self.start}:{self.end})")
+        indices = np.arange(start, end) % self.capacity
+        return self._data[indices]
+
+    def discard_until(self, offset: int):
+        """Release every sample before offset."""
+        self.start = min(max(self.start, offset), self.end)
+
+
+class StreamingTranscriber:
+    """
+    Per-connection streaming transcription engine.
+
+    Feed raw 16-bit mono PCM with feed() and consume events from events(). Events are
+    dicts with a "status" of "partial" (a provisional hypothesis for the window still
+    being recorded) or "success" (the final text of a committed window), plus the
+    "transcription" text and "start"/"end" offsets in seconds.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        language: Optional[str] = "en",
+        sample_rate: int = SAMPLE_RATE,
+        min_window_seconds: float = DEFAULT_MIN_WINDOW_SECONDS,
+        max_window_seconds: float = DEFAULT_MAX_WINDOW_SECONDS,
+        silence_seconds: float = DEFAULT_SILENCE_SECONDS,
+        silence_rms: float = DEFAULT_SILENCE_RMS,
+        partial_interval_seconds: float = DEFAULT_PARTIAL_INTERVAL_SECONDS,
+        max_pending: int = DEFAULT_MAX_PENDING,
+    ):
+        self.client = client
+        self.language = language
+        self.sample_rate = sample_rate
+        self.min_window = int(min_window_seconds * sample_rate)
+        self.max_window = int(max_window_seconds * sample_rate)
+        self.silence_samples_needed = int(silence_seconds * sample_rate)
+        self.silence_rms = silence_rms
+        self.partial_interval = int(partial_interval_seconds * sample_rate)
+        self.frame = max(1, int(FRAME_SECONDS * sample_rate))
+        self.hangover = int(DEFAULT_HANGOVER_SECONDS * sample_rate)
+
+        self.buffer = PcmRingBuffer(self.max_window * 2)
+        self.window_start = 0
+        self.last_partial_end = 0
+        self.trailing_silence = 0
+        self.speech_in_window = False
+        self.speech_start = 0
+        self.context = ""
+        self.windows_submitted = 0
+        self.skipped_samples = 0
+
+        self._pending = deque()
+        self._slots = asyncio.Semaphore(max_pending)
+        self._new_event = asyncio.Event()
+        self._closed = False
+        self._remainder = b""
+
+    @property
+    def skipped_seconds(self) -> float:
+        """Seconds of silence that were never sent for transcription."""
+        return self.skipped_samples / self.sample_rate
+
+    def _update_silence(self, samples: np.ndarray, offset: int):
+        loud = speech_frames(samples, self.frame, self.silence_rms)
+        frames = len(loud)
+        if loud.any():
+            if not self.speech_in_window:
+                self.speech_start = offset + int(np.argmax(loud)) * self.frame
+            self.speech_in_window = True
+            last_loud = frames - 1 - int(np.argmax(loud[::-1]))
+            self.trailing_silence = (frames - 1 - last_loud) * self.frame + len(samples) - frames * self.frame
+        else:
+            self.trailing_silence += len(samples)
+
+    async def feed(self, pcm: bytes):
+        """Append PCM bytes and submit any window that is ready to transcribe."""
+        if self._closed:
+            raise RuntimeError("Cannot feed a closed StreamingTranscriber")
+        pcm = self._remainder + pcm
+        usable = len(pcm) - len(pcm) % 2
+        self._remainder = pcm[usable:]
+        samples = np.frombuffer(pcm[:usable], dtype='<i2')
+        if len(samples) == 0:
+            return
+
+        offset = self.buffer.end
+        self.buffer.write(samples)
+        self._update_silence(samples, offset)
+
+        length = self.buffer.end - self.window_start
+        if length >= self.max_window:
+            await self._commit(self.buffer.end)
+        elif self.trailing_silence >= self.silence_samples_needed:
+            if self.speech_in_window and length >= self.min_window:
+                await self._commit(self.buffer.end)
+            elif not self.speech_in_window:
+                # Nothing but silence since the last window: drop it without a request
+                self.skipped_samples += length
+                self._advance(self.buffer.end)
+        elif (
+            self.partial_interval
+            and self.speech_in_window
+            and self.buffer.end - max(self.last_partial_end, self.window_start) >= self.partial_interval
+        ):
+            self.last_partial_end = self.buffer.end
+            start = max(self.window_start, self.buffer.start, self.speech_start - self.hangover)
+            await self._submit(start, self.buffer.end, final=False)
+
+    def _advance(self, offset: int):
+        self.buffer.discard_until(offset)
+        self.window_start = offset
+        self.last_partial_end = offset
+        self.trailing_silence = 0
+        self.speech_in_window = False
+
+    async def _commit(self, end: int):
+        window_start = max(self.window_start, self.buffer.start)
+        if self.speech_in_window:
+            # Trim the silence around the speech, keeping a hangover on each side
+            start = max(window_start, self.speech_start - self.hangover)
+            speech_end = end - max(0, self.trailing_silence - self.hangover)
+            self.skipped_samples += (start - window_start) + (end - speech_end)
+            await self._submit(start, speech_end, final=True)
+        else:
+            self.skipped_samples += end - window_start
+        self._advance(end)
+
+    async def _submit(self, start: int, end: int, final: bool):
+        await self._slots.acquire()
+        samples = self.buffer.read(start, end)
+        task = asyncio.create_task(self._transcribe(samples, start, end, final))
+        self._pending.append(task)
+        self.windows_submitted += 1
+        self._new_event.set()
+
+    async def _transcribe(self, samples: np.ndarray, start: int, end: int, final: bool) -> Dict[str, Any]:
+        try:
+            wav_bytes = pcm_to_wav(samples, self.sample_rate)
+            text = await self.client.transcribe_audio(
+                (f"stream_{start}.wav", wav_bytes), language=self.language, prompt=self.context or None
+            )
+            text = (text or "").strip()
+            if final and text:
+                self.context = f"{self.context} {text}".strip()[-CONTEXT_CHARS:]
+            return {
+                "status": "success" if final else "partial",
+                "transcription": text,
+                "start": round(start / self.sample_rate, 3),
+                "end": round(end / self.sample_rate, 3),
+            }
+        finally:
+            self._slots.release()
+
+    async def close(self):
+        """Commit whatever speech is left in the buffer; no more audio may be fed."""
+        if not self._closed:
+            if self.buffer.end > self.window_start:
+                await self._commit(self.buffer.end)
+            self._closed = True
+            self._new_event.set()
+
+    def cancel(self):
+        for task in self._pending:
+            task.cancel()
+        self._pending.clear()
+        self._closed = True
+        self._new_event.set()
+
+    async def events(self) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield transcription events in submission order until the transcriber is closed.
+
+        Exceptions raised by a transcription request propagate to the consumer; the failed
+        window is dropped, so calling events() again resumes with the next one. Empty
+        hypotheses are skipped.
+        """
+        while True:
+            if not self._pending:
+                if self._closed:
+                    return
+                self._new_event.clear()
+                await self._new_event.wait()
+                continue
+            event = await self._pending.popleft()
+            if event["transcription"]:
+                yield event
@@ -0,0 +1,152 @@
+"""
+Two-tier LRU cache of text, shared by the transcription and model response caches.
+
+A bounded in-memory LRU tier sits in front of an optional SQLite tier whose total text size
+is capped by evicting the least recently used rows. With a TTL, entries in both tiers also
+expire that many seconds after they were stored.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+def digest_key(*parts: Optional[str]) -> str:
+    """Return the SHA-256 hex digest of parts, with None hashed like an empty string."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update((part or "").encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class TieredCache:
+    """
+    Two-tier LRU cache of text with an optional time to live.
+
+    Args:
+        table (str): Name of the SQLite table holding the on-disk tier.
+        max_entries (int): Entries kept in memory.
+        ttl (float): Seconds an entry stays valid; 0 keeps entries until they are evicted.
+        db_path (Optional[str]): SQLite file for the on-disk tier. None keeps the cache in memory only.
+        max_disk_bytes (int): Upper bound on the text stored on disk.
+    """
+
+    def __init__(self, table: str, max_entries: int, ttl: float = 0, db_path: Optional[str] = None,
+                 max_disk_bytes: int = 100 * 1024 * 1024):
+        self.table = table
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, text TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            columns = [row[1] for row in self._db.execute(f"PRAGMA table_info({table})")]
+            if "created" not in columns:
+                # Caches written before entries could expire count as stored now
+                self._db.execute(f"ALTER TABLE {table} ADD COLUMN created REAL NOT NULL DEFAULT {time.time()}")
+            self._db.execute(f"CREATE INDEX IF NOT EXISTS {table}_last_access ON {table} (last_access)")
+            self._db.commit()
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl > 0 and now - created > self.ttl
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                text, created = entry
+                if not self._expired(created, now):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return text
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(f"SELECT text, created FROM {self.table} WHERE key = ?", (key,)).fetchone()
+                if row is not None and not self._expired(row[1], now):
+                    self._db.execute(f"UPDATE {self.table} SET last_access = ? WHERE key = ?", (now, key))
+                    self._db.commit()
+                    self._remember(key, row[0], row[1])
+                    self.hits += 1
+                    return row[0]
+                if row is not None:
+                    self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, text: str):
+        now = time.time()
+        with self._lock:
+            self._remember(key, text, now)
+            if self._db is not None:
+                self._db.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, text, size, created, last_access) VALUES (?, ?, ?, ?, ?)",
+                    (key, text, len(text.encode("utf-8")), now, now),
+                )
+                self._evict_disk(now)
+                self._db.commit()
+
+    def _remember(self, key: str, text: str, created: float):
+        if self.max_entries <= 0:
+            return
+        self._memory[key] = (text, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_usage(self):
+        return self._db.execute(f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}").fetchone()
+
+    def _evict_disk(self, now: float):
+        if self.ttl > 0:
+            self._db.execute(f"DELETE FROM {self.table} WHERE created < ?", (now - self.ttl,))
+        _, total = self._disk_usage()
+        while total > self.max_disk_bytes:
+            row = self._db.execute(
+                f"SELECT key, size FROM {self.table} ORDER BY last_access ASC LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (row[0],))
+            total -= row[1]
+
+    def clear(self):
+        """Drop every entry, in memory and on disk."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute(f"DELETE FROM {self.table}")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+            }
+            if self._db is not None:
+                stats["disk_entries"], stats["disk_bytes"] = self._disk_usage()
+            return stats
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,198 @@
+"""
+Normalization and compact re-encoding of uploaded audio.
+
+Uploads are decoded once to 16 kHz mono PCM, dropping any video stream and extra channels,
+and what is sent upstream is re-encoded with a speech codec: Opus in an Ogg container by
+default, or FLAC, at a small fraction of the size of the WAV or video the client uploaded.
+Encoding is CPU-bound, so it runs in a process pool rather than on the event loop or in
+threads contending for the GIL; its inputs and outputs are chunk-sized. Decoding runs in a
+thread instead: ffmpeg is already a process of its own, and the upload is streamed to it
+from the spooled file, so neither the upload nor the PCM of a long recording is copied
+across the pool. The decoded PCM is handed back to the caller, so voice activity detection,
+chunking and the local Whisper backend reuse it instead of decoding the upload again.
+
+Without ffmpeg only WAV uploads can be decoded, and payloads are sent as 16 kHz mono WAV.
+"""
+
+import asyncio
+import io
+import multiprocessing
+import os
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, BinaryIO, Dict, Optional, Tuple, Union
+
+import numpy as np
+
+from .audio_chunker import SAMPLE_RATE, AudioDecodeError, PcmAudio, decode_audio, pcm_to_wav
+from .metrics import STAGE_SECONDS, TRANSCODE_BYTES
+
+TRANSCODE_CODEC = os.getenv("TRANSCODE_CODEC", "opus")
+TRANSCODE_BITRATE = os.getenv("TRANSCODE_BITRATE", "24k")
+TRANSCODE_WORKERS = int(os.getenv("TRANSCODE_WORKERS", "2"))
+
+# Codec name -> (file extension, ffmpeg output arguments)
+CODECS = {
+    "opus": ("ogg", ["-c:a", "libopus", "-b:a", TRANSCODE_BITRATE, "-application", "voip", "-f", "ogg"]),
+    "flac": ("flac", ["-c:a", "flac", "-compression_level", "8", "-f", "flac"]),
+    "wav": ("wav", None),
+}
+
+
+def resample(samples: np.ndarray, sample_rate: int, target_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Resample int16 audio, averaging over each output sample's span first so downsampling does not alias.
+
+    Only needed for WAV files decoded without ffmpeg; ffmpeg resamples while decoding.
+    """
+    if sample_rate == target_rate or not len(samples):
+        return samples
+    values = samples.astype(np.float64)
+    ratio = sample_rate / target_rate
+    if ratio > 1:
+        width = int(round(ratio))
+        values = np.convolve(values, np.ones(width) / width, mode="same")
+    positions = np.arange(int(len(samples) / ratio)) * ratio
+    resampled = np.interp(positions, np.arange(len(samples)), values)
+    return np.clip(np.round(resampled), -32768, 32767).astype(np.int16)
+
+
+def decode(audio_file: BinaryIO, filename: str) -> Tuple[PcmAudio, float]:
+    """
+    Decode an upload, a seekable binary file, to 16 kHz mono PCM.
+
+    Returns:
+        Tuple[PcmAudio, float]: The audio and the seconds spent decoding it.
+
+    Raises:
+        AudioDecodeError: If the upload cannot be decoded.
+    """
+    started = time.perf_counter()
+    pcm = decode_audio(audio_file, filename)
+    if pcm.sample_rate != SAMPLE_RATE:
+        pcm = PcmAudio(resample(pcm.samples, pcm.sample_rate), SAMPLE_RATE)
+    return pcm, time.perf_counter() - started
+
+
+def encode(samples: np.ndarray, sample_rate: int = SAMPLE_RATE, codec: str = TRANSCODE_CODEC) -> Tuple[bytes, str, float]:
+    """
+    Encode mono int16 PCM with a speech codec.
+
+    Falls back to WAV when ffmpeg is missing or cannot encode with the codec.
+
+    Returns:
+        Tuple[bytes, str, float]: The encoded audio, its file extension and the seconds spent encoding.
+    """
+    started = time.perf_counter()
+    extension, arguments = CODECS.get(codec, CODECS["wav"])
+    ffmpeg = shutil.which("ffmpeg") if arguments else None
+    if ffmpeg:
+        # Bit-exact output leaves out the random Ogg serial number and the encoder version, so the
+        # same audio always encodes to the same bytes and the transcription cache keys stay stable
+        command = [
+            ffmpeg, "-nostdin", "-loglevel", "error", "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "-i", "pipe:0",
+            *arguments, "-fflags", "+bitexact", "-flags:a", "+bitexact", "pipe:1",
+        ]
+        result = subprocess.run(command, input=np.ascontiguousarray(samples, dtype='<i2').tobytes(), capture_output=True)
+        if result.returncode == 0 and result.stdout:
+            return result.stdout, extension, time.perf_counter() - started
+    return pcm_to_wav(samples, sample_rate), "wav", time.perf_counter() - started
+
+
+def _size(audio_file: BinaryIO) -> int:
+    position = audio_file.tell()
+    size = audio_file.seek(0, os.SEEK_END)
+    audio_file.seek(position)
+    return size
+
+
+class Transcoder:
+    """
+    Decodes uploads, and encodes audio for upstream requests in a pool of worker processes.
+
+    Args:
+        max_workers (int): Encoding worker processes; 0 runs the encoding in threads instead.
+        codec (str): "opus", "flac" or "wav".
+    """
+
+    def __init__(self, max_workers: int = TRANSCODE_WORKERS, codec: str = TRANSCODE_CODEC):
+        if codec not in CODECS:
+            raise ValueError(f"Unsupported codec: {codec}. Must be one of: {', '.join(CODECS)}")
+        self.max_workers = max_workers
+        self.codec = codec
+        self.decoded_bytes = 0
+        self.encoded_bytes = 0
+        self.decode_seconds = 0.0
+        self.encode_seconds = 0.0
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    async def _run(self, function, *args) -> Any:
+        if self.max_workers <= 0:
+            return await asyncio.to_thread(function, *args)
+        with self._lock:
+            if self._pool is None:
+                # Forking a process that runs an event loop and worker threads is unsafe
+                self._pool = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+            pool = self._pool
+        return await asyncio.get_running_loop().run_in_executor(pool, function, *args)
+
+    async def decode(self, upload: Union[bytes, BinaryIO], filename: str) -> PcmAudio:
+        """
+        Decode an upload, as bytes or a seekable binary file such as a spooled upload, to 16 kHz mono PCM.
+
+        Raises:
+            AudioDecodeError: If the upload cannot be decoded.
+        """
+        audio_file = io.BytesIO(upload) if isinstance(upload, (bytes, bytearray)) else upload
+        size = await asyncio.to_thread(_size, audio_file)
+        pcm, seconds = await asyncio.to_thread(decode, audio_file, filename)
+        with self._lock:
+            self.decoded_bytes += size
+            self.decode_seconds += seconds
+        STAGE_SECONDS.observe(seconds, stage="decode", model="")
+        TRANSCODE_BYTES.inc(size, direction="decoded")
+        return pcm
+
+    async def encode(self, samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> Tuple[bytes, str]:
+        """Encode mono int16 PCM with the configured codec, returning the payload and its file extension."""
+        payload, extension, seconds = await self._run(encode, samples, sample_rate, self.codec)
+        with self._lock:
+            self.encoded_bytes += len(payload)
+            self.encode_seconds += seconds
+        STAGE_SECONDS.observe(seconds, stage="encode", model="")
+        TRANSCODE_BYTES.inc(len(payload), direction="encoded")
+        return payload, extension
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "codec": self.codec,
+                "ffmpeg": shutil.which("ffmpeg") is not None,
+                "decoded_bytes": self.decoded_bytes,
+                "encoded_bytes": self.encoded_bytes,
+                "decode_seconds": round(self.decode_seconds, 3),
+                "encode_seconds": round(self.encode_seconds, 3),
+            }
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+_transcoder = None
+_transcoder_lock = threading.Lock()
+
+
+def get_transcoder() -> Transcoder:
+    """Return the process-wide transcoder, configured from the environment on first use."""
+    global _transcoder
+    with _transcoder_lock:
+        if _transcoder is None:
+            _transcoder = Transcoder()
+        return _transcoder
@@ -0,0 +1,290 @@
+"""
+Interchangeable transcription backends.
+
+Every backend exposes the async transcribe_audio(audio_file, language, timeout, prompt, priority, max_retries)
+method the API, the chunker and the streaming transcriber already call. "groq" is the
+hosted AsyncGroqClient; "local" runs a Whisper checkpoint in-process through a
+transformers pipeline, loaded once per process and fed by a micro-batcher that groups
+concurrent requests into a single batched inference call. Set TRANSCRIPTION_BACKEND to
+choose one.
+"""
+
+import abc
+import asyncio
+import io
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .audio_chunker import PcmAudio, decode_audio, words_to_segments
+from .scheduler import PRIORITY_LIVE
+from .transcription_cache import TranscriptionCache, hash_audio
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = os.getenv("TRANSCRIPTION_BACKEND", "groq")
+DEFAULT_LOCAL_MODEL = os.getenv("LOCAL_WHISPER_MODEL", "distil-whisper/distil-large-v3")
+DEFAULT_LOCAL_DEVICE = os.getenv("LOCAL_WHISPER_DEVICE") or None
+DEFAULT_LOCAL_BATCH_SIZE = int(os.getenv("LOCAL_WHISPER_BATCH_SIZE", "8"))
+DEFAULT_LOCAL_BATCH_WAIT_SECONDS = float(os.getenv("LOCAL_WHISPER_BATCH_WAIT_MS", "50")) / 1000
+
+
+class TranscriptionBackend(abc.ABC):
+    """
+    Base class of transcription backends.
+
+    Subclasses implement transcribe_audio. Backends with supports_timestamps also implement
+    transcribe_timestamped, which the chunker prefers so responses carry word timings; a
+    subclass that sets supports_timestamps without overriding it is rejected when defined.
+    priority is the upstream scheduling priority of the call and max_retries overrides how often
+    a rate-limited call is retried; backends without an upstream ignore both.
+    """
+
+    name = "base"
+    supports_timestamps = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.supports_timestamps and cls.transcribe_timestamped is TranscriptionBackend.transcribe_timestamped:
+            raise TypeError(f"{cls.__name__} sets supports_timestamps but does not implement transcribe_timestamped")
+
+    @abc.abstractmethod
+    async def transcribe_audio(self, audio_file, language=None, timeout=None, prompt=None, priority=PRIORITY_LIVE, max_retries=None) -> str:
+        """Return the text of the audio."""
+
+    async def transcribe_timestamped(self, audio_file, language=None, timeout=None, prompt=None, priority=PRIORITY_LIVE, max_retries=None) -> Dict[str, Any]:
+        """Return {"text", "segments", "words"} with offsets in seconds from the start of the audio."""
+        raise NotImplementedError(f"The {self.name} backend does not return timestamps")
+
+    async def warm_up(self):
+        """Load whatever the first request would otherwise wait for."""
+
+    async def aclose(self):
+        pass
+
+
+_pipelines: Dict[Tuple[str, str], Any] = {}
+_pipelines_lock = threading.Lock()
+
+
+def load_pipeline(model: str = DEFAULT_LOCAL_MODEL, device: Optional[str] = None) -> Any:
+    """
+    Return the process-wide transformers ASR pipeline for a model, loading it on first use.
+
+    Raises:
+        RuntimeError: If transformers or torch are not installed.
+    """
+    try:
+        import torch
+        from transformers import pipeline
+    except ImportError as e:
+        raise RuntimeError(f"The local transcription backend requires transformers and torch: {str(e)}")
+
+    device = device or ("cuda:0" if torch.cuda.is_available() else "cpu")
+    with _pipelines_lock:
+        key = (model, device)
+        if key not in _pipelines:
+            _pipelines[key] = pipeline(
+                "automatic-speech-recognition",
+                model=model,
+                torch_dtype=torch.float16 if device.startswith("cuda") else torch.float32,
+                device=device,
+            )
+        return _pipelines[key]
+
+
+def _read_upload(audio_file) -> Tuple[str, bytes]:
+    filename = "audio.wav"
+    if isinstance(audio_file, tuple):
+        filename, audio_file = audio_file
+    if isinstance(audio_file, (bytes, bytearray, memoryview)):
+        return filename, bytes(audio_file)
+    filename = os.path.basename(getattr(audio_file, "name", "") or filename)
+    position = audio_file.tell()
+    data = audio_file.read()
+    audio_file.seek(position)
+    return filename, data
+
+
+def _decode_upload(audio_file):
+    if isinstance(audio_file, PcmAudio):
+        return audio_file
+    filename, data = _read_upload(audio_file)
+    return decode_audio(io.BytesIO(data), filename)
+
+
+def _parse_output(output: Dict[str, Any], duration: float) -> Dict[str, Any]:
+    words = []
+    for chunk in output.get("chunks") or []:
+        text = chunk["text"].strip()
+        if not text:
+            continue
+        start, end = chunk.get("timestamp") or (None, None)
+        start = float(start) if start is not None else (words[-1]["end"] if words else 0.0)
+        end = float(end) if end is not None else duration
+        words.append({"word": text, "start": round(start, 3), "end": round(max(end, start), 3)})
+    return {"text": output.get("text", "").strip(), "segments": words_to_segments(words), "words": words}
+
+
+class _PendingRequest:
+    def __init__(self, pcm, language: Optional[str], future: asyncio.Future):
+        self.pcm = pcm
+        self.language = language
+        self.future = future
+
+
+class LocalWhisperBackend(TranscriptionBackend):
+    """
+    Whisper running in-process through a transformers pipeline.
+
+    Concurrent requests are queued and drained in batches of up to batch_size, waiting at
+    most batch_wait seconds for a batch to fill, and each batch runs as one pipeline call in
+    a worker thread. Results carry word- and segment-level timestamps. Besides files, it
+    accepts already decoded PcmAudio, which transcribe_recording passes so uploads are not
+    decoded twice. The prompt argument is accepted for compatibility and ignored.
+
+    Args:
+        model (str): The Hugging Face model id.
+        device (Optional[str]): The torch device; defaults to the first GPU if there is one.
+        batch_size (int): The most requests run in one inference call.
+        batch_wait (float): Seconds to wait for more requests before running a partial batch.
+        cache (Optional[TranscriptionCache]): Shared cache of transcriptions.
+        pipeline: An already loaded pipeline; by default the process-wide one for model is used.
+    """
+
+    name = "local"
+    supports_timestamps = True
+    accepts_pcm = True
+
+    def __init__(
+        self,
+        model: str = DEFAULT_LOCAL_MODEL,
+        device: Optional[str] = DEFAULT_LOCAL_DEVICE,
+        batch_size: int = DEFAULT_LOCAL_BATCH_SIZE,
+        batch_wait: float = DEFAULT_LOCAL_BATCH_WAIT_SECONDS,
+        cache: Optional[TranscriptionCache] = None,
+        pipeline: Any = None,
+    ):
+        self.model = model
+        self.device = device
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait
+        self.cache = cache
+        self.batches_run = 0
+        self._prompt_ignored = False
+        self._pipeline = pipeline
+        self._queue: Optional[asyncio.Queue] = None
+        self._batcher: Optional[asyncio.Task] = None
+
+    @property
+    def pipeline(self):
+        if self._pipeline is None:
+            self._pipeline = load_pipeline(self.model, self.device)
+        return self._pipeline
+
+    async def warm_up(self):
+        # Load the weights and run one second of silence so the first request is not the slow one
+        pipeline = await asyncio.to_thread(lambda: self.pipeline)
+        await asyncio.to_thread(pipeline, {"raw": np.zeros(16000, dtype=np.float32), "sampling_rate": 16000})
+
+    async def transcribe_audio(self, audio_file, language=None, timeout=None, prompt=None, priority=PRIORITY_LIVE, max_retries=None) -> str:
+        if prompt and not self._prompt_ignored:
+            self._prompt_ignored = True
+            logger.info(f"The local backend does not take a prompt; ignoring it for {self.model}")
+        return (await self.transcribe_timestamped(audio_file, language=language, timeout=timeout))["text"]
+
+    async def transcribe_timestamped(self, audio_file, language=None, timeout=None, prompt=None, priority=PRIORITY_LIVE, max_retries=None) -> Dict[str, Any]:
+        cache_key = None
+        if self.cache:
+            audio_hash = await asyncio.to_thread(
+                hash_audio, audio_file.samples.tobytes() if isinstance(audio_file, PcmAudio) else audio_file
+            )
+            cache_key = TranscriptionCache.make_key(audio_hash, f"{self.model}:timestamped", language or "en", None)
+            cached = await asyncio.to_thread(self.cache.get, cache_key)
+            if cached is not None:
+                return json.loads(cached)
+
+        pcm = await asyncio.to_thread(_decode_upload, audio_file)
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._batcher is None or self._batcher.done():
+            self._batcher = asyncio.create_task(self._run_batches())
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(_PendingRequest(pcm, language, future))
+        result = await asyncio.wait_for(future, timeout)
+
+        if cache_key:
+            await asyncio.to_thread(self.cache.put, cache_key, json.dumps(result))
+        return result
+
+    async def _next_batch(self) -> List[_PendingRequest]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return [request for request in batch if not request.future.done()]
+
+    async def _run_batches(self):
+        while True:
+            batch = await self._next_batch()
+            by_language: Dict[Optional[str], List[_PendingRequest]] = {}
+            for request in batch:
+                by_language.setdefault(request.language, []).append(request)
+            for language, requests in by_language.items():
+                try:
+                    results = await asyncio.to_thread(self._infer, [request.pcm for request in requests], language)
+                except Exception as e:
+                    for request in requests:
+                        if not request.future.done():
+                            request.future.set_exception(e)
+                    continue
+                for request, result in zip(requests, results):
+                    if not request.future.done():
+                        request.future.set_result(result)
+
+    def _infer(self, pcms: List[Any], language: Optional[str]) -> List[Dict[str, Any]]:
+        self.batches_run += 1
+        inputs = [{"raw": pcm.samples.astype(np.float32) / 32768.0, "sampling_rate": pcm.sample_rate} for pcm in pcms]
+        generate_kwargs = {"task": "transcribe"}
+        if language:
+            generate_kwargs["language"] = language
+        outputs = self.pipeline(
+            inputs,
+            batch_size=self.batch_size,
+            chunk_length_s=30,
+            return_timestamps="word",
+            generate_kwargs=generate_kwargs,
+        )
+        return [_parse_output(output, pcm.duration) for output, pcm in zip(outputs, pcms)]
+
+    async def aclose(self):
+        if self._batcher is not None:
+            self._batcher.cancel()
+            self._batcher = None
+
+
+def create_backend(name: Optional[str] = None, cache: Optional[TranscriptionCache] = None) -> TranscriptionBackend:
+    """
+    Build the transcription backend selected by name or TRANSCRIPTION_BACKEND.
+
+    Raises:
+        ValueError: If the backend is unknown, or the Groq backend has no API key.
+    """
+    name = (name or DEFAULT_BACKEND).lower()
+    if name == "groq":
+        from .groq_client import AsyncGroqClient
+        return AsyncGroqClient(cache=cache)
+    if name == "local":
+        return LocalWhisperBackend(cache=cache)
+    raise ValueError(f"Unknown transcription backend: {name}. Must be one of: groq, local")
@@ -0,0 +1,69 @@
+"""
+Content-addressed cache of transcriptions.
+
+Entries are keyed by a SHA-256 of the audio bytes together with the model, language and
+prompt, so re-uploading the same evidence file returns the stored text instead of paying
+for another transcription. Entries are kept in a TieredCache: a bounded in-memory LRU tier in
+front of an optional SQLite tier whose total text size is capped.
+"""
+
+import hashlib
+import os
+from typing import Any, Optional
+
+from .tiered_cache import TieredCache, digest_key
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_audio(audio_file: Any) -> str:
+    """
+    Return the SHA-256 hex digest of audio in any form the transcription clients accept.
+
+    Args:
+        audio_file: Raw bytes, a binary file object, or a (filename, bytes or file object) tuple.
+            File objects are rewound to where they started.
+    """
+    if isinstance(audio_file, tuple):
+        audio_file = audio_file[1]
+    digest = hashlib.sha256()
+    if isinstance(audio_file, (bytes, bytearray, memoryview)):
+        digest.update(audio_file)
+        return digest.hexdigest()
+
+    position = audio_file.tell()
+    while True:
+        chunk = audio_file.read(HASH_CHUNK_SIZE)
+        if not chunk:
+            break
+        digest.update(chunk)
+    audio_file.seek(position)
+    return digest.hexdigest()
+
+
+class TranscriptionCache(TieredCache):
+    """
+    Two-tier LRU cache of transcription text.
+
+    Args:
+        max_entries (int): Entries kept in memory.
+        db_path (Optional[str]): SQLite file for the on-disk tier. None keeps the cache in memory only.
+        max_disk_bytes (int): Upper bound on the text stored on disk.
+    """
+
+    def __init__(self, max_entries: int = 512, db_path: Optional[str] = None, max_disk_bytes: int = 100 * 1024 * 1024):
+        super().__init__("transcriptions", max_entries, db_path=db_path, max_disk_bytes=max_disk_bytes)
+
+    @classmethod
+    def from_env(cls) -> Optional["TranscriptionCache"]:
+        """Build the cache from TRANSCRIPTION_CACHE_* settings, or return None if it is disabled."""
+        max_entries = int(os.getenv("TRANSCRIPTION_CACHE_SIZE", "512"))
+        db_path = os.getenv("TRANSCRIPTION_CACHE_DB") or None
+        if max_entries <= 0 and not db_path:
+            return None
+        max_disk_bytes = int(os.getenv("TRANSCRIPTION_CACHE_DB_MAX_BYTES", str(100 * 1024 * 1024)))
+        return cls(max_entries=max_entries, db_path=db_path, max_disk_bytes=max_disk_bytes)
+
+    @staticmethod
+    def make_key(audio_hash: str, model: str, language: Optional[str], prompt: Optional[str]) -> str:
+        return digest_key(audio_hash, model, language, prompt)
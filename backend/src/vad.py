@@ -0,0 +1,146 @@
+"""
+Energy-based voice activity detection over 16-bit PCM.
+
+Frames are classified in a single vectorized pass: a frame is speech when its energy
+clears both an absolute floor and a margin above the recording's own noise floor.
+Short bursts are discarded and speech regions are padded with a hangover so that
+word onsets and tails are not clipped.
+"""
+
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_FRAME_SECONDS = 0.03
+DEFAULT_MIN_RMS = float(os.getenv("VAD_MIN_RMS", "200"))
+DEFAULT_MARGIN_DB = float(os.getenv("VAD_MARGIN_DB", "12"))
+DEFAULT_HANGOVER_SECONDS = float(os.getenv("VAD_HANGOVER_SECONDS", "0.3"))
+DEFAULT_MIN_SPEECH_SECONDS = 0.09
+NOISE_FLOOR_PERCENTILE = 10
+LOUD_PERCENTILE = 90
+
+
+def frame_rms(samples: np.ndarray, frame: int) -> np.ndarray:
+    """Return the RMS of each complete frame of samples."""
+    frames = len(samples) // frame
+    if frames == 0:
+        return np.zeros(0, dtype=np.float32)
+    framed = samples[:frames * frame].astype(np.float32).reshape(frames, frame)
+    return np.sqrt(np.square(framed).mean(axis=1))
+
+
+def speech_frames(samples: np.ndarray, frame: int, min_rms: float = DEFAULT_MIN_RMS) -> np.ndarray:
+    """Classify complete frames as speech using only the absolute energy floor."""
+    return frame_rms(samples, frame) >= min_rms
+
+
+def _mask_to_regions(mask: np.ndarray) -> List[Tuple[int, int]]:
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+class VadResult:
+    """
+    Speech regions found in a recording.
+
+    Attributes:
+        regions (List[Tuple[int, int]]): (start, end) sample offsets of each speech region.
+        total_samples (int): Length of the analysed audio.
+        sample_rate (int): The sample rate in Hz.
+    """
+
+    def __init__(self, regions: List[Tuple[int, int]], total_samples: int, sample_rate: int):
+        self.regions = regions
+        self.total_samples = total_samples
+        self.sample_rate = sample_rate
+
+    @property
+    def speech_samples(self) -> int:
+        return sum(end - start for start, end in self.regions)
+
+    @property
+    def skipped_seconds(self) -> float:
+        return (self.total_samples - self.speech_samples) / self.sample_rate
+
+    @property
+    def has_speech(self) -> bool:
+        return bool(self.regions)
+
+    def compact(self, samples: np.ndarray) -> Tuple[np.ndarray, "SpeechMap"]:
+        """Concatenate the speech regions, dropping everything else."""
+        if not self.regions:
+            return samples[:0], SpeechMap([])
+        return np.concatenate([samples[start:end] for start, end in self.regions]), SpeechMap(self.regions)
+
+
+class SpeechMap:
+    """Maps sample offsets in compacted (speech-only) audio back to the original recording."""
+
+    def __init__(self, regions: List[Tuple[int, int]]):
+        self.starts = np.array([start for start, _ in regions], dtype=np.int64)
+        lengths = np.array([end - start for start, end in regions], dtype=np.int64)
+        self.compact_starts = np.concatenate(([0], np.cumsum(lengths)[:-1])) if len(regions) else lengths
+
+    def to_original(self, offset: int) -> int:
+        if len(self.starts) == 0:
+            return offset
+        index = max(int(np.searchsorted(self.compact_starts, offset, side='right')) - 1, 0)
+        return int(self.starts[index] + offset - self.compact_starts[index])
+
+
+def detect_speech(
+    samples: np.ndarray,
+    sample_rate: int,
+    frame_seconds: float = DEFAULT_FRAME_SECONDS,
+    min_rms: float = DEFAULT_MIN_RMS,
+    margin_db: Optional[float] = DEFAULT_MARGIN_DB,
+    hangover_seconds: float = DEFAULT_HANGOVER_SECONDS,
+    min_speech_seconds: float = DEFAULT_MIN_SPEECH_SECONDS,
+) -> VadResult:
+    """
+    Find the speech regions of a recording.
+
+    Args:
+        samples (np.ndarray): Mono int16 samples.
+        sample_rate (int): The sample rate in Hz.
+        frame_seconds (float): Analysis frame length.
+        min_rms (float): Frames quieter than this are never speech.
+        margin_db (Optional[float]): Required margin above the estimated noise floor. None disables the adaptive threshold.
+        hangover_seconds (float): Padding added on both sides of each speech region.
+        min_speech_seconds (float): Louder bursts shorter than this are treated as noise.
+
+    Returns:
+        VadResult: The speech regions in sample offsets.
+    """
+    frame = max(1, int(frame_seconds * sample_rate))
+    rms = frame_rms(samples, frame)
+    if len(rms) == 0:
+        return VadResult([], len(samples), sample_rate)
+
+    threshold = min_rms
+    if margin_db is not None:
+        noise_floor, loud = np.percentile(rms, [NOISE_FLOOR_PERCENTILE, LOUD_PERCENTILE])
+        # Never demand more than half the loud level, or recordings with little silence would lose their speech
+        threshold = max(threshold, min(noise_floor * 10 ** (margin_db / 20), loud / 2))
+    mask = rms >= threshold
+
+    # Drop bursts too short to be speech
+    min_frames = max(1, int(round(min_speech_seconds / frame_seconds)))
+    for start, end in _mask_to_regions(mask):
+        if end - start < min_frames:
+            mask[start:end] = False
+
+    # Extend speech on both sides so onsets and tails are kept
+    hangover = int(round(hangover_seconds / frame_seconds))
+    if hangover and mask.any():
+        mask = np.convolve(mask.astype(np.int8), np.ones(2 * hangover + 1, dtype=np.int8), mode='same') > 0
+
+    regions = [
+        (start * frame, end * frame if end < len(mask) else len(samples))
+        for start, end in _mask_to_regions(mask)
+    ]
+    return VadResult(regions, len(samples), sample_rate)
+
@@ -0,0 +1,139 @@
+import unittest
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+import groq
+import httpx
+from fastapi.testclient import TestClient
+
+# Add the parent directory to the Python path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from src import main
+
+class FakeBackend:
+    name = "fake"
+
+    def __init__(self):
+        self.closed = False
+
+    async def warm_up(self):
+        pass
+
+    async def aclose(self):
+        self.closed = True
+
+class TestAppStartup(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        for name, value in {
+            "JOBS_DB": os.path.join(self.temp_dir.name, "jobs.sqlite"),
+            "JOBS_DIR": os.path.join(self.temp_dir.name, "jobs"),
+            "job_queue": None,
+            "transcription_backend": None,
+        }.items():
+            patcher = patch.object(main, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = patch.object(main.limiter, "enabled", False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(lambda: main.job_queue and main.job_queue.store.close())
+
+    def wait_until_ready(self, client, timeout=5):
+        deadline = time.monotonic() + timeout
+        response = client.get("/ready")
+        while response.status_code != 200 and time.monotonic() < deadline:
+            time.sleep(0.01)
+            response = client.get("/ready")
+        return response
+
+    def test_import_has_no_side_effects(self):
+        script = (
+            "import json, sys; sys.path.insert(0, sys.argv[1]); from src import main; "
+            "print(json.dumps([main.transcription_backend, main.job_queue, main.ready]))"
+        )
+        env = dict(
+            os.environ, GROQ_API_KEY="test", JOBS_DB="data/jobs.sqlite", JOBS_DIR="data/jobs",
+            TRANSCRIPTION_CACHE_DB="transcriptions.sqlite", REPORT_CACHE_DB="reports.sqlite",
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", script, BACKEND_DIR], cwd=self.temp_dir.name, env=env, capture_output=True, text=True
+        )
+
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(json.loads(result.stdout.strip().splitlines()[-1]), [None, None, False])
+        self.assertEqual(os.listdir(self.temp_dir.name), [])
+
+    def test_ready_once_started(self):
+        backend = FakeBackend()
+        with patch.object(main, "create_backend", return_value=backend):
+            # Without the lifespan the app is alive but not ready
+            self.assertEqual(TestClient(main.app).get("/ready").status_code, 503)
+
+            with TestClient(main.app) as client:
+                response = self.wait_until_ready(client)
+                health = client.get("/health").json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"status": "ready", "transcription_backend": "fake"})
+        self.assertEqual(health["status"], "healthy")
+        self.assertEqual(health["jobs"]["workers"], main.JOB_WORKERS)
+        self.assertTrue(backend.closed)
+        self.assertIsNone(main.transcription_backend)
+
+    def test_not_ready_without_backend(self):
+        with patch.object(main, "create_backend", side_effect=ValueError("GROQ_API_KEY environment variable is not set.")):
+            with TestClient(main.app) as client:
+                ready = client.get("/ready")
+                health = client.get("/health")
+
+        self.assertEqual(ready.status_code, 503)
+        self.assertEqual(ready.json()["status"], "unavailable")
+        self.assertEqual(health.status_code, 200)
+        self.assertEqual(health.json()["status"], "unhealthy")
+
+class RateLimitedBackend:
+    name = "rate-limited"
+
+    async def transcribe_audio(self, audio_file, **kwargs):
+        request = httpx.Request("POST", "https://api.groq.com/openai/v1/audio/transcriptions")
+        response = httpx.Response(429, headers={"Retry-After": "2.5"}, request=request)
+        raise groq.RateLimitError("Rate limit reached", response=response, body=None)
+
+class TestUploadAudio(unittest.TestCase):
+    def test_upstream_rate_limit_returns_429(self):
+        with patch.object(main, "transcription_backend", RateLimitedBackend()), \
+                patch.object(main, "get_transcoder", return_value=None), \
+                patch.object(main.limiter, "enabled", False):
+            response = TestClient(main.app).post(
+                "/api/v1/upload-audio", files={"file": ("call.mp3", b"not really audio", "audio/mpeg")}
+            )
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["Retry-After"], "3")
+        self.assertEqual(response.json(), {"detail": "Rate limit exceeded", "retry_after": 2.5})
+
+class TestTranscriptionJob(unittest.IsolatedAsyncioTestCase):
+    async def test_retry_reuses_saved_transcription(self):
+        job = {
+            "id": "job", "lane": "live", "input_path": None,
+            "payload": {"filename": "call.mp3", "path": "missing.mp3", "report_type": "Crown Brief"},
+            "result": {"text": "saved transcription", "segments": [], "skipped_seconds": 0.0},
+        }
+        with patch.object(main, "transcription_backend", RateLimitedBackend()), \
+                patch.object(main, "generate_report", return_value="report") as generate_report:
+            result = await main.run_transcription_job(job)
+
+        self.assertEqual(result["report"], "report")
+        self.assertEqual(generate_report.call_args.args[:2], ("saved transcription", "Crown Brief"))
+
+if __name__ == '__main__':
+    unittest.main()
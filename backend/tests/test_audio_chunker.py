@@ -0,0 +1,192 @@
+import unittest
+import io
+import os
+import sys
+import tempfile
+import wave
+import numpy as np
+from unittest.mock import patch
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.audio_chunker import PcmAudio, decode_audio, pcm_to_wav, plan_chunks, stitch_texts, transcribe_chunks, transcribe_recording
+from src.audio_ingest import IngestedAudio
+
+def tone(seconds, sample_rate=16000, amplitude=8000):
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    return (amplitude * np.sin(2 * np.pi * 440 * t)).astype(np.int16)
+
+class FakeClient:
+    def __init__(self, texts):
+        self.texts = texts
+        self.calls = []
+
+    async def transcribe_audio(self, audio_file, language=None, priority=None, max_retries=None):
+        filename, data = audio_file
+        self.calls.append(filename)
+        if not filename.startswith('chunk_'):
+            return self.texts[0]
+        index = int(filename.split('_')[1].split('.')[0])
+        return self.texts[index]
+
+class FakeTimestampedClient:
+    supports_timestamps = True
+
+    def __init__(self, words):
+        self.words = words
+
+    async def transcribe_timestamped(self, audio_file, language=None, priority=None, max_retries=None):
+        index = int(audio_file[0].split('_')[1].split('.')[0])
+        words = [{"word": word, "start": start, "end": end} for word, start, end in self.words[index]]
+        return {"text": " ".join(word["word"] for word in words), "segments": [], "words": words}
+
+# Stands in for ffmpeg: copies its input, a path or stdin, to stdout as if it were PCM
+FAKE_FFMPEG = """#!{python}
+import shutil, sys
+source = sys.argv[sys.argv.index("-i") + 1]
+with open(sys.argv[0] + ".source", "w") as log:
+    log.write(source)
+with (sys.stdin.buffer if source == "pipe:0" else open(source, "rb")) as audio:
+    shutil.copyfileobj(audio, sys.stdout.buffer)
+"""
+
+class TestDecodeFfmpeg(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.ffmpeg = os.path.join(self.temp_dir.name, "ffmpeg")
+        with open(self.ffmpeg, "w") as script:
+            script.write(FAKE_FFMPEG.format(python=sys.executable))
+        os.chmod(self.ffmpeg, 0o755)
+        patcher = patch("src.audio_chunker.shutil.which", return_value=self.ffmpeg)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.samples = np.arange(3 * 1024 * 1024, dtype=np.int16)  # Several feed chunks
+
+    def source(self):
+        with open(self.ffmpeg + ".source") as log:
+            return log.read()
+
+    def test_spooled_upload_is_streamed_to_stdin(self):
+        with tempfile.SpooledTemporaryFile(max_size=1024) as upload:
+            upload.write(self.samples.tobytes())
+            pcm = decode_audio(upload, "call.mp3")
+            self.assertEqual(upload.tell(), 0)
+
+        self.assertEqual(self.source(), "pipe:0")
+        np.testing.assert_array_equal(pcm.samples, self.samples)
+
+    def test_file_on_disk_is_read_by_ffmpeg(self):
+        path = os.path.join(self.temp_dir.name, "call.mp3")
+        with open(path, "wb") as recording:
+            recording.write(self.samples.tobytes())
+
+        with open(path, "rb") as recording:
+            pcm = decode_audio(recording, "call.mp3")
+
+        self.assertEqual(self.source(), path)
+        np.testing.assert_array_equal(pcm.samples, self.samples)
+
+class TestAudioChunker(unittest.IsolatedAsyncioTestCase):
+    def test_wav_round_trip_downmixes_stereo(self):
+        stereo = np.stack([tone(1), tone(1)], axis=1)
+        wav_data = io.BytesIO()
+        with wave.open(wav_data, 'wb') as wav_file:
+            wav_file.setnchannels(2)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(16000)
+            wav_file.writeframes(stereo.tobytes())
+        wav_data.seek(0)
+
+        audio = decode_audio(wav_data, "interview.wav")
+
+        self.assertEqual(audio.sample_rate, 16000)
+        self.assertEqual(len(audio.samples), 16000)
+        self.assertEqual(wav_data.tell(), 0)
+
+        decoded = decode_audio(io.BytesIO(pcm_to_wav(audio.samples)), "again.wav")
+        np.testing.assert_array_equal(decoded.samples, audio.samples)
+
+    def test_plan_chunks_overlaps_and_covers_audio(self):
+        audio = PcmAudio(tone(100))
+        chunks = plan_chunks(audio, window_seconds=30, overlap_seconds=2, split_on_silence=False)
+
+        self.assertEqual(chunks[0], (0, 30 * 16000))
+        self.assertEqual(chunks[-1][1], len(audio.samples))
+        for (_, previous_end), (start, _) in zip(chunks, chunks[1:]):
+            self.assertEqual(previous_end - start, 2 * 16000)
+
+    def test_plan_chunks_cuts_at_silence(self):
+        samples = np.concatenate([tone(27.5), np.zeros(16000, dtype=np.int16), tone(13)])
+        chunks = plan_chunks(PcmAudio(samples), window_seconds=30, overlap_seconds=1)
+
+        first_end = chunks[0][1] / 16000
+        self.assertGreaterEqual(first_end, 27.5)
+        self.assertLessEqual(first_end, 28.5)
+
+    def test_stitch_texts_removes_overlap(self):
+        previous = "the suspect left the building at about nine"
+        current = "at about nine, he drove north on Dawson Road"
+        self.assertEqual(stitch_texts(previous, current), "he drove north on Dawson Road")
+
+    def test_stitch_texts_keeps_text_without_overlap(self):
+        self.assertEqual(stitch_texts("first part", "second part here"), "second part here")
+
+    async def test_transcribe_chunks_builds_segments(self):
+        audio = PcmAudio(tone(50))
+        chunks = plan_chunks(audio, window_seconds=20, overlap_seconds=2, split_on_silence=False)
+        client = FakeClient([
+            "officer arrived on scene",
+            "on scene and spoke with the complainant",
+            "the complainant declined medical attention",
+        ])
+
+        text, segments = await transcribe_chunks(client, audio, chunks, max_workers=2)
+
+        self.assertEqual(len(client.calls), 3)
+        self.assertEqual(text, "officer arrived on scene and spoke with the complainant declined medical attention")
+        self.assertEqual([s["start"] for s in segments], [0.0, 20.0, 38.0])
+        self.assertEqual(segments[-1]["end"], 50.0)
+
+    async def test_transcribe_chunks_with_word_timestamps(self):
+        audio = PcmAudio(tone(38))
+        chunks = plan_chunks(audio, window_seconds=20, overlap_seconds=2, split_on_silence=False)
+        client = FakeTimestampedClient([
+            [("Officer", 1.0, 1.5), ("arrived.", 1.6, 2.0), ("Suspect", 18.5, 19.0), ("fled", 19.2, 19.6)],
+            # The second chunk starts at 18 s and hears "fled" again in the overlap
+            [("fled", 1.2, 1.6), ("north.", 2.0, 2.5), ("Pursuit", 10.0, 10.5), ("ended.", 10.6, 11.0)],
+        ])
+
+        text, segments = await transcribe_chunks(client, audio, chunks)
+
+        self.assertEqual(text, "Officer arrived. Suspect fled north. Pursuit ended.")
+        self.assertEqual([(s["start"], s["end"]) for s in segments], [(1.0, 2.0), (18.5, 20.5), (28.0, 29.0)])
+        self.assertEqual(segments[1]["words"][-1], {"word": "north.", "start": 20.0, "end": 20.5})
+
+    async def test_transcribe_recording_skips_silent_audio(self):
+        wav_bytes = pcm_to_wav(np.zeros(16000 * 30, dtype=np.int16))
+        client = FakeClient(["should not be called"])
+
+        with IngestedAudio("silence.wav", io.BytesIO(wav_bytes), len(wav_bytes)) as audio:
+            text, segments, skipped = await transcribe_recording(client, audio, max_request_size=25 * 1024 * 1024)
+
+        self.assertEqual((text, segments, skipped), ("", [], 30.0))
+        self.assertEqual(client.calls, [])
+
+    async def test_transcribe_recording_trims_silence(self):
+        samples = np.concatenate([np.zeros(16000 * 10, dtype=np.int16), tone(5)])
+        wav_bytes = pcm_to_wav(samples)
+        client = FakeClient(["officer arrived on scene"])
+
+        with IngestedAudio("scene.wav", io.BytesIO(wav_bytes), len(wav_bytes)) as audio:
+            text, segments, skipped = await transcribe_recording(client, audio, max_request_size=25 * 1024 * 1024)
+
+        self.assertEqual(text, "officer arrived on scene")
+        self.assertEqual(client.calls, ["chunk_0.wav"])
+        self.assertAlmostEqual(skipped, 9.7, delta=0.05)
+        self.assertAlmostEqual(segments[0]["start"], 9.7, delta=0.05)
+        self.assertEqual(segments[0]["end"], 15.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import io
+import os
+import sys
+from fastapi import UploadFile
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.audio_ingest import spool_upload, UploadTooLargeError
+
+class CountingStream(io.BytesIO):
+    def __init__(self, data):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.bytes_read += len(chunk)
+        return chunk
+
+class TestAudioIngest(unittest.IsolatedAsyncioTestCase):
+    async def test_spool_upload_round_trip(self):
+        data = os.urandom(10_000)
+        upload = UploadFile(file=io.BytesIO(data), filename="../evidence.mp3")
+
+        with await spool_upload(upload, max_size=20_000, chunk_size=1024) as audio:
+            self.assertEqual(audio.size, len(data))
+            self.assertEqual(audio.filename, "evidence.mp3")
+            filename, buffer = audio.as_upload()
+            self.assertEqual(filename, "evidence.mp3")
+            self.assertEqual(buffer.read(), data)
+
+    async def test_rejects_while_streaming(self):
+        stream = CountingStream(b"x" * 100_000)
+        upload = UploadFile(file=stream, filename="long.wav")
+
+        with self.assertRaises(UploadTooLargeError):
+            await spool_upload(upload, max_size=10_000, chunk_size=4096)
+        self.assertLess(stream.bytes_read, 20_000)
+
+    async def test_rejects_declared_size_before_reading(self):
+        stream = CountingStream(b"x" * 100)
+        upload = UploadFile(file=stream, filename="long.wav", size=50_000)
+
+        with self.assertRaises(UploadTooLargeError):
+            await spool_upload(upload, max_size=10_000)
+        self.assertEqual(stream.bytes_read, 0)
+
+if __name__ == '__main__':
+    unittest.main()
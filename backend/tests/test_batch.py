@@ -0,0 +1,167 @@
+import unittest
+import json
+import os
+import sys
+import tempfile
+import threading
+import wave
+from unittest.mock import patch
+
+import numpy as np
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.batch import AdaptiveLimiter, BatchRunner, find_recordings
+from src.scheduler import PRIORITY_BATCH
+
+class RateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after):
+        super().__init__("Rate limit exceeded")
+        self.headers = {"Retry-After": retry_after}
+
+class StubClient:
+    def __init__(self, rate_limited_calls=0, failing=()):
+        self.rate_limited_calls = rate_limited_calls
+        self.failing = set(failing)
+        self.calls = []
+        self.priorities = set()
+        self.max_retries = set()
+        self.lock = threading.Lock()
+
+    def transcribe_audio(self, audio_file, language=None, priority=None, max_retries=None):
+        filename, file = audio_file
+        with self.lock:
+            self.calls.append(filename)
+            self.priorities.add(priority)
+            self.max_retries.add(max_retries)
+            if self.rate_limited_calls:
+                self.rate_limited_calls -= 1
+                raise RateLimitError("0.01")
+        if filename in self.failing:
+            raise RuntimeError("Unsupported audio")
+        if isinstance(file, bytes):
+            return f"{len(file)} bytes of audio"
+        return f"text of {file.read().decode()}"
+
+class TestAdaptiveLimiter(unittest.TestCase):
+    def test_increases_after_successes_and_halves_on_rate_limit(self):
+        limiter = AdaptiveLimiter(initial=4, maximum=8)
+        for _ in range(4):
+            limiter.on_success()
+        self.assertEqual(limiter.limit, 5)
+
+        limiter.on_rate_limited(0)
+        self.assertEqual(limiter.limit, 2)
+        self.assertEqual(limiter.rate_limited, 1)
+
+    def test_simultaneous_rate_limits_back_off_once(self):
+        limiter = AdaptiveLimiter(initial=8, maximum=8)
+        limiter.on_rate_limited(10)
+        limiter.on_rate_limited(10)
+
+        self.assertEqual(limiter.limit, 4)
+
+    def test_limit_stays_within_bounds(self):
+        limiter = AdaptiveLimiter(initial=1, maximum=1)
+        limiter.on_rate_limited(0)
+        limiter.on_success()
+
+        self.assertEqual(limiter.limit, 1)
+
+class TestBatchRunner(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.recordings = os.path.join(self.temp_dir.name, "recordings")
+        os.makedirs(os.path.join(self.recordings, "2023"))
+        for name in ["a.wav", "b.mp3", os.path.join("2023", "c.wav"), "notes.txt"]:
+            with open(os.path.join(self.recordings, name), "w") as recording:
+                recording.write(os.path.basename(name))
+        self.output = os.path.join(self.temp_dir.name, "results.jsonl")
+
+    def read_output(self):
+        with open(self.output) as output:
+            return [json.loads(line) for line in output]
+
+    def test_find_recordings_skips_unsupported_files(self):
+        ids = [item_id for item_id, _ in find_recordings(self.recordings)]
+
+        self.assertEqual(ids, [os.path.join("2023", "c.wav"), "a.wav", "b.mp3"])
+
+    def test_writes_a_record_per_file_with_reports(self):
+        runner = BatchRunner(StubClient(), self.output, report_type="Crown Brief", report_generator=lambda text, report_type: f"{report_type}: {text}")
+
+        summary = runner.run(find_recordings(self.recordings))
+
+        self.assertEqual(summary["succeeded"], 3)
+        records = {record["id"]: record for record in self.read_output()}
+        self.assertEqual(records["a.wav"]["text"], "text of a.wav")
+        self.assertEqual(records["a.wav"]["report"], "Crown Brief: text of a.wav")
+
+    def test_requests_queue_behind_live_traffic(self):
+        client = StubClient()
+        BatchRunner(client, self.output).run(find_recordings(self.recordings))
+
+        self.assertEqual(client.priorities, {PRIORITY_BATCH})
+        # The runner retries 429s itself, so the scheduler must not retry them again
+        self.assertEqual(client.max_retries, {0})
+
+    def test_rate_limited_requests_are_retried(self):
+        client = StubClient(rate_limited_calls=2)
+        runner = BatchRunner(client, self.output, initial_concurrency=4)
+
+        summary = runner.run(find_recordings(self.recordings))
+
+        self.assertEqual(summary["succeeded"], 3)
+        self.assertEqual(summary["rate_limited"], 2)
+        self.assertLess(runner.limiter.limit, 4)
+        self.assertEqual(len(client.calls), 5)
+
+    def test_resume_skips_completed_files_and_retries_failures(self):
+        BatchRunner(StubClient(failing={"b.mp3"}), self.output).run(find_recordings(self.recordings))
+        with open(self.output, "a") as output:
+            output.write('{"id": "truncated')  # An interrupted write
+
+        client = StubClient()
+        summary = BatchRunner(client, self.output).run(find_recordings(self.recordings))
+
+        self.assertEqual(client.calls, ["b.mp3"])
+        self.assertEqual(summary["skipped"], 2)
+        self.assertEqual(summary["succeeded"], 1)
+
+    def test_failures_are_recorded(self):
+        summary = BatchRunner(StubClient(failing={"a.wav"}), self.output).run(find_recordings(self.recordings))
+
+        self.assertEqual(summary["failed"], 1)
+        failed = [record for record in self.read_output() if record["status"] == "failed"]
+        self.assertEqual(failed[0]["error"], "Unsupported audio")
+
+    def test_oversized_recordings_are_chunked(self):
+        path = os.path.join(self.recordings, "interview.wav")
+        t = np.arange(16000 * 3) / 16000
+        with wave.open(path, "wb") as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(16000)
+            wav_file.writeframes((8000 * np.sin(2 * np.pi * 440 * t)).astype(np.int16).tobytes())
+        client = StubClient(rate_limited_calls=1)
+
+        # Every recording is "too large", so even the short one goes through the chunker
+        with patch("src.batch.MAX_REQUEST_SIZE", 1000):
+            BatchRunner(client, self.output).run([("interview.wav", path)])
+
+        record = self.read_output()[0]
+        self.assertEqual(record["status"], "succeeded", record.get("error"))
+        self.assertEqual(record["attempts"], 2)
+        self.assertEqual(client.calls, ["chunk_0.wav", "chunk_0.wav"])  # Sent as a chunk, retried once after the 429
+        self.assertEqual((client.priorities, client.max_retries), ({PRIORITY_BATCH}, {0}))
+
+    def test_max_attempts_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            BatchRunner(StubClient(), self.output, max_attempts=0)
+
+if __name__ == '__main__':
+    unittest.main()
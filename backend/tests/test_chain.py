@@ -0,0 +1,262 @@
+import unittest
+import os
+import sys
+import time
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.chain import FusionChain, MinimalChainable, compile_prompt
+
+class FakeModel:
+    def __init__(self, model_id, delay=0.0, reply=None, error=None):
+        self.model_id = model_id
+        self.delay = delay
+        self.reply = reply or f"report from {model_id}"
+        self.error = error
+
+def call_model(model, prompt):
+    time.sleep(model.delay)
+    if model.error:
+        raise model.error
+    return model.reply
+
+def stream_model(model, prompt):
+    for word in model.reply.split(" "):
+        time.sleep(model.delay)
+        yield word + " "
+
+def length_evaluator(outputs):
+    scores = [len(output) / 100 for output in outputs]
+    return outputs[scores.index(max(scores))], scores
+
+def run(models, **kwargs):
+    return FusionChain.run_concurrent(
+        context={},
+        models=models,
+        callable=call_model,
+        prompts=["write the report"],
+        evaluator=length_evaluator,
+        get_model_name=lambda model: model.model_id,
+        **kwargs,
+    )
+
+class TestFusionChainConcurrent(unittest.TestCase):
+    def test_results_keep_model_order(self):
+        models = [FakeModel("slow", 0.1), FakeModel("medium", 0.05), FakeModel("fast", 0.0)]
+        result = run(models)
+
+        self.assertEqual(result.llm_identifiers, ["slow", "medium", "fast"])
+        self.assertEqual([outputs[-1] for outputs in result.all_prompt_responses],
+                         ["report from slow", "report from medium", "report from fast"])
+        self.assertEqual(result.errors, [None, None, None])
+
+    def test_models_run_concurrently(self):
+        models = [FakeModel(f"m{i}", 0.1) for i in range(3)]
+        started = time.monotonic()
+        run(models)
+        self.assertLess(time.monotonic() - started, 0.25)
+
+    def test_timeout_drops_late_models(self):
+        models = [FakeModel("fast"), FakeModel("stuck", 1.0)]
+        started = time.monotonic()
+        result = run(models, timeout=0.1)
+
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(result.top_response, "report from fast")
+        self.assertEqual(result.all_prompt_responses[1], [])
+        self.assertEqual(result.performance_scores[1], 0.0)
+        self.assertEqual(result.errors[1], "Timed out")
+
+    def test_failures_are_recorded(self):
+        models = [FakeModel("broken", error=ValueError("bad key")), FakeModel("ok")]
+        result = run(models)
+
+        self.assertEqual(result.top_response, "report from ok")
+        self.assertIn("bad key", result.errors[0])
+
+    def test_all_failures_raise(self):
+        with self.assertRaises(RuntimeError):
+            run([FakeModel("broken", error=ValueError("bad key"))])
+
+    def test_quorum_returns_early(self):
+        models = [FakeModel("slow", 1.0), FakeModel("fast", 0.0, reply="x" * 80)]
+        started = time.monotonic()
+        result = run(models, quorum=1, score_threshold=0.5)
+
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(result.top_response, "x" * 80)
+        self.assertEqual(result.errors[0], "Abandoned after early return")
+
+    def test_quorum_waits_when_below_threshold(self):
+        models = [FakeModel("good", 0.05, reply="y" * 90), FakeModel("weak", 0.0, reply="short")]
+        result = run(models, quorum=1, score_threshold=0.8)
+
+        self.assertEqual(result.top_response, "y" * 90)
+        self.assertEqual(result.errors, [None, None])
+
+    def test_run_parallel_keeps_model_order(self):
+        models = [FakeModel("slow", 0.05), FakeModel("fast")]
+        result = FusionChain.run_parallel(
+            context={},
+            models=models,
+            callable=call_model,
+            prompts=["write the report"],
+            evaluator=length_evaluator,
+            get_model_name=lambda model: model.model_id,
+        )
+        self.assertEqual(result.all_prompt_responses[0], ["report from slow"])
+
+class TestFusionChainCascade(unittest.TestCase):
+    def cascade(self, models, **kwargs):
+        called = []
+
+        def call(model, prompt):
+            called.append(model.model_id)
+            return call_model(model, prompt)
+
+        result = FusionChain.run_cascade(
+            context={},
+            models=models,
+            callable=call,
+            prompts=["write the report"],
+            evaluator=length_evaluator,
+            get_model_name=lambda model: model.model_id,
+            **kwargs,
+        )
+        return result, called
+
+    def test_first_good_enough_answer_is_returned(self):
+        models = [FakeModel("small", reply="x" * 70), FakeModel("large", reply="x" * 90)]
+        result, called = self.cascade(models, score_threshold=0.6)
+
+        self.assertEqual(called, ["small"])
+        self.assertEqual(result.served_tier, 0)
+        self.assertEqual(result.top_response, "x" * 70)
+        self.assertEqual(result.performance_scores, [0.7, 0.0])
+        self.assertEqual(result.errors, [None, None])
+
+    def test_low_scores_failures_and_timeouts_escalate(self):
+        models = [
+            FakeModel("weak", reply="short"),
+            FakeModel("broken", error=ValueError("bad key")),
+            FakeModel("stuck", 1.0),
+            FakeModel("strong", reply="x" * 90),
+        ]
+        finished = []
+        started = time.monotonic()
+        result, called = self.cascade(
+            models, score_threshold=0.6, timeouts=[None, None, 0.1, None],
+            on_model_done=lambda index, seconds, error: finished.append((index, error)),
+        )
+
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(called, ["weak", "broken", "stuck", "strong"])
+        self.assertEqual(result.served_tier, 3)
+        self.assertEqual(result.errors, [None, "ValueError: bad key", "Timed out", None])
+        self.assertEqual(finished, [(0, None), (1, "ValueError: bad key"), (2, "Timed out"), (3, None)])
+
+    def test_best_answer_is_kept_when_none_is_good_enough(self):
+        models = [FakeModel("a", reply="x" * 20), FakeModel("b", reply="x" * 40), FakeModel("c", reply="x" * 30)]
+        result, called = self.cascade(models, score_threshold=0.9)
+
+        self.assertEqual(called, ["a", "b", "c"])
+        self.assertEqual(result.served_tier, 1)
+        self.assertEqual(result.top_response, "x" * 40)
+        self.assertEqual(result.performance_scores, [0.2, 0.4, 0.3])
+
+    def test_no_answer_raises(self):
+        with self.assertRaises(RuntimeError):
+            self.cascade([FakeModel("broken", error=ValueError("bad key"))], score_threshold=0.5)
+
+class TestCompiledPrompt(unittest.TestCase):
+    def test_renders_context_and_output_references(self):
+        template = "{{name}} said {{output[-1]}}; earlier {{output[-2].plate}} and {{output[-2]}}"
+        outputs = [{"plate": "ABC 123"}, "nothing"]
+
+        rendered = compile_prompt(template).render({"name": "Adams"}, outputs)
+
+        self.assertEqual(rendered, 'Adams said nothing; earlier ABC 123 and {"plate": "ABC 123"}')
+
+    def test_unresolved_placeholders_are_left_alone(self):
+        template = "{{missing}} {{output[-1]}} {{output[-1].field}} {{output[-3]}}"
+        rendered = compile_prompt(template).render({}, ["text output"])
+
+        self.assertEqual(rendered, "{{missing}} text output {{output[-1].field}} {{output[-3]}}")
+
+    def test_single_braces_and_json_are_untouched(self):
+        template = 'Return {"name": "{{name}}"} as JSON'
+        self.assertEqual(compile_prompt(template).render({"name": "Adams"}, []), 'Return {"name": "Adams"} as JSON')
+
+    def test_compiled_templates_are_cached(self):
+        self.assertIs(compile_prompt("Describe {{name}}"), compile_prompt("Describe {{name}}"))
+
+    def test_chain_prompts_are_not_cached(self):
+        # Prompts handed to a chain embed the transcript, which must not outlive the request
+        compile_prompt.cache_clear()
+        prompts = ["Transcript: the witness stated {{output[-1]}}"]
+        result = FusionChain.run_concurrent(
+            context={},
+            models=[FakeModel("a"), FakeModel("b")],
+            callable=call_model,
+            prompts=prompts,
+            evaluator=length_evaluator,
+            get_model_name=lambda model: model.model_id,
+        )
+
+        self.assertEqual(result.all_context_filled_prompts[0], prompts)
+        self.assertEqual(compile_prompt.cache_info().currsize, 0)
+
+class TestStreaming(unittest.TestCase):
+    def test_minimal_chainable_streams_last_stage(self):
+        model = FakeModel("m", reply="first stage")
+        tokens = []
+        outputs, prompts = MinimalChainable.run(
+            {"name": "Adams"},
+            model,
+            lambda model, prompt: f"summary for {prompt}",
+            ["Describe {{name}}", "Expand on {{output[-1]}}"],
+            stream_callable=lambda model, prompt: iter(["part one ", "part two"]),
+            on_token=tokens.append,
+        )
+
+        self.assertEqual(prompts, ["Describe Adams", "Expand on summary for Describe Adams"])
+        self.assertEqual(tokens, ["part one ", "part two"])
+        self.assertEqual(outputs[-1], "part one part two")
+
+    def test_fusion_stream_yields_tokens_then_result(self):
+        models = [FakeModel("a", 0.01, reply="alpha beta"), FakeModel("b", 0.01, reply="gamma delta epsilon")]
+        events = list(FusionChain.stream(
+            context={},
+            models=models,
+            callable=call_model,
+            stream_callable=stream_model,
+            prompts=["write the report"],
+            evaluator=length_evaluator,
+            get_model_name=lambda model: model.model_id,
+        ))
+
+        kinds = [kind for kind, _ in events]
+        self.assertEqual(kinds[-1], "result")
+        self.assertEqual(kinds.count("token"), 5)
+        tokens_by_model = {}
+        for kind, payload in events[:-1]:
+            tokens_by_model.setdefault(payload[0], []).append(payload[1])
+        self.assertEqual("".join(tokens_by_model["b"]), "gamma delta epsilon ")
+        self.assertEqual(events[-1][1].top_response, "gamma delta epsilon ")
+
+    def test_fusion_stream_raises_when_every_model_fails(self):
+        stream = FusionChain.stream(
+            context={},
+            models=[FakeModel("broken", error=ValueError("bad key"))],
+            callable=call_model,
+            stream_callable=lambda model, prompt: call_model(model, prompt),
+            prompts=["write the report"],
+            evaluator=length_evaluator,
+            get_model_name=lambda model: model.model_id,
+        )
+        with self.assertRaises(RuntimeError):
+            list(stream)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+import os
+import sys
+import tempfile
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.file_assets import FileAsset
+
+class TestFileAsset(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.path = os.path.join(self.temp_dir.name, "prompt.md")
+        self.write("first version\n", mtime=1_000_000)
+
+    def write(self, text, mtime):
+        with open(self.path, "w") as file:
+            file.write(text)
+        os.utime(self.path, (mtime, mtime))
+
+    def test_loads_once_until_file_changes(self):
+        parse_calls = []
+        asset = FileAsset(self.path, parse=lambda text: parse_calls.append(text) or text.strip())
+        lines = asset.derive(lambda text: text.split())
+
+        self.assertEqual(asset.get(), "first version")
+        self.assertIs(lines.get(), lines.get())
+        self.assertEqual(len(parse_calls), 1)
+
+        self.write("second version\n", mtime=2_000_000)
+
+        self.assertEqual(asset.get(), "second version")
+        self.assertEqual(lines.get(), ["second", "version"])
+        self.assertEqual(len(parse_calls), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+import asyncio
+import os
+import sys
+from unittest.mock import patch, MagicMock
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.groq_client import AsyncGroqClient
+from src.scheduler import PRIORITY_BATCH, PRIORITY_LIVE
+from src.transcription_cache import TranscriptionCache
+
+class TestAsyncGroqClient(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        patcher = patch.dict(os.environ, {"GROQ_API_KEY": "test-key"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_transcribe_audio_returns_text(self):
+        client = AsyncGroqClient(max_concurrency=2, timeout=5)
+        create = MagicMock()
+
+        async def fake_create(**kwargs):
+            create(**kwargs)
+            return MagicMock(text="hello world")
+
+        client.client = MagicMock()
+        client.client.audio.transcriptions.create = fake_create
+
+        text = await client.transcribe_audio(b"audio", language="en")
+
+        self.assertEqual(text, "hello world")
+        self.assertEqual(create.call_args.kwargs["timeout"], 5)
+        await client.aclose()
+
+    async def test_priority_is_passed_to_the_scheduler(self):
+        scheduler = MagicMock()
+
+        async def call_async(model, function, tokens=0, priority=PRIORITY_LIVE, max_retries=None):
+            return MagicMock(text="hello world")
+
+        scheduler.call_async = MagicMock(side_effect=call_async)
+        client = AsyncGroqClient(scheduler=scheduler)
+
+        await client.transcribe_audio(b"audio", priority=PRIORITY_BATCH)
+
+        self.assertEqual(scheduler.call_async.call_args.kwargs["priority"], PRIORITY_BATCH)
+        await client.aclose()
+
+    async def test_concurrency_is_bounded(self):
+        client = AsyncGroqClient(max_concurrency=2, timeout=5)
+        in_flight = 0
+        peak = 0
+
+        async def fake_create(**kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return MagicMock(text="ok")
+
+        client.client = MagicMock()
+        client.client.audio.transcriptions.create = fake_create
+
+        results = await asyncio.gather(*(client.transcribe_audio(b"audio") for _ in range(6)))
+
+        self.assertEqual(results, ["ok"] * 6)
+        self.assertEqual(peak, 2)
+        await client.aclose()
+
+    async def test_cache_hit_skips_api_and_semaphore(self):
+        client = AsyncGroqClient(max_concurrency=1, timeout=5, cache=TranscriptionCache(max_entries=8))
+        calls = []
+
+        async def fake_create(**kwargs):
+            calls.append(kwargs)
+            return MagicMock(text="cached text")
+
+        client.client = MagicMock()
+        client.client.audio.transcriptions.create = fake_create
+
+        first = await client.transcribe_audio(("a.mp3", b"same audio"), language="en")
+        async with client.semaphore:
+            # The only slot is taken, so a miss would block here
+            second = await asyncio.wait_for(client.transcribe_audio(("b.mp3", b"same audio"), language="en"), 1)
+
+        self.assertEqual((first, second), ("cached text", "cached text"))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(client.cache.stats()["hits"], 1)
+        await client.aclose()
+
+    def test_missing_api_key(self):
+        with patch.dict(os.environ, {"GROQ_API_KEY": ""}), patch("src.groq_client.load_dotenv"):
+            with self.assertRaises(ValueError):
+                AsyncGroqClient()
+
+if __name__ == '__main__':
+    unittest.main()
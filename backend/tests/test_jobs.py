@@ -0,0 +1,230 @@
+import unittest
+import asyncio
+import io
+import os
+import sys
+import tempfile
+import threading
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.jobs import JobQueue, JobStore, RetryLater, QUEUED, RUNNING, SUCCEEDED, FAILED
+
+class TestJobQueue(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.db_path = os.path.join(self.temp_dir.name, "jobs.sqlite")
+        self.data_dir = os.path.join(self.temp_dir.name, "jobs")
+
+    def make_queue(self, workers=1):
+        store = JobStore(self.db_path)
+        self.addCleanup(store.close)
+        return JobQueue(store, self.data_dir, workers=workers)
+
+    async def test_job_result_is_stored_and_input_removed(self):
+        queue = self.make_queue()
+
+        async def handler(job):
+            with open(job["input_path"], "rb") as input_file:
+                return {"text": input_file.read().decode(), "name": job["payload"]["name"]}
+
+        queue.register("echo", handler)
+        await queue.start()
+        try:
+            job_id = queue.submit("echo", {"name": "a.wav"}, input_file=io.BytesIO(b"audio"))
+            job = await queue.wait(job_id, timeout=5)
+        finally:
+            await queue.stop()
+
+        self.assertEqual(job["status"], SUCCEEDED)
+        self.assertEqual(job["result"], {"text": "audio", "name": "a.wav"})
+        self.assertFalse(os.path.exists(job["input_path"]))
+
+    async def test_failed_job_records_error(self):
+        queue = self.make_queue()
+
+        async def handler(job):
+            raise RuntimeError("model unavailable")
+
+        queue.register("fail", handler)
+        await queue.start()
+        try:
+            job = await queue.wait(queue.submit("fail", {}), timeout=5)
+        finally:
+            await queue.stop()
+
+        self.assertEqual(job["status"], FAILED)
+        self.assertEqual(job["error"], "model unavailable")
+
+    async def test_live_lane_runs_before_batch(self):
+        queue = self.make_queue()
+        order = []
+
+        async def handler(job):
+            order.append(job["payload"]["name"])
+            return None
+
+        queue.register("record", handler)
+        # Submitted before the workers start, so the lanes decide the order
+        queue.submit("record", {"name": "batch"}, lane="batch")
+        live_id = queue.submit("record", {"name": "live"}, lane="live")
+        await queue.start()
+        try:
+            await queue.wait(live_id, timeout=5)
+            await asyncio.wait_for(queue._queue.join(), 5)
+        finally:
+            await queue.stop()
+
+        self.assertEqual(order, ["live", "batch"])
+
+    async def test_interrupted_jobs_resume_after_restart(self):
+        store = JobStore(self.db_path)
+        job_id = store.create("record", "live", {"name": "resumed"})
+        store.mark_running(job_id)
+        store.close()
+
+        queue = self.make_queue()
+
+        async def handler(job):
+            return job["payload"]["name"]
+
+        queue.register("record", handler)
+        await queue.start()
+        try:
+            job = await queue.wait(job_id, timeout=5)
+        finally:
+            await queue.stop()
+
+        self.assertEqual(job["status"], SUCCEEDED)
+        self.assertEqual(job["result"], "resumed")
+
+    async def test_wait_returns_pending_job_after_timeout(self):
+        queue = self.make_queue()
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def handler(job):
+            started.set()
+            await release.wait()
+
+        queue.register("slow", handler)
+        await queue.start()
+        try:
+            job_id = queue.submit("slow", {})
+            await started.wait()
+            job = await queue.wait(job_id, timeout=0.01)
+            self.assertEqual(job["status"], RUNNING)
+            release.set()
+            job = await queue.wait(job_id, timeout=5)
+        finally:
+            await queue.stop()
+
+        self.assertEqual(job["status"], SUCCEEDED)
+
+    async def test_retry_later_requeues_job(self):
+        queue = self.make_queue()
+        attempts = []
+
+        async def handler(job):
+            attempts.append(job["id"])
+            if len(attempts) < 3:
+                raise RetryLater(0.01)
+            return "done"
+
+        queue.register("flaky", handler)
+        await queue.start()
+        try:
+            job = await queue.wait(queue.submit("flaky", {}), timeout=5)
+        finally:
+            await queue.stop()
+
+        self.assertEqual(job["status"], SUCCEEDED)
+        self.assertEqual(len(attempts), 3)
+
+    async def test_retry_later_fails_after_max_retries(self):
+        store = JobStore(self.db_path)
+        self.addCleanup(store.close)
+        queue = JobQueue(store, self.data_dir, max_retries=1)
+
+        async def handler(job):
+            raise RetryLater(0, "Rate limited")
+
+        queue.register("limited", handler)
+        await queue.start()
+        try:
+            job = await queue.wait(queue.submit("limited", {}), timeout=5)
+        finally:
+            await queue.stop()
+
+        self.assertEqual(job["status"], FAILED)
+        self.assertEqual(job["error"], "Rate limited")
+
+    async def test_saved_progress_survives_retry_and_failure(self):
+        queue = self.make_queue()
+        seen = []
+
+        async def handler(job):
+            seen.append(job["result"])
+            if job["result"] is None:
+                await queue.save_progress(job["id"], {"text": "transcribed"})
+                raise RetryLater(0.01)
+            raise RuntimeError("report failed")
+
+        queue.register("staged", handler)
+        await queue.start()
+        try:
+            job = await queue.wait(queue.submit("staged", {}), timeout=5)
+        finally:
+            await queue.stop()
+
+        self.assertEqual(seen, [None, {"text": "transcribed"}])
+        self.assertEqual(job["status"], FAILED)
+        self.assertEqual(job["result"], {"text": "transcribed"})
+
+    async def test_store_is_not_called_on_the_event_loop(self):
+        queue = self.make_queue()
+        loop_thread = threading.get_ident()
+        threads = []
+        for name in ("get", "mark_running", "mark_succeeded"):
+            method = getattr(queue.store, name)
+            def record(*args, method=method):
+                threads.append(threading.get_ident())
+                return method(*args)
+            setattr(queue.store, name, record)
+
+        async def handler(job):
+            return "done"
+
+        queue.register("record", handler)
+        await queue.start()
+        try:
+            job = await queue.wait(queue.submit("record", {}), timeout=5)
+        finally:
+            await queue.stop()
+
+        self.assertEqual(job["result"], "done")
+        self.assertTrue(threads)
+        self.assertNotIn(loop_thread, threads)
+
+    async def test_submit_rejects_unknown_kind_and_lane(self):
+        queue = self.make_queue()
+        queue.register("record", None)
+
+        with self.assertRaises(ValueError):
+            queue.submit("missing", {})
+        with self.assertRaises(ValueError):
+            queue.submit("record", {}, lane="urgent")
+        self.assertEqual((await queue.stats())["jobs"], {})
+
+    async def test_jobs_queued_without_workers_stay_queued(self):
+        queue = self.make_queue()
+        queue.register("record", None)
+        job_id = queue.submit("record", {})
+
+        self.assertEqual((await queue.get(job_id))["status"], QUEUED)
+        self.assertIsNone(await queue.get("unknown"))
+
+if __name__ == '__main__':
+    unittest.main()
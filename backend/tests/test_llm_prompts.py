@@ -1,15 +1,22 @@
 import unittest
+import json
 import os
 import sys
+import threading
+import time
 from unittest.mock import patch, MagicMock
 
 # Add the parent directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.llm_prompts import generate_user_prompt, generate_report, POLICE_REPORT_SYSTEM_PROMPT
+from src.model_routing import ModelRouter
+from src.scheduler import UpstreamScheduler
+from src.llm_prompts import generate_user_prompt, generate_report, stream_report, update_report, build_models, clear_caches, evaluator, score_reports, EXAMPLE_REPORT, POLICE_REPORT_SYSTEM_PROMPT
 
 class TestLLMPrompts(unittest.TestCase):
     def setUp(self):
+        clear_caches()
+        self.addCleanup(clear_caches)
         # Load the test transcription from the file
         current_dir = os.path.dirname(os.path.abspath(__file__))
         test_transcription_path = os.path.join(current_dir, 'test_transcription.txt')
@@ -26,12 +33,18 @@ class TestLLMPrompts(unittest.TestCase):
         self.assertIn(self.test_transcription, prompt)
         self.assertIn("Crown Brief", prompt)
 
+    def test_transcription_is_inserted_verbatim(self):
+        prompt = generate_user_prompt("He said {{reportType}} and {transcription}", "Crown Brief")
+
+        self.assertIn("He said {{reportType}} and {transcription}", prompt)
+        self.assertNotIn("{{", prompt.replace("{{reportType}}", ""))
+
     def test_generate_user_prompt_invalid_type(self):
         with self.assertRaises(ValueError):
             generate_user_prompt(self.test_transcription, "Invalid Type")
 
     @patch('llm.get_model')
-    @patch('src.llm_prompts.FusionChain.run')
+    @patch('src.llm_prompts.FusionChain.run_concurrent')
     def test_generate_report(self, mock_fusion_chain_run, mock_get_model):
         mock_model = MagicMock()
         mock_get_model.side_effect = [mock_model, mock_model, mock_model]
@@ -43,9 +56,9 @@ class TestLLMPrompts(unittest.TestCase):
         report = generate_report(self.test_transcription, "General Occurrence")
         
         self.assertEqual(report, "This is a mock police report.")
-        mock_get_model.assert_any_call("gemma2")
-        mock_get_model.assert_any_call("llama3.1")
-        mock_get_model.assert_any_call("mistral")
+        mock_get_model.assert_any_call("groq-gemma2")
+        mock_get_model.assert_any_call("groq-llama3.1-70b")
+        mock_get_model.assert_any_call("groq-mixtral")
         mock_fusion_chain_run.assert_called_once()
         
         # Check that the FusionChain.run method was called with the correct arguments
@@ -62,5 +75,246 @@ class TestLLMPrompts(unittest.TestCase):
         self.assertIn(self.test_transcription, user_prompt)
         self.assertIn("General Occurrence", user_prompt)
 
+    def test_evaluator_prefers_reports_closest_to_the_example(self):
+        outputs = ["A short note about the call.", EXAMPLE_REPORT.replace("\n", "\n  ")]
+
+        top_response, scores = evaluator(outputs, transcription=self.test_transcription)
+
+        self.assertEqual(top_response, outputs[1])
+        self.assertEqual(len(scores), 2)
+        dimensions = score_reports(outputs, self.test_transcription)
+        self.assertEqual(dimensions["score"], scores)
+        self.assertEqual(dimensions["similarity"][1], 1.0)
+
+    @patch.dict(os.environ, {"REPORT_MODELS": "groq-mixtral, ollama/llama3.1:8b"})
+    @patch('llm.get_model')
+    def test_build_models_resolves_ollama_models(self, mock_get_model):
+        mock_get_model.return_value = MagicMock(model_id="groq-mixtral")
+
+        models = build_models()
+
+        mock_get_model.assert_called_once_with("groq-mixtral")
+        self.assertEqual([model.model_id for model in models], ["groq-mixtral", "ollama/llama3.1:8b"])
+        self.assertEqual(models[1].model_name, "llama3.1:8b")
+
+    @patch('src.llm_prompts.build_models')
+    def test_stream_report(self, mock_build_models):
+        models = []
+        for model_id, chunks in [("groq-mixtral", ["Short"]), ("groq-gemma2", ["# Incident ", "Report"])]:
+            model = MagicMock()
+            model.model_id = model_id
+            model.prompt.return_value = iter(chunks)
+            models.append(model)
+        mock_build_models.return_value = models
+
+        stream = stream_report(self.test_transcription, "General Occurrence")
+        # Models are resolved by whoever iterates the stream, not on the caller's event loop
+        mock_build_models.assert_not_called()
+        events = list(stream)
+
+        tokens = [event for event in events if event["event"] == "token"]
+        self.assertEqual(len(tokens), 3)
+        result = events[-1]
+        self.assertEqual(result["event"], "result")
+        self.assertEqual(result["model"], "groq-gemma2")
+        self.assertEqual(result["report"], "# Incident Report")
+        self.assertEqual(set(result["scores"]), {"groq-mixtral", "groq-gemma2"})
+        models[0].prompt.assert_called_once()
+        self.assertEqual(models[0].prompt.call_args.kwargs["system"], POLICE_REPORT_SYSTEM_PROMPT)
+
+    @patch('src.llm_prompts.build_models')
+    def test_stream_report_names_the_model_the_evaluator_chose(self, mock_build_models):
+        failing = MagicMock()
+        failing.model_id = "groq-mixtral"
+        failing.prompt.side_effect = RuntimeError("Upstream error")
+        working = MagicMock()
+        working.model_id = "groq-gemma2"
+        working.prompt.return_value = iter(["Short"])
+        mock_build_models.return_value = [failing, working]
+        router = ModelRouter()
+
+        # The failed model's 0.0 ties with the only report, which must still be the one named
+        with patch('src.llm_prompts.evaluator', side_effect=lambda outputs, **kwargs: (outputs[0], [0.0])), \
+                patch('src.llm_prompts.get_router', return_value=router):
+            result = list(stream_report(self.test_transcription, "General Occurrence"))[-1]
+
+        self.assertEqual((result["model"], result["report"]), ("groq-gemma2", "Short"))
+        stats = router.stats()
+        self.assertEqual((stats["groq-mixtral"]["runs"], stats["groq-mixtral"]["error_rate"]), (1, 1.0))
+        self.assertEqual((stats["groq-gemma2"]["runs"], stats["groq-gemma2"]["error_rate"]), (1, 0.0))
+
+    @patch('src.llm_prompts.build_models')
+    def test_stream_report_retries_rate_limits(self, mock_build_models):
+        class RateLimited(Exception):
+            status_code = 429
+            headers = {"Retry-After": "0"}
+
+        model = MagicMock()
+        model.model_id = "groq-gemma2"
+        model.prompt.side_effect = [RateLimited(), iter(["# Incident ", "Report"])]
+        mock_build_models.return_value = [model]
+
+        with patch('src.llm_prompts.get_scheduler', return_value=UpstreamScheduler(backoff=0)):
+            events = list(stream_report(self.test_transcription, "General Occurrence"))
+
+        self.assertEqual(events[-1]["report"], "# Incident Report")
+        self.assertEqual(model.prompt.call_count, 2)
+
+    @patch('src.llm_prompts.build_models')
+    def test_repeated_reports_reuse_cached_responses(self, mock_build_models):
+        models = []
+        for model_id, outputs in [("groq-mixtral", [RuntimeError("Upstream error")]), ("groq-gemma2", [EXAMPLE_REPORT])]:
+            model = MagicMock()
+            model.model_id = model_id
+            model.prompt.return_value.text.side_effect = outputs + ["Short"]
+            models.append(model)
+        mock_build_models.return_value = models
+
+        first = generate_report(self.test_transcription, "General Occurrence")
+        second = generate_report(self.test_transcription, "General Occurrence")
+
+        self.assertEqual(first, EXAMPLE_REPORT)
+        self.assertEqual(second, EXAMPLE_REPORT)
+        # Only the model that failed is prompted again
+        self.assertEqual(models[0].prompt.call_count, 2)
+        self.assertEqual(models[1].prompt.call_count, 1)
+
+    def test_user_prompts_share_a_static_prefix(self):
+        first = generate_user_prompt(self.test_transcription, "General Occurrence")
+        second = generate_user_prompt("Officer Duffy attended a noise complaint.", "Crown Brief")
+
+        prefix = os.path.commonprefix([first, second])
+        self.assertIn(EXAMPLE_REPORT, prefix)
+        self.assertGreater(len(prefix), len(first) - len(self.test_transcription) - 200)
+
+    def test_stream_report_invalid_type(self):
+        with self.assertRaises(ValueError):
+            stream_report(self.test_transcription, "Invalid Type")
+
+    @patch('src.llm_prompts.build_models')
+    def test_update_report_regenerates_only_the_edited_paragraph(self, mock_build_models):
+        paragraph = next(line for line in EXAMPLE_REPORT.split("\n") if "very bad joke" in line)
+        updates = ["Here is the report.", "=== narrative 4 ===\n" + paragraph.replace("very bad joke", "prank")]
+        models = []
+        for model_id, update in zip(["groq-mixtral", "groq-gemma2"], updates):
+            model = MagicMock()
+            model.model_id = model_id
+            # A full report first, then an answer to the section update prompt
+            model.prompt.return_value.text.side_effect = [EXAMPLE_REPORT, update]
+            models.append(model)
+        mock_build_models.return_value = models
+
+        first = update_report(self.test_transcription, "General Occurrence")
+        self.assertEqual(first["report"], EXAMPLE_REPORT)
+        self.assertIsNone(first["regenerated_sections"])
+
+        edited = self.test_transcription.replace("very bad joke", "prank")
+        second = update_report(edited, "General Occurrence", first["report_id"])
+
+        self.assertEqual(second["report_id"], first["report_id"])
+        self.assertEqual(second["regenerated_sections"], ["narrative 4"])
+        self.assertEqual(second["report"], EXAMPLE_REPORT.replace("very bad joke", "prank"))
+        incremental_prompt = models[1].prompt.call_args.args[0]
+        self.assertLess(len(incremental_prompt) * 3, len(generate_user_prompt(edited, "General Occurrence")))
+
+        unchanged = update_report(edited, "General Occurrence", first["report_id"])
+        self.assertEqual(unchanged["regenerated_sections"], [])
+        self.assertEqual(models[1].prompt.call_count, 2)
+
+    @patch('src.llm_prompts.build_models')
+    def test_long_transcriptions_are_reported_from_a_fact_sheet(self, mock_build_models):
+        facts = json.dumps({
+            "people": [{"name": "Gerald DUFFY", "details": ["constable", "badge 362"]}],
+            "times": ["Thursday, August 10th, 2023"],
+            "locations": ["Landmark Inn"],
+            "events": ["Police were dispatched to the Landmark Inn."],
+        })
+        prompts = []
+
+        def prompt(text, system=None):
+            prompts.append(text)
+            response = MagicMock()
+            response.text.return_value = facts if "TRANSCRIPTION PART" in text else EXAMPLE_REPORT
+            return response
+
+        model = MagicMock()
+        model.model_id = "groq-mixtral"
+        model.prompt.side_effect = prompt
+        mock_build_models.return_value = [model]
+        transcription = "\n".join([self.test_transcription] * 6)
+
+        report = generate_report(transcription, "General Occurrence")
+
+        self.assertEqual(report, EXAMPLE_REPORT)
+        extraction_prompts, report_prompt = prompts[:-1], prompts[-1]
+        self.assertGreater(len(extraction_prompts), 2)
+        self.assertTrue(all("TRANSCRIPTION PART" in text for text in extraction_prompts))
+        # Every prompt is far shorter than the transcription, and the facts of every part were merged
+        self.assertTrue(all(len(text) < len(transcription) / 2 for text in prompts))
+        self.assertIn("FACT SHEET", report_prompt)
+        self.assertEqual(report_prompt.count("Gerald DUFFY"), 1)
+        self.assertNotIn(self.test_transcription, report_prompt)
+
+    @patch('src.llm_prompts.build_models')
+    def test_cascade_escalates_until_a_report_is_good_enough(self, mock_build_models):
+        replies = {"groq-gemma2": "A short note about the call.", "groq-mixtral": EXAMPLE_REPORT, "groq-llama3.1-70b": EXAMPLE_REPORT}
+        called = []
+
+        def make_model(model_id):
+            def prompt(text, system=None):
+                called.append(model_id)
+                response = MagicMock()
+                response.text.return_value = replies[model_id]
+                return response
+            model = MagicMock()
+            model.model_id = model_id
+            model.prompt.side_effect = prompt
+            return model
+
+        mock_build_models.return_value = [make_model(model_id) for model_id in replies]
+        router = ModelRouter()
+        with patch('src.llm_prompts.REPORT_ROUTING', "cascade"), patch('src.llm_prompts.get_router', return_value=router):
+            report = generate_report(self.test_transcription, "General Occurrence")
+
+        self.assertEqual(report, EXAMPLE_REPORT)
+        self.assertEqual(called, ["groq-gemma2", "groq-mixtral"])
+        stats = router.stats()
+        self.assertEqual(stats["groq-mixtral"]["served"], 1)
+        self.assertEqual(stats["groq-gemma2"]["served"], 0)
+        self.assertEqual(stats["groq-llama3.1-70b"]["runs"], 0)
+
+    @patch('src.llm_prompts.build_models')
+    def test_cascade_records_a_timed_out_model_once(self, mock_build_models):
+        release = threading.Event()
+
+        def make_model(model_id, reply, wait=None):
+            def prompt(text, system=None):
+                if wait is not None:
+                    wait.wait(5)
+                response = MagicMock()
+                response.text.return_value = reply
+                return response
+            model = MagicMock()
+            model.model_id = model_id
+            model.prompt.side_effect = prompt
+            return model
+
+        mock_build_models.return_value = [
+            make_model("groq-gemma2", EXAMPLE_REPORT, wait=release),
+            make_model("groq-mixtral", EXAMPLE_REPORT),
+        ]
+        router = ModelRouter()
+        with patch('src.llm_prompts.REPORT_ROUTING', "cascade"), patch('src.llm_prompts.get_router', return_value=router), \
+                patch('src.llm_prompts.REPORT_MODEL_TIMEOUT', 0.1):
+            report = generate_report(self.test_transcription, "General Occurrence")
+            # The abandoned call returns after the cascade has moved on
+            release.set()
+            time.sleep(0.2)
+
+        self.assertEqual(report, EXAMPLE_REPORT)
+        stats = router.stats()
+        self.assertEqual((stats["groq-gemma2"]["runs"], stats["groq-gemma2"]["error_rate"]), (1, 1.0))
+        self.assertEqual((stats["groq-mixtral"]["runs"], stats["groq-mixtral"]["served"]), (1, 1))
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import metrics
+from src.metrics import Counter, Gauge, Histogram, Registry
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter_renders_one_sample_per_label_set(self):
+        counter = self.registry.register(Counter("uploads_total", "Uploads.", ("status",)))
+        counter.inc(status="ok")
+        counter.inc(2, status="ok")
+        counter.inc(status='bad "quote"')
+
+        text = self.registry.render()
+
+        self.assertIn("# TYPE uploads_total counter", text)
+        self.assertIn('uploads_total{status="ok"} 3', text)
+        self.assertIn('uploads_total{status="bad \\"quote\\""} 1', text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = self.registry.register(Histogram("latency_seconds", "Latency.", ("model",), buckets=(0.1, 1)))
+        for value in (0.05, 0.1, 0.5, 5):
+            histogram.observe(value, model="m")
+
+        text = self.registry.render()
+
+        self.assertIn('latency_seconds_bucket{model="m",le="0.1"} 2', text)
+        self.assertIn('latency_seconds_bucket{model="m",le="1"} 3', text)
+        self.assertIn('latency_seconds_bucket{model="m",le="+Inf"} 4', text)
+        self.assertIn('latency_seconds_sum{model="m"} 5.65', text)
+        self.assertIn('latency_seconds_count{model="m"} 4', text)
+
+    def test_gauge_tracks_blocks_in_progress(self):
+        gauge = Gauge("sessions", "Sessions.", ("endpoint",))
+        with gauge.track(endpoint="/ws"):
+            self.assertEqual(gauge.value(endpoint="/ws"), 1)
+        self.assertEqual(gauge.value(endpoint="/ws"), 0)
+
+    def test_time_stage_records_failed_stages(self):
+        before = (metrics.STAGE_SECONDS.value(stage="test_stage", model="m") or {"count": 0})["count"]
+
+        with self.assertRaises(ValueError):
+            with metrics.time_stage("test_stage", model="m"):
+                raise ValueError("boom")
+
+        self.assertEqual(metrics.STAGE_SECONDS.value(stage="test_stage", model="m")["count"], before + 1)
+
+    def test_disabled_metrics_record_nothing(self):
+        counter = Counter("disabled_total", "Disabled.")
+        with patch.object(metrics, "ENABLED", False):
+            counter.inc()
+            with metrics.time_stage("disabled_stage"):
+                pass
+
+        self.assertIsNone(counter.value())
+        self.assertIsNone(metrics.STAGE_SECONDS.value(stage="disabled_stage", model=""))
+
+class TestProfile(unittest.IsolatedAsyncioTestCase):
+    async def test_cprofile_writes_a_profile(self):
+        with tempfile.TemporaryDirectory() as profile_dir, patch.object(metrics, "PROFILE_DIR", profile_dir):
+            async def handler():
+                return sum(range(1000))
+
+            result, path = await metrics.profile("/api/v1/upload-audio", "cprofile", handler)
+
+            self.assertEqual(result, 499500)
+            self.assertTrue(path.endswith(".prof"))
+            self.assertIn("api_v1_upload_audio", os.path.basename(path))
+            self.assertTrue(os.path.getsize(path) > 0)
+
+if __name__ == '__main__':
+    unittest.main()
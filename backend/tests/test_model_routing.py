@@ -0,0 +1,49 @@
+import unittest
+import os
+import sys
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.model_routing import MIN_SAMPLES, ModelRouter
+
+class TestModelRouter(unittest.TestCase):
+    def test_failing_models_are_tried_last(self):
+        router = ModelRouter(window=10, max_error_rate=0.5)
+        for _ in range(MIN_SAMPLES):
+            router.record("small", 1.0, False)
+            router.record("medium", 2.0, True)
+
+        self.assertEqual(router.order(["small", "medium", "large"]), [1, 2, 0])
+        self.assertFalse(router.stats()["small"]["healthy"])
+
+        # Recovery pushes the failures out of the window
+        for _ in range(10):
+            router.record("small", 1.0, True)
+        self.assertEqual(router.order(["small", "medium", "large"]), [0, 1, 2])
+
+    def test_healthy_models_are_ordered_by_recent_latency(self):
+        router = ModelRouter(window=10)
+        self.assertEqual(router.order(["small", "medium", "large"]), [0, 1, 2])
+
+        for _ in range(MIN_SAMPLES):
+            router.record("small", 4.0, True)
+            router.record("large", 1.0, True)
+        router.record("medium", 0.5, True)  # Too few runs to be placed by latency
+
+        self.assertEqual(router.order(["small", "medium", "large"]), [2, 0, 1])
+
+    def test_deadlines_follow_recent_latency(self):
+        router = ModelRouter(latency_factor=3)
+        self.assertEqual(router.timeout("small", 120), 120)
+
+        for seconds in [1.0] * 19 + [2.0]:
+            router.record("small", seconds, True)
+        router.record("small", 50.0, False)  # Failed runs do not count towards latency
+
+        self.assertEqual(router.timeout("small", 120), 6.0)
+        self.assertEqual(router.timeout("small", 4), 4)
+        self.assertEqual(router.stats()["small"]["p95_seconds"], 2.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import unittest
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ollama_client import OllamaClient, OllamaModel
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, body):
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self.server.record(self.path, None)
+        self.send_json({"models": [{"name": "llama3.1:8b"}, {"name": "mistral:7b"}]})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.record(self.path, body)
+        with self.server.lock:
+            self.server.in_flight += 1
+            self.server.max_in_flight = max(self.server.max_in_flight, self.server.in_flight)
+        try:
+            time.sleep(self.server.delay)
+            words = ["Officer ", "arrived ", "on scene."]
+            if "prompt" not in body:
+                self.send_json({"model": body["model"], "done": True})
+            elif body["stream"]:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                lines = [{"response": word, "done": False} for word in words] + [{"response": "", "done": True}]
+                for line in lines:
+                    data = (json.dumps(line) + "\n").encode()
+                    self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.write(b"0\r\n\r\n")
+            else:
+                self.send_json({"response": "".join(words), "done": True})
+        finally:
+            with self.server.lock:
+                self.server.in_flight -= 1
+
+class StubOllamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubOllamaHandler)
+        self.lock = threading.Lock()
+        self.requests = []
+        self.connections = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.delay = 0.0
+
+    def record(self, path, body):
+        with self.lock:
+            self.requests.append((path, body))
+
+    def process_request(self, request, client_address):
+        self.connections.add(client_address)
+        super().process_request(request, client_address)
+
+class TestOllamaClient(unittest.TestCase):
+    def setUp(self):
+        self.server = StubOllamaServer()
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        host, port = self.server.server_address
+        self.client = OllamaClient(host=f"http://{host}:{port}", keep_alive="10m", max_concurrency=2, models_ttl=60)
+        self.addCleanup(self.client.close)
+
+    def test_generate_reuses_one_connection_and_keeps_model_loaded(self):
+        for _ in range(3):
+            self.assertEqual(self.client.generate("llama3.1:8b", "Summarize", system="Be brief"), "Officer arrived on scene.")
+
+        self.assertEqual(len(self.server.connections), 1)
+        _, body = self.server.requests[0]
+        self.assertEqual(body["keep_alive"], "10m")
+        self.assertEqual(body["system"], "Be brief")
+        self.assertFalse(body["stream"])
+
+    def test_stream_yields_chunks(self):
+        chunks = list(self.client.stream("llama3.1:8b", "Summarize"))
+
+        self.assertEqual(chunks, ["Officer ", "arrived ", "on scene."])
+        self.assertTrue(self.server.requests[0][1]["stream"])
+
+    def test_list_models_is_cached(self):
+        self.assertEqual(self.client.list_models(), ["llama3.1:8b", "mistral:7b"])
+        self.assertTrue(self.client.switch_model("mistral:7b"))
+        self.assertFalse(self.client.switch_model("missing"))
+
+        tag_requests = [path for path, _ in self.server.requests if path == "/api/tags"]
+        self.assertEqual(len(tag_requests), 1)
+        self.assertIn(("/api/generate", {"model": "mistral:7b", "keep_alive": "10m"}), self.server.requests)
+
+        self.client.list_models(refresh=True)
+        self.assertEqual(len([path for path, _ in self.server.requests if path == "/api/tags"]), 2)
+
+    def test_concurrent_prompts_are_bounded(self):
+        self.server.delay = 0.05
+
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            results = list(executor.map(lambda _: self.client.generate("llama3.1:8b", "Summarize"), range(6)))
+
+        self.assertEqual(len(results), 6)
+        self.assertEqual(self.server.max_in_flight, 2)
+
+    def test_unreachable_server(self):
+        client = OllamaClient(host="http://127.0.0.1:9", models_ttl=60)
+        self.addCleanup(client.close)
+
+        self.assertEqual(client.list_models(), [])
+        self.assertIsNone(client.run_ollama_model("llama3.1:8b", "Summarize"))
+
+    def test_model_adapter(self):
+        model = OllamaModel("llama3.1:8b", client=self.client)
+        response = model.prompt("Summarize", system="Be brief")
+
+        self.assertEqual(model.model_id, "ollama/llama3.1:8b")
+        self.assertEqual("".join(response), "Officer arrived on scene.")
+        self.assertEqual(response.text(), "Officer arrived on scene.")
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(model.prompt("Summarize").text(), "Officer arrived on scene.")
+
+if __name__ == '__main__':
+    unittest.main()
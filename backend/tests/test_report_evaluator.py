@@ -0,0 +1,85 @@
+import unittest
+import os
+import sys
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.report_evaluator import DIMENSIONS, ReportTemplate
+
+TEMPLATE = """# Incident Report
+
+**Occurrence number:** TB 2332264
+
+**Occurrence type:** Weapons Reporting
+
+**Persons Details:**
+- **Surname:** ACHNEEPINESKUM
+- **Given 1:** Matthew
+- **Email address:** Not provided
+
+**Narrative:**
+Constable FLUFFY and Constable ADAMS were dispatched to 704 First Street at 0656 hours.
+
+**End of Report**"""
+
+TRANSCRIPT = "Dispatched to 704 First Street at 0656 hours. The complainant, Matthew Achneepineskum, said it was a joke."
+
+class TestReportTemplate(unittest.TestCase):
+    def setUp(self):
+        self.template = ReportTemplate(TEMPLATE)
+
+    def test_parses_sections_and_fields(self):
+        self.assertEqual(self.template.sections, ["incident report", "persons details", "narrative", "end of report"])
+        self.assertEqual(
+            self.template.fields,
+            ["occurrence number", "occurrence type", "surname", "given 1", "email address"],
+        )
+
+    def test_whitespace_and_emphasis_do_not_change_similarity(self):
+        reindented = "\n".join("  " + line for line in TEMPLATE.split("\n"))
+        plain = TEMPLATE.replace("**", "")
+
+        scores = self.template.score([TEMPLATE, reindented, plain])
+
+        self.assertEqual(scores["similarity"], [1.0, 1.0, 1.0])
+        self.assertEqual(scores["section_coverage"], [1.0, 1.0, 1.0])
+        self.assertEqual(scores["field_completeness"][1], scores["field_completeness"][0])
+        self.assertGreater(scores["field_completeness"][2], 0.8)
+
+    def test_dimensions_rank_candidates(self):
+        missing_fields = TEMPLATE.replace("ACHNEEPINESKUM", "").replace("Matthew", "")
+        missing_sections = TEMPLATE.split("**Persons Details:**")[0]
+        unrelated = "The weather is sunny."
+
+        scores = self.template.score([TEMPLATE, missing_fields, missing_sections, unrelated])
+
+        self.assertEqual(set(scores), {"score"} | set(DIMENSIONS))
+        self.assertLess(scores["field_completeness"][1], scores["field_completeness"][0])
+        self.assertEqual(scores["section_coverage"][2], 0.25)
+        self.assertEqual(scores["score"].index(max(scores["score"])), 0)
+        self.assertLess(scores["score"][3], 0.1)
+        self.assertEqual(scores["fidelity"], [None] * 4)
+
+    def test_placeholders_count_half(self):
+        filled = TEMPLATE.replace("Not provided", "m.a@example.com")
+
+        scores = self.template.score([TEMPLATE, filled])
+
+        self.assertAlmostEqual(scores["field_completeness"][0], 0.9)
+        self.assertEqual(scores["field_completeness"][1], 1.0)
+
+    def test_fidelity_penalizes_facts_missing_from_the_transcript(self):
+        faithful = "Matthew Achneepineskum was found at 704 First Street at 0656 hours."
+        invented = "Matthew Achneepineskum was found at 912 Dawson Road at 1430 hours."
+
+        scores = self.template.score([faithful, invented], TRANSCRIPT)
+
+        self.assertGreater(scores["fidelity"][0], scores["fidelity"][1])
+        self.assertEqual(len(scores["score"]), 2)
+
+    def test_no_candidates(self):
+        self.assertEqual(self.template.score([])["score"], [])
+
+if __name__ == '__main__':
+    unittest.main()
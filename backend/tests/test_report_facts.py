@@ -0,0 +1,102 @@
+import unittest
+import json
+import os
+import sys
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.report_facts import count_grounded, format_fact_sheet, merge_facts, needs_map_reduce, parse_facts, split_transcript
+from src.scheduler import estimate_tokens
+
+def facts(people=(), times=(), locations=(), events=()):
+    return {"people": [dict(person) for person in people], "times": list(times), "locations": list(locations), "events": list(events)}
+
+class TestReportFacts(unittest.TestCase):
+    def setUp(self):
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        with open(os.path.join(current_dir, 'test_transcription.txt'), 'r') as file:
+            self.test_transcription = file.read().strip()
+
+    def test_short_transcripts_are_sent_whole(self):
+        self.assertFalse(needs_map_reduce(self.test_transcription, max_tokens=4000))
+        self.assertTrue(needs_map_reduce(self.test_transcription * 6, max_tokens=4000))
+        self.assertFalse(needs_map_reduce(self.test_transcription * 6, max_tokens=0))
+
+    def test_chunks_are_bounded_and_overlap(self):
+        transcription = " ".join(f"Sentence number {index} describes the scene." for index in range(400))
+
+        chunks = split_transcript(transcription, max_tokens=200, overlap_tokens=30)
+
+        self.assertGreater(len(chunks), 5)
+        for chunk in chunks:
+            self.assertLessEqual(estimate_tokens(chunk), 201)
+        for previous, chunk in zip(chunks, chunks[1:]):
+            first_sentence = chunk.split(". ")[0] + "."
+            self.assertIn(first_sentence, previous)
+        # Every sentence is in some chunk, in order
+        self.assertTrue(chunks[0].startswith("Sentence number 0 "))
+        self.assertTrue(chunks[-1].endswith("Sentence number 399 describes the scene."))
+
+    def test_long_sentences_are_split_between_words(self):
+        chunks = split_transcript("word " * 1000, max_tokens=100, overlap_tokens=0)
+
+        self.assertEqual(sum(chunk.count("word") for chunk in chunks), 1000)
+        self.assertTrue(all(len(chunk) <= 400 for chunk in chunks))
+
+    def test_parse_facts_ignores_fences_and_bad_entries(self):
+        output = "Here are the facts:\n```json\n" + json.dumps({
+            "people": [{"name": "Matthew  SMITH", "details": "complainant"}, "Gerald DUFFY", {"details": ["no name"]}],
+            "times": ["0556 hours", 12, None],
+            "locations": "704 McLaughlin Street",
+            "events": [["nested"], "Police were dispatched."],
+        }) + "\n```"
+
+        self.assertEqual(parse_facts(output), {
+            "people": [{"name": "Matthew SMITH", "details": ["complainant"]}, {"name": "Gerald DUFFY", "details": []}],
+            "times": ["0556 hours", "12"],
+            "locations": [],
+            "events": ["Police were dispatched."],
+        })
+        self.assertIsNone(parse_facts("I could not find any facts."))
+        self.assertIsNone(parse_facts("{not json}"))
+
+    def test_grounded_facts_are_counted(self):
+        chunk = "Constable Gerald Duffy was dispatched to 704 McLaughlin Street."
+        extracted = facts(people=[{"name": "Gerald Duffy", "details": ["constable"]}],
+                          locations=["704 McLaughlin Street", "1010 Dawson Road"])
+
+        self.assertEqual(count_grounded(extracted, chunk), 3)
+        self.assertEqual(count_grounded(None, chunk), 0)
+
+    def test_merge_folds_duplicates_in_transcript_order(self):
+        merged = merge_facts([
+            facts(people=[{"name": "Matthew SMITH", "details": ["complainant"]}],
+                  events=["Police were dispatched to the Landmark Inn.", "The complainant had a stab wound."]),
+            None,
+            facts(people=[{"name": "Matthew Allan SMITH", "details": ["born April 21, 2000", "complainant"]},
+                          {"name": "SMITH", "details": ["unrelated"]}],
+                  events=["The complainant had a stab wound to the arm.", "The accused fled on foot."]),
+        ])
+
+        self.assertEqual(merged["people"], [
+            {"name": "Matthew Allan SMITH", "details": ["complainant", "born April 21, 2000"]},
+            {"name": "SMITH", "details": ["unrelated"]},
+        ])
+        self.assertEqual(merged["events"], [
+            "Police were dispatched to the Landmark Inn.",
+            "The complainant had a stab wound to the arm.",
+            "The accused fled on foot.",
+        ])
+
+    def test_fact_sheet(self):
+        sheet = format_fact_sheet(facts(people=[{"name": "Matthew SMITH", "details": ["complainant", "born 2000"]}],
+                                        events=["Police were dispatched."]), 3)
+
+        self.assertIn("3 parts", sheet)
+        self.assertIn("- Matthew SMITH: complainant; born 2000", sheet)
+        self.assertIn("TIMES\n- None mentioned", sheet)
+        self.assertIn("EVENTS\n- Police were dispatched.", sheet)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+import os
+import sys
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.report_sections import ReportStore, StoredReport, format_sections, split_sections, split_sentences
+
+REPORT = """# Incident Report
+
+**Occurrence number:** TB 2332264
+
+**Persons Details:**
+- **Surname:** ACHNEEPINESKUM
+- **Social Media Type:** TikTok
+
+**Narrative:**
+On August 10th, 2023, at 0656 hours, Constable FLUFFY was dispatched to 1010 Dawson Road for a weapons call.
+Matthew ACHNEEPINESKUM said the call was a very bad joke made for a TikTok video.
+Constable FLUFFY did not lay charges.
+
+**End of Report**"""
+
+TRANSCRIPT = (
+    "Incident number TB 2332264. "
+    "On August 10th, 2023 at 0656 hours Constable Fluffy was dispatched to 1010 Dawson Road for a weapons call. "
+    "The complainant Matthew Achneepineskum said it was a very bad joke for a TikTok video. "
+    "Constable Fluffy did not lay charges."
+)
+
+
+class TestSplitting(unittest.TestCase):
+    def test_sections_and_narrative_paragraphs(self):
+        sections = split_sections(REPORT)
+
+        self.assertEqual(
+            [key for key, _ in sections],
+            ["incident report", "persons details", "narrative", "narrative 2", "narrative 3", "end of report"],
+        )
+        self.assertEqual("".join(text for _, text in sections), REPORT)
+
+    def test_repeated_headings_and_header_fields(self):
+        sections = split_sections("**Occurrence number:** 1\n**Persons Details:**\nA\n**Persons Details:**\nB\n")
+
+        self.assertEqual([key for key, _ in sections], ["header", "persons details", "persons details #2"])
+
+    def test_sentences(self):
+        self.assertEqual(split_sentences("One. Two?\nThree"), ["One.", "Two?", "Three"])
+
+
+class TestStoredReport(unittest.TestCase):
+    def setUp(self):
+        self.stored = StoredReport(TRANSCRIPT, "General Occurrence", REPORT)
+
+    def test_sources(self):
+        self.assertIn(0, self.stored.sources["incident report"])
+        self.assertIn(1, self.stored.sources["narrative"])
+        self.assertIn(2, self.stored.sources["narrative 2"])
+
+    def test_one_word_edit_regenerates_one_paragraph(self):
+        update = self.stored.plan(TRANSCRIPT.replace("bad joke", "bad prank"))
+
+        self.assertEqual(update.keys, ["narrative 2"])
+        self.assertEqual(len(update.changes), 1)
+        self.assertIn("prank", update.changes[0][1])
+        self.assertEqual(len(update.excerpt), 3)
+
+    def test_edited_fact_regenerates_every_unit_that_used_it(self):
+        update = self.stored.plan(TRANSCRIPT.replace("TikTok", "Snapchat"))
+
+        self.assertEqual(update.keys, ["persons details", "narrative 2"])
+
+    def test_unchanged_and_large_edits(self):
+        self.assertEqual(self.stored.plan(TRANSCRIPT + "  ").keys, [])
+        self.assertIsNone(self.stored.plan("A completely different statement. About another call."))
+
+    def test_splice(self):
+        output = "```\n=== narrative 2 ===\nMatthew ACHNEEPINESKUM said the call was a prank.\n```"
+
+        report = self.stored.splice(["narrative 2"], output)
+
+        self.assertIn("said the call was a prank.\nConstable FLUFFY", report)
+        self.assertEqual(report.replace("a prank.", "a very bad joke made for a TikTok video."), REPORT)
+        self.assertIsNone(self.stored.splice(["persons details", "narrative 2"], output))
+
+    def test_format_sections(self):
+        formatted = format_sections(self.stored.sections, ["narrative 3"])
+
+        self.assertEqual(formatted, "=== narrative 3 ===\nConstable FLUFFY did not lay charges.")
+
+
+class TestReportStore(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        store = ReportStore(max_entries=2)
+        first = store.put(StoredReport("One.", "General Occurrence", "A"))
+        second = store.put(StoredReport("Two.", "General Occurrence", "B"))
+        store.get(first)
+        store.put(StoredReport("Three.", "General Occurrence", "C"))
+
+        self.assertIsNotNone(store.get(first))
+        self.assertIsNone(store.get(second))
+        self.assertEqual(store.put(StoredReport("Four.", "General Occurrence", "D"), first), first)
+        self.assertEqual(store.get(first).report, "D")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.response_cache import ResponseCache
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.db_path = os.path.join(self.temp_dir.name, "responses.sqlite")
+
+    def test_key_depends_on_model_system_prompt_and_prompt(self):
+        key = ResponseCache.make_key("groq-mixtral", "system", "prompt")
+
+        self.assertEqual(key, ResponseCache.make_key("groq-mixtral", "system", "prompt"))
+        self.assertNotEqual(key, ResponseCache.make_key("groq-gemma2", "system", "prompt"))
+        self.assertNotEqual(key, ResponseCache.make_key("groq-mixtral", None, "prompt"))
+        self.assertNotEqual(key, ResponseCache.make_key("groq-mixtral", "system", "other prompt"))
+
+    def test_memory_tier_is_lru(self):
+        cache = ResponseCache(max_entries=2)
+        cache.put("a", "A")
+        cache.put("b", "B")
+        cache.get("a")
+        cache.put("c", "C")
+
+        self.assertEqual(cache.get("a"), "A")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats(), {"hits": 2, "misses": 1, "memory_entries": 2})
+
+    def test_entries_expire(self):
+        cache = ResponseCache(max_entries=2, ttl=60, db_path=self.db_path)
+        with patch("src.tiered_cache.time.time", return_value=1000.0):
+            cache.put("a", "A")
+        with patch("src.tiered_cache.time.time", return_value=1059.0):
+            self.assertEqual(cache.get("a"), "A")
+        with patch("src.tiered_cache.time.time", return_value=1061.0):
+            self.assertIsNone(cache.get("a"))
+
+        self.assertEqual(cache.stats()["disk_entries"], 0)
+        cache.close()
+
+    def test_disk_tier_survives_restart(self):
+        cache = ResponseCache(max_entries=1, db_path=self.db_path)
+        cache.put("a", "first")
+        cache.put("b", "second")
+        cache.close()
+
+        reopened = ResponseCache(max_entries=1, db_path=self.db_path)
+        self.assertEqual(reopened.get("a"), "first")
+        self.assertEqual(reopened.stats()["disk_entries"], 2)
+        reopened.clear()
+        self.assertIsNone(reopened.get("b"))
+        reopened.close()
+
+    @patch.dict(os.environ, {"REPORT_CACHE_SIZE": "0", "REPORT_CACHE_DB": ""})
+    def test_disabled(self):
+        self.assertIsNone(ResponseCache.from_env())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+import unittest
+import asyncio
+import os
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.scheduler import PRIORITY_BATCH, PRIORITY_LIVE, TokenBucket, UpstreamScheduler, retry_after_seconds
+
+class RateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after):
+        super().__init__("Rate limit exceeded")
+        self.headers = {"Retry-After": retry_after}
+
+class TestTokenBucket(unittest.TestCase):
+    def test_refills_at_rate_up_to_capacity(self):
+        bucket = TokenBucket(rate=10, capacity=5)
+        start = bucket.updated
+
+        self.assertEqual(bucket.wait_time(5, start), 0)
+        bucket.take(5, start)
+        self.assertAlmostEqual(bucket.wait_time(2, start), 0.2)
+        self.assertAlmostEqual(bucket.wait_time(2, start + 0.2), 0)
+        self.assertEqual(bucket.wait_time(100, start + 10), 0)  # Capped at capacity
+
+class TestUpstreamScheduler(unittest.TestCase):
+    def test_token_budget_delays_calls(self):
+        scheduler = UpstreamScheduler()
+        scheduler.configure("model", tokens_per_minute=600)  # 10 tokens per second
+
+        scheduler.acquire("model", tokens=600)
+        started = time.monotonic()
+        scheduler.acquire("model", tokens=2)
+
+        self.assertGreaterEqual(time.monotonic() - started, 0.15)
+        stats = scheduler.stats()["model"]
+        self.assertEqual(stats["granted"], 2)
+        self.assertGreater(stats["max_wait_seconds"], 0.1)
+
+    def test_unconfigured_models_are_not_delayed(self):
+        scheduler = UpstreamScheduler()
+        scheduler.configure("busy", requests_per_minute=1)
+        scheduler.acquire("busy")
+
+        started = time.monotonic()
+        for _ in range(10):
+            scheduler.acquire("other")
+        self.assertLess(time.monotonic() - started, 0.1)
+        self.assertEqual(scheduler.stats()["other"]["granted"], 10)
+
+    def test_live_work_is_granted_before_batch_work(self):
+        scheduler = UpstreamScheduler()
+        scheduler.configure("model", tokens_per_minute=600)
+        scheduler.acquire("model", tokens=600)
+        order = []
+
+        def acquire(name, priority):
+            scheduler.acquire("model", tokens=1, priority=priority)
+            order.append(name)
+
+        batch = threading.Thread(target=acquire, args=("batch", PRIORITY_BATCH))
+        batch.start()
+        time.sleep(0.02)
+        live = threading.Thread(target=acquire, args=("live", PRIORITY_LIVE))
+        live.start()
+        batch.join(5)
+        live.join(5)
+
+        self.assertEqual(order, ["live", "batch"])
+
+    def test_call_retries_after_retry_after(self):
+        scheduler = UpstreamScheduler(max_retries=3, backoff=0.01)
+        calls = []
+
+        def flaky():
+            calls.append(time.monotonic())
+            if len(calls) == 1:
+                raise RateLimitError("0.1")
+            return "ok"
+
+        self.assertEqual(scheduler.call("model", flaky), "ok")
+        self.assertGreaterEqual(calls[1] - calls[0], 0.1)
+        stats = scheduler.stats()["model"]
+        self.assertEqual((stats["rate_limited"], stats["retries"]), (1, 1))
+
+    def test_call_gives_up_after_max_retries(self):
+        scheduler = UpstreamScheduler(max_retries=1, backoff=0)
+        calls = []
+
+        def limited():
+            calls.append(1)
+            raise RateLimitError("0")
+
+        with self.assertRaises(RateLimitError):
+            scheduler.call("model", limited)
+        self.assertEqual(len(calls), 2)
+
+    def test_max_retries_can_be_overridden_per_call(self):
+        scheduler = UpstreamScheduler(max_retries=3, backoff=0)
+        calls = []
+
+        def limited():
+            calls.append(1)
+            raise RateLimitError("0")
+
+        with self.assertRaises(RateLimitError):
+            scheduler.call("model", limited, max_retries=0)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(scheduler.stats()["model"]["rate_limited"], 1)
+
+    def test_other_errors_are_not_retried(self):
+        scheduler = UpstreamScheduler()
+        calls = []
+
+        def broken():
+            calls.append(1)
+            raise ValueError("bad request")
+
+        with self.assertRaises(ValueError):
+            scheduler.call("model", broken)
+        self.assertEqual(len(calls), 1)
+
+    @patch.dict(os.environ, {"UPSTREAM_RATE_LIMITS": "distil-whisper-large-v3-en=20, ollama/llama3.1:8b=30/5000"})
+    def test_from_env(self):
+        scheduler = UpstreamScheduler.from_env()
+
+        whisper = scheduler._models["distil-whisper-large-v3-en"]
+        self.assertEqual(whisper.requests.capacity, 20)
+        self.assertIsNone(whisper.tokens)
+        self.assertEqual(scheduler._models["ollama/llama3.1:8b"].tokens.capacity, 5000)
+
+    def test_retry_after_seconds(self):
+        self.assertEqual(retry_after_seconds(RateLimitError("7")), 7.0)
+        self.assertEqual(retry_after_seconds(RateLimitError(None)), 60.0)
+        self.assertIsNone(retry_after_seconds(RuntimeError("boom")))
+
+class TestUpstreamSchedulerAsync(unittest.IsolatedAsyncioTestCase):
+    async def test_call_async_retries(self):
+        scheduler = UpstreamScheduler(max_retries=2, backoff=0.01)
+        calls = []
+
+        async def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise RateLimitError("0")
+            return "ok"
+
+        self.assertEqual(await scheduler.call_async("model", flaky), "ok")
+        self.assertEqual(len(calls), 3)
+
+    async def test_cancelled_waiter_leaves_the_queue(self):
+        scheduler = UpstreamScheduler()
+        scheduler.configure("model", tokens_per_minute=60)
+        await scheduler.acquire_async("model", tokens=60)
+
+        waiting = asyncio.create_task(scheduler.acquire_async("model", tokens=60))
+        await asyncio.sleep(0.01)
+        self.assertEqual(scheduler.stats()["model"]["queue_depth"], 1)
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+
+        self.assertEqual(scheduler.stats()["model"]["queue_depth"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
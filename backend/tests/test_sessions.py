@@ -0,0 +1,190 @@
+import unittest
+import asyncio
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+
+from fastapi import WebSocketDisconnect
+from fastapi.testclient import TestClient
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import main
+from src.sessions import SessionManager, StreamSession
+
+class FakeWebSocket:
+    def __init__(self, **query_params):
+        self.query_params = {key: str(value) for key, value in query_params.items()}
+        self.inbound = asyncio.Queue()
+        self.sent = []
+        self.closed_with = None
+
+    async def accept(self):
+        pass
+
+    async def receive_bytes(self):
+        message = await self.inbound.get()
+        if isinstance(message, Exception):
+            raise message
+        return message
+
+    async def send_json(self, data):
+        self.sent.append(data)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+    def events(self):
+        return [data for data in self.sent if "seq" in data]
+
+async def wait_until(condition, timeout=2):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("Condition not met in time")
+        await asyncio.sleep(0.005)
+
+async def echo(session):
+    while (message := await session.get()) is not None:
+        await session.emit({"text": message.decode()})
+
+class TestStreamSession(unittest.IsolatedAsyncioTestCase):
+    async def test_full_inbound_queue_pauses_the_client(self):
+        session = StreamSession("/stream", max_inbound_bytes=10)
+        websocket = FakeWebSocket()
+        session.attach(websocket)
+
+        await session.put(b"123456")
+        put = asyncio.create_task(session.put(b"789012"))
+        await wait_until(lambda: websocket.sent)
+
+        self.assertEqual(websocket.sent, [{"status": "backpressure", "paused": True}])
+        self.assertFalse(put.done())
+
+        self.assertEqual(await session.get(), b"123456")
+        await put
+        self.assertEqual(websocket.sent[-1], {"status": "backpressure", "paused": False})
+        self.assertEqual(await session.get(), b"789012")
+
+    async def test_outbound_queue_is_bounded(self):
+        session = StreamSession("/stream", max_outbound_events=2)
+        await session.emit({"text": "one"})
+        await session.emit({"text": "two"})
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(session.emit({"text": "three"}), timeout=0.05)
+
+class TestSessionManager(unittest.IsolatedAsyncioTestCase):
+    async def test_sessions_over_the_limit_are_refused(self):
+        manager = SessionManager(max_sessions=1)
+        first = FakeWebSocket()
+        serving = asyncio.create_task(manager.serve(first, "/stream", echo))
+        await wait_until(lambda: first.sent)
+
+        second = FakeWebSocket()
+        await manager.serve(second, "/stream", echo)
+
+        self.assertEqual(second.sent[0]["detail"], "Too many concurrent streams")
+        self.assertEqual(second.closed_with, 1013)
+        self.assertEqual(manager.stats()["rejected"], 1)
+
+        first.inbound.put_nowait(b"")
+        await serving
+        self.assertEqual(manager.stats()["active"], 0)
+
+    async def test_dropped_session_resumes_with_missed_events(self):
+        manager = SessionManager()
+        first = FakeWebSocket()
+        serving = asyncio.create_task(manager.serve(first, "/stream", echo))
+        await wait_until(lambda: first.sent)
+        session_id = first.sent[0]["session_id"]
+
+        first.inbound.put_nowait(b"one")
+        await wait_until(lambda: first.events())
+        first.inbound.put_nowait(WebSocketDisconnect(code=1006))
+        await serving
+        self.assertEqual(manager.stats()["connected"], 0)
+
+        # The session keeps processing while nobody is connected
+        manager.sessions[session_id]._inbound.append(b"two")
+        await manager.sessions[session_id]._notify()
+
+        second = FakeWebSocket(session_id=session_id, last_seq=first.events()[-1]["seq"])
+        serving = asyncio.create_task(manager.serve(second, "/stream", echo))
+        await wait_until(lambda: second.events())
+        second.inbound.put_nowait(b"")
+        await serving
+
+        self.assertEqual(second.sent[0], {"status": "session", "session_id": session_id, "resumed": True, "missed_events": 0})
+        self.assertEqual(second.events(), [{"text": "two", "seq": 2}])
+        self.assertEqual(second.closed_with, 1000)
+        self.assertEqual(manager.stats()["resumed"], 1)
+
+        unknown = FakeWebSocket(session_id=session_id)
+        await manager.serve(unknown, "/stream", echo)
+        self.assertEqual(unknown.closed_with, 1008)
+
+    async def test_shutdown_drains_sessions(self):
+        received = asyncio.Event()
+
+        async def slow_echo(session):
+            while (message := await session.get()) is not None:
+                received.set()
+                await asyncio.sleep(0.05)  # Still working when the shutdown begins
+                await session.emit({"text": message.decode()})
+
+        manager = SessionManager()
+        websocket = FakeWebSocket()
+        serving = asyncio.create_task(manager.serve(websocket, "/stream", slow_echo))
+        websocket.inbound.put_nowait(b"last words")
+        await asyncio.wait_for(received.wait(), timeout=2)
+
+        await manager.shutdown(timeout=1)
+        await serving
+
+        self.assertEqual(websocket.events(), [{"text": "last words", "seq": 1}])
+        self.assertEqual(websocket.closed_with, 1000)
+        self.assertEqual(manager.stats()["active"], 0)
+
+        refused = FakeWebSocket()
+        await manager.serve(refused, "/stream", echo)
+        self.assertEqual(refused.closed_with, 1013)
+
+class RecordingBackend:
+    name = "recording"
+
+    def __init__(self):
+        self.audio_files = []
+
+    async def transcribe_audio(self, audio_file, language=None, timeout=None, prompt=None):
+        self.audio_files.append(audio_file)
+        return f"message {len(self.audio_files)}"
+
+class TestTranscribeStream(unittest.TestCase):
+    def test_messages_are_transcribed_without_temp_files(self):
+        backend = RecordingBackend()
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        cwd = os.getcwd()
+        os.chdir(temp_dir.name)
+        self.addCleanup(os.chdir, cwd)
+
+        with patch.object(main, "transcription_backend", backend), \
+                patch("src.sessions._manager", SessionManager()):
+            with TestClient(main.app).websocket_connect("/api/v1/transcribe-stream") as websocket:
+                hello = websocket.receive_json()
+                websocket.send_bytes(b"first")
+                first = websocket.receive_json()
+                websocket.send_bytes(b"second")
+                second = websocket.receive_json()
+
+        self.assertEqual(hello["status"], "session")
+        self.assertEqual((first["text"], first["seq"]), ("message 1", 1))
+        self.assertEqual((second["text"], second["seq"]), ("message 2", 2))
+        self.assertEqual(backend.audio_files, [("audio.wav", b"first"), ("audio.wav", b"second")])
+        self.assertEqual(os.listdir(temp_dir.name), [])
+
+if __name__ == '__main__':
+    unittest.main()
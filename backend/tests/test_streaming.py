@@ -0,0 +1,121 @@
+import unittest
+import asyncio
+import os
+import sys
+import numpy as np
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.streaming import PcmRingBuffer, StreamingTranscriber
+
+def tone(seconds, sample_rate=16000, amplitude=8000):
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    return (amplitude * np.sin(2 * np.pi * 440 * t)).astype(np.int16)
+
+def silence(seconds, sample_rate=16000):
+    return np.zeros(int(seconds * sample_rate), dtype=np.int16)
+
+class FakeClient:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def transcribe_audio(self, audio_file, language=None, prompt=None):
+        filename, data = audio_file
+        self.calls.append((filename, prompt))
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        return f"words for {filename}"
+
+async def feed_in_chunks(transcriber, samples, chunk_seconds=0.25):
+    step = int(chunk_seconds * 16000)
+    for i in range(0, len(samples), step):
+        await transcriber.feed(samples[i:i + step].tobytes())
+        await asyncio.sleep(0)  # Let pending transcriptions run, as a socket receive would
+
+async def collect(transcriber):
+    return [event async for event in transcriber.events()]
+
+class TestPcmRingBuffer(unittest.TestCase):
+    def test_offsets_survive_wraparound(self):
+        buffer = PcmRingBuffer(10)
+        buffer.write(np.arange(8, dtype=np.int16))
+        buffer.discard_until(6)
+        buffer.write(np.arange(8, 14, dtype=np.int16))
+
+        self.assertEqual((buffer.start, buffer.end), (6, 14))
+        np.testing.assert_array_equal(buffer.read(6, 14), np.arange(6, 14))
+
+    def test_overflow_drops_oldest(self):
+        buffer = PcmRingBuffer(4)
+        buffer.write(np.arange(6, dtype=np.int16))
+
+        self.assertEqual(buffer.start, 2)
+        np.testing.assert_array_equal(buffer.read(2, 6), np.arange(2, 6))
+        with self.assertRaises(IndexError):
+            buffer.read(0, 3)
+
+class TestStreamingTranscriber(unittest.IsolatedAsyncioTestCase):
+    async def test_windows_flush_on_silence_with_stable_offsets(self):
+        client = FakeClient()
+        transcriber = StreamingTranscriber(client, partial_interval_seconds=0)
+        audio = np.concatenate([tone(3), silence(1), tone(2.5), silence(1)])
+
+        consumer = asyncio.create_task(collect(transcriber))
+        await feed_in_chunks(transcriber, audio)
+        await transcriber.close()
+        events = await consumer
+
+        self.assertEqual(len(client.calls), 2)
+        self.assertEqual([e["status"] for e in events], ["success", "success"])
+        # Windows are trimmed to the speech plus a 0.3 s hangover, at 30 ms frame resolution
+        for event, (start, end) in zip(events, [(0.0, 3.3), (3.7, 6.8)]):
+            self.assertAlmostEqual(event["start"], start, delta=0.05)
+            self.assertAlmostEqual(event["end"], end, delta=0.05)
+        self.assertGreaterEqual(events[1]["start"], events[0]["end"])
+        self.assertAlmostEqual(transcriber.skipped_seconds, 1.2, delta=0.1)
+        self.assertEqual(client.calls[1][1], events[0]["transcription"])
+
+    async def test_silence_only_stream_makes_no_requests(self):
+        client = FakeClient()
+        transcriber = StreamingTranscriber(client)
+
+        await feed_in_chunks(transcriber, silence(10))
+        await transcriber.close()
+
+        self.assertEqual(await collect(transcriber), [])
+        self.assertEqual(client.calls, [])
+        self.assertAlmostEqual(transcriber.skipped_seconds, 10.0)
+
+    async def test_long_speech_is_cut_at_max_window(self):
+        client = FakeClient()
+        transcriber = StreamingTranscriber(client, max_window_seconds=4, partial_interval_seconds=0)
+
+        consumer = asyncio.create_task(collect(transcriber))
+        await feed_in_chunks(transcriber, tone(10))
+        await transcriber.close()
+        events = await consumer
+
+        self.assertEqual([(e["start"], e["end"]) for e in events], [(0.0, 4.0), (4.0, 8.0), (8.0, 10.0)])
+
+    async def test_transcription_overlaps_receiving_and_emits_partials(self):
+        client = FakeClient(delay=0.05)
+        transcriber = StreamingTranscriber(client, max_window_seconds=2, partial_interval_seconds=1)
+
+        consumer = asyncio.create_task(collect(transcriber))
+        await feed_in_chunks(transcriber, tone(8))
+        await transcriber.close()
+        events = await consumer
+
+        self.assertGreater(client.peak, 1)
+        self.assertIn("partial", [e["status"] for e in events])
+        finals = [e for e in events if e["status"] == "success"]
+        self.assertEqual(finals[-1]["end"], 8.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import unittest
+import io
+import os
+import shutil
+import sys
+import wave
+import numpy as np
+from unittest.mock import patch
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.audio_chunker import PcmAudio, transcribe_recording
+from src.audio_ingest import IngestedAudio
+from src.transcoder import Transcoder, encode, resample
+
+def tone(seconds, sample_rate=16000, frequency=440, amplitude=8000):
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.int16)
+
+def stereo_wav(seconds, sample_rate=48000):
+    samples = tone(seconds, sample_rate)
+    wav_data = io.BytesIO()
+    with wave.open(wav_data, 'wb') as wav_file:
+        wav_file.setnchannels(2)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(np.stack([samples, samples], axis=1).tobytes())
+    return wav_data.getvalue()
+
+def dominant_frequency(samples, sample_rate):
+    spectrum = np.abs(np.fft.rfft(samples.astype(np.float64)))
+    return np.argmax(spectrum) * sample_rate / len(samples)
+
+class RecordingClient:
+    def __init__(self):
+        self.uploads = []
+
+    async def transcribe_audio(self, audio_file, language=None, priority=None, max_retries=None):
+        self.uploads.append(audio_file)
+        return "officer arrived on scene"
+
+class PcmClient(RecordingClient):
+    accepts_pcm = True
+
+class TestTranscoder(unittest.IsolatedAsyncioTestCase):
+    def test_resample_keeps_pitch(self):
+        resampled = resample(tone(1, 48000), 48000)
+
+        self.assertEqual(len(resampled), 16000)
+        self.assertAlmostEqual(dominant_frequency(resampled, 16000), 440, delta=2)
+
+    def test_encode_falls_back_to_wav_without_ffmpeg(self):
+        with patch("src.transcoder.shutil.which", return_value=None):
+            payload, extension, seconds = encode(tone(1), codec="opus")
+
+        self.assertEqual(extension, "wav")
+        self.assertEqual(len(payload), 44 + 2 * 16000)
+        self.assertGreaterEqual(seconds, 0)
+
+    @unittest.skipUnless(shutil.which("ffmpeg"), "ffmpeg is not installed")
+    def test_opus_is_much_smaller_than_wav(self):
+        payload, extension, _ = encode(tone(10), codec="opus")
+
+        self.assertEqual(extension, "ogg")
+        self.assertLess(len(payload) * 5, 2 * 16000 * 10)
+
+    def test_encoding_is_bit_exact(self):
+        with patch("src.transcoder.shutil.which", return_value="ffmpeg"), \
+                patch("src.transcoder.subprocess.run") as run:
+            run.return_value.returncode = 0
+            run.return_value.stdout = b"OggS"
+            encode(tone(1), codec="opus")
+
+        command = run.call_args[0][0]
+        self.assertIn("+bitexact", command[command.index("-fflags") + 1])
+        self.assertEqual(command[-1], "pipe:1")
+
+    @unittest.skipUnless(shutil.which("ffmpeg"), "ffmpeg is not installed")
+    def test_same_audio_encodes_to_same_bytes(self):
+        self.assertEqual(encode(tone(2), codec="opus")[0], encode(tone(2), codec="opus")[0])
+
+    async def test_decode_normalizes(self):
+        transcoder = Transcoder(max_workers=1, codec="wav")
+        self.addCleanup(transcoder.shutdown)
+
+        pcm = await transcoder.decode(stereo_wav(2), "scene.wav")
+
+        self.assertEqual((pcm.sample_rate, pcm.samples.ndim, len(pcm.samples)), (16000, 1, 32000))
+        self.assertEqual(transcoder.stats()["decoded_bytes"], len(stereo_wav(2)))
+
+    async def test_recording_is_sent_normalized(self):
+        data = stereo_wav(5)
+        client = RecordingClient()
+        transcoder = Transcoder(max_workers=0, codec="wav")
+
+        with patch("src.transcoder.shutil.which", return_value=None):
+            with IngestedAudio("scene.wav", io.BytesIO(data), len(data)) as audio:
+                text, _, _ = await transcribe_recording(client, audio, max_request_size=25 * 1024 * 1024, transcoder=transcoder)
+
+        self.assertEqual(text, "officer arrived on scene")
+        filename, payload = client.uploads[0]
+        self.assertEqual(filename, "audio.wav")
+        # 48 kHz stereo becomes 16 kHz mono
+        self.assertLess(len(payload) * 5, len(data))
+        self.assertEqual(transcoder.stats()["encoded_bytes"], len(payload))
+
+    async def test_pcm_clients_get_the_decoded_audio(self):
+        data = stereo_wav(5)
+        client = PcmClient()
+        transcoder = Transcoder(max_workers=0, codec="wav")
+
+        with IngestedAudio("scene.wav", io.BytesIO(data), len(data)) as audio:
+            await transcribe_recording(client, audio, max_request_size=25 * 1024 * 1024, transcoder=transcoder)
+
+        self.assertIsInstance(client.uploads[0], PcmAudio)
+        self.assertEqual(len(client.uploads[0].samples), 5 * 16000)
+        self.assertEqual(transcoder.stats()["encoded_bytes"], 0)
+
+    def test_rejects_unknown_codec(self):
+        with self.assertRaises(ValueError):
+            Transcoder(codec="mp3")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+import unittest
+import asyncio
+import os
+import sys
+import numpy as np
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.audio_chunker import pcm_to_wav, words_to_segments
+from src.transcription_backends import LocalWhisperBackend, TranscriptionBackend, create_backend
+from src.transcription_cache import TranscriptionCache
+
+class FakePipeline:
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, inputs, **kwargs):
+        if isinstance(inputs, dict):
+            return {"text": ""}
+        self.batches.append((len(inputs), kwargs["generate_kwargs"].get("language")))
+        return [
+            {
+                "text": f" Recording of {len(item['raw']) / item['sampling_rate']:.0f} seconds.",
+                "chunks": [
+                    {"text": " Recording", "timestamp": (0.0, 0.4)},
+                    {"text": " of", "timestamp": (0.5, 0.6)},
+                    {"text": " seconds.", "timestamp": (0.7, None)},
+                ],
+            }
+            for item in inputs
+        ]
+
+def wav(seconds):
+    return pcm_to_wav(np.zeros(int(seconds * 16000), dtype=np.int16))
+
+class TestLocalWhisperBackend(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_requests_are_batched(self):
+        pipeline = FakePipeline()
+        backend = LocalWhisperBackend(pipeline=pipeline, batch_size=4, batch_wait=0.05)
+        self.addAsyncCleanup(backend.aclose)
+
+        texts = await asyncio.gather(*(
+            backend.transcribe_audio((f"clip_{i}.wav", wav(i + 1)), language="en") for i in range(3)
+        ))
+
+        self.assertEqual(texts, [f"Recording of {i + 1} seconds." for i in range(3)])
+        self.assertEqual(pipeline.batches, [(3, "en")])
+
+    async def test_batches_are_split_by_size_and_language(self):
+        pipeline = FakePipeline()
+        backend = LocalWhisperBackend(pipeline=pipeline, batch_size=2, batch_wait=0.05)
+        self.addAsyncCleanup(backend.aclose)
+
+        await asyncio.gather(
+            backend.transcribe_audio(("a.wav", wav(1)), language="en"),
+            backend.transcribe_audio(("b.wav", wav(1)), language="en"),
+            backend.transcribe_audio(("c.wav", wav(1)), language="fr"),
+        )
+
+        self.assertEqual(sorted(pipeline.batches), [(1, "fr"), (2, "en")])
+
+    async def test_timestamps_fill_missing_end(self):
+        backend = LocalWhisperBackend(pipeline=FakePipeline(), batch_wait=0)
+        self.addAsyncCleanup(backend.aclose)
+
+        result = await backend.transcribe_timestamped(("a.wav", wav(2)))
+
+        self.assertEqual(result["words"][-1], {"word": "seconds.", "start": 0.7, "end": 2.0})
+        self.assertEqual(len(result["segments"]), 1)
+        self.assertEqual(result["segments"][0]["text"], "Recording of seconds.")
+
+    async def test_cached_results_skip_inference(self):
+        pipeline = FakePipeline()
+        backend = LocalWhisperBackend(pipeline=pipeline, batch_wait=0, cache=TranscriptionCache())
+        self.addAsyncCleanup(backend.aclose)
+
+        first = await backend.transcribe_timestamped(("a.wav", wav(1)))
+        second = await backend.transcribe_timestamped(("a.wav", wav(1)))
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(pipeline.batches), 1)
+
+    async def test_inference_errors_reach_every_waiter(self):
+        def failing(inputs, **kwargs):
+            raise RuntimeError("out of memory")
+
+        backend = LocalWhisperBackend(pipeline=failing, batch_wait=0.05)
+        self.addAsyncCleanup(backend.aclose)
+
+        results = await asyncio.gather(
+            backend.transcribe_audio(("a.wav", wav(1))),
+            backend.transcribe_audio(("b.wav", wav(1))),
+            return_exceptions=True,
+        )
+
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+
+    async def test_ignored_prompt_is_logged_once(self):
+        backend = LocalWhisperBackend(pipeline=FakePipeline(), batch_wait=0)
+        self.addAsyncCleanup(backend.aclose)
+
+        with self.assertLogs("src.transcription_backends", level="INFO") as logs:
+            for _ in range(2):
+                await backend.transcribe_audio(("a.wav", wav(1)), prompt="Officer Smith")
+
+        self.assertEqual(len(logs.records), 1)
+
+class TestBackendSelection(unittest.TestCase):
+    def test_words_to_segments_splits_on_sentences_and_pauses(self):
+        words = [
+            {"word": "Stop.", "start": 0.0, "end": 0.4},
+            {"word": "Hands", "start": 0.5, "end": 0.8},
+            {"word": "up", "start": 0.9, "end": 1.0},
+            {"word": "now", "start": 2.5, "end": 2.8},
+        ]
+
+        segments = words_to_segments(words)
+
+        self.assertEqual([segment["text"] for segment in segments], ["Stop.", "Hands up", "now"])
+        self.assertEqual([segment["id"] for segment in segments], [0, 1, 2])
+
+    def test_create_backend(self):
+        self.assertIsInstance(create_backend("local"), LocalWhisperBackend)
+        with self.assertRaises(ValueError):
+            create_backend("cloud")
+
+    def test_groq_client_is_a_backend(self):
+        from src.groq_client import AsyncGroqClient
+
+        self.assertTrue(issubclass(AsyncGroqClient, TranscriptionBackend))
+        self.assertFalse(AsyncGroqClient.supports_timestamps)
+
+    def test_backend_interface_is_enforced(self):
+        class Incomplete(TranscriptionBackend):
+            pass
+
+        class TextOnly(TranscriptionBackend):
+            async def transcribe_audio(self, audio_file, **kwargs):
+                return ""
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+        with self.assertRaises(NotImplementedError):
+            asyncio.run(TextOnly().transcribe_timestamped(b""))
+        with self.assertRaises(TypeError):
+            class Mislabelled(TextOnly):
+                supports_timestamps = True
+
+if __name__ == '__main__':
+    unittest.main()
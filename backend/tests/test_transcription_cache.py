@@ -0,0 +1,89 @@
+import unittest
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.transcription_cache import TranscriptionCache, hash_audio
+
+class TestTranscriptionCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.db_path = os.path.join(self.temp_dir.name, "cache.sqlite")
+
+    def test_hash_audio_accepts_every_upload_form(self):
+        data = b"evidence audio"
+        buffer = io.BytesIO(data)
+        expected = hash_audio(data)
+
+        self.assertEqual(hash_audio(("a.wav", data)), expected)
+        self.assertEqual(hash_audio(("a.wav", buffer)), expected)
+        self.assertEqual(buffer.tell(), 0)
+
+    def test_key_depends_on_model_language_and_prompt(self):
+        audio_hash = hash_audio(b"audio")
+        key = TranscriptionCache.make_key(audio_hash, "whisper", "en", "prompt")
+
+        self.assertEqual(key, TranscriptionCache.make_key(audio_hash, "whisper", "en", "prompt"))
+        self.assertNotEqual(key, TranscriptionCache.make_key(audio_hash, "whisper", "fr", "prompt"))
+        self.assertNotEqual(key, TranscriptionCache.make_key(audio_hash, "other", "en", "prompt"))
+        self.assertNotEqual(key, TranscriptionCache.make_key(audio_hash, "whisper", "en", None))
+
+    def test_memory_tier_is_lru(self):
+        cache = TranscriptionCache(max_entries=2)
+        cache.put("a", "A")
+        cache.put("b", "B")
+        cache.get("a")
+        cache.put("c", "C")
+
+        self.assertEqual(cache.get("a"), "A")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats(), {"hits": 2, "misses": 1, "memory_entries": 2})
+
+    def test_disk_tier_survives_restart(self):
+        cache = TranscriptionCache(max_entries=1, db_path=self.db_path)
+        cache.put("a", "first")
+        cache.put("b", "second")
+        cache.close()
+
+        reopened = TranscriptionCache(max_entries=1, db_path=self.db_path)
+        self.assertEqual(reopened.get("a"), "first")
+        self.assertEqual(reopened.stats()["disk_entries"], 2)
+        reopened.close()
+
+    def test_reads_disk_tier_written_before_entries_could_expire(self):
+        db = sqlite3.connect(self.db_path)
+        db.execute(
+            "CREATE TABLE transcriptions ("
+            "key TEXT PRIMARY KEY, text TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        db.execute("INSERT INTO transcriptions VALUES ('key', 'stored text', 11, 0)")
+        db.commit()
+        db.close()
+
+        cache = TranscriptionCache(max_entries=0, db_path=self.db_path)
+        self.addCleanup(cache.close)
+
+        self.assertEqual(cache.get("key"), "stored text")
+        cache.put("other", "more text")
+        self.assertEqual(cache.get("other"), "more text")
+
+    def test_disk_tier_evicts_least_recently_used(self):
+        cache = TranscriptionCache(max_entries=0, db_path=self.db_path, max_disk_bytes=25)
+        cache.put("a", "x" * 10)
+        cache.put("b", "y" * 10)
+        cache.get("a")
+        cache.put("c", "z" * 10)
+
+        self.assertEqual(cache.get("a"), "x" * 10)
+        self.assertIsNone(cache.get("b"))
+        self.assertLessEqual(cache.stats()["disk_bytes"], 25)
+        cache.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import os
+import sys
+import numpy as np
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.vad import detect_speech
+
+def tone(seconds, sample_rate=16000, amplitude=8000):
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    return (amplitude * np.sin(2 * np.pi * 440 * t)).astype(np.int16)
+
+def noise(seconds, sample_rate=16000, amplitude=50, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal(int(seconds * sample_rate)) * amplitude).astype(np.int16)
+
+class TestVad(unittest.TestCase):
+    def test_finds_speech_between_silences(self):
+        samples = np.concatenate([noise(5), tone(2), noise(5, seed=1), tone(1), noise(2, seed=2)])
+        result = detect_speech(samples, 16000, hangover_seconds=0.3)
+
+        self.assertEqual(len(result.regions), 2)
+        starts = [start / 16000 for start, _ in result.regions]
+        ends = [end / 16000 for _, end in result.regions]
+        self.assertAlmostEqual(starts[0], 4.7, delta=0.05)
+        self.assertAlmostEqual(ends[0], 7.3, delta=0.05)
+        self.assertAlmostEqual(starts[1], 11.7, delta=0.05)
+        self.assertAlmostEqual(result.skipped_seconds, 15 - 3 - 1.2, delta=0.1)
+
+    def test_silence_has_no_speech(self):
+        result = detect_speech(noise(10), 16000)
+        self.assertFalse(result.has_speech)
+        self.assertEqual(result.skipped_seconds, 10.0)
+
+    def test_continuous_speech_is_kept_whole(self):
+        result = detect_speech(tone(5), 16000)
+        self.assertEqual(result.regions, [(0, 5 * 16000)])
+        self.assertEqual(result.skipped_seconds, 0.0)
+
+    def test_short_clicks_are_ignored(self):
+        samples = np.concatenate([noise(2), tone(0.03), noise(2, seed=1)])
+        self.assertFalse(detect_speech(samples, 16000).has_speech)
+
+    def test_compact_maps_offsets_back(self):
+        samples = np.concatenate([noise(5), tone(2), noise(5, seed=1), tone(1)])
+        result = detect_speech(samples, 16000, hangover_seconds=0)
+        compacted, speech_map = result.compact(samples)
+
+        self.assertEqual(len(compacted), result.speech_samples)
+        first_start, first_end = result.regions[0]
+        second_start, _ = result.regions[1]
+        self.assertEqual(speech_map.to_original(0), first_start)
+        self.assertEqual(speech_map.to_original(first_end - first_start), second_start)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,88 @@
 import axiosInstance from './axiosConfig';
 
-export const uploadAudio = async (audioFile: File): Promise<{ text: string }> => {
+export type JobLane = 'live' | 'batch';
+
+export interface Job<T> {
+  job_id: string;
+  kind: string;
+  lane: JobLane;
+  status: 'queued' | 'running' | 'succeeded' | 'failed';
+  result: T | null;
+  error: string | null;
+}
+
+export interface JobOptions {
+  // Run the work as a background job and poll for its result instead of holding the request open
+  background?: boolean;
+  lane?: JobLane;
+}
+
+export interface ReportResult {
+  report: string;
+  // Pass back on the next request for the same transcription to regenerate only the edited sections
+  report_id?: string;
+  regenerated_sections?: string[] | null;
+}
+
+export interface ReportOptions extends JobOptions {
+  reportId?: string;
+}
+
+const JOB_POLL_WAIT_SECONDS = 25;
+
+export const submitTranscriptionJob = async (audioFile: File, lane: JobLane = 'live'): Promise<string> => {
+  const formData = new FormData();
+  formData.append('file', audioFile);
+  const response = await axiosInstance.post('/api/v1/jobs/transcription', formData, {
+    headers: {
+      'Content-Type': 'multipart/form-data'
+    },
+    params: { lane },
+  });
+  return response.data.job_id;
+};
+
+export const submitReportJob = async (transcription: string, reportType: string, lane: JobLane = 'live'): Promise<string> => {
+  const response = await axiosInstance.post('/api/v1/jobs/report', {
+    transcription,
+    report_type: reportType
+  }, {
+    params: { lane },
+  });
+  return response.data.job_id;
+};
+
+export const getJob = async <T>(jobId: string, wait = 0): Promise<Job<T>> => {
+  const response = await axiosInstance.get(`/api/v1/jobs/${jobId}`, {
+    params: { wait },
+    // Long polls hold the request open for up to `wait` seconds
+    timeout: (wait + 10) * 1000,
+  });
+  return response.data;
+};
+
+export const waitForJob = async <T>(jobId: string): Promise<T> => {
+  while (true) {
+    const job = await getJob<T>(jobId, JOB_POLL_WAIT_SECONDS);
+    if (job.status === 'succeeded') {
+      return job.result as T;
+    }
+    if (job.status === 'failed') {
+      throw new Error(job.error || 'Job failed');
+    }
+  }
+};
+
+export const uploadAudio = async (audioFile: File, options: JobOptions = {}): Promise<{ text: string }> => {
+  if (options.background) {
+    try {
+      return await waitForJob<{ text: string }>(await submitTranscriptionJob(audioFile, options.lane));
+    } catch (error) {
+      console.error('Error uploading audio:', error);
+      throw error;
+    }
+  }
+
   const formData = new FormData();
   formData.append('file', audioFile);
 
@@ -22,11 +104,16 @@ export const uploadAudio = async (audioFile: File): Promise<{ text: string }> =>
   }
 };
 
-export const generateReport = async (transcription: string, reportType: string): Promise<{ report: string }> => {
+export const generateReport = async (transcription: string, reportType: string, options: ReportOptions = {}): Promise<ReportResult> => {
   try {
+    if (options.background) {
+      return await waitForJob<ReportResult>(await submitReportJob(transcription, reportType, options.lane));
+    }
+
     const response = await axiosInstance.post('/api/v1/generate_report', {
       transcription,
-      report_type: reportType
+      report_type: reportType,
+      report_id: options.reportId
     });
 
     if (response.status !== 200) {
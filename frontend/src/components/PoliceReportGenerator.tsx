@@ -9,6 +9,7 @@ const PoliceReportGenerator: React.FC = () => {
   const [isRecording, setIsRecording] = useState(false);
   const [transcription, setTranscription] = useState("");
   const [report, setReport] = useState("");
+  const [reportId, setReportId] = useState<string | undefined>(undefined);
   const [audioBlob, setAudioBlob] = useState<Blob | null>(null);
   const [error, setError] = useState<string | null>(null);
   const [isLoading, setIsLoading] = useState(false);
@@ -20,6 +21,8 @@ const PoliceReportGenerator: React.FC = () => {
   const chunksRef = useRef<Blob[]>([]);
   const retryTimeoutRef = useRef<NodeJS.Timeout | null>(null);
   const failedChunkRef = useRef<Blob | null>(null);
+  const pausedRef = useRef(false); // The server asked us to stop sending until it catches up
+  const heldChunksRef = useRef<ArrayBuffer[]>([]);
   const fileInputRef = useRef<HTMLInputElement>(null);
 
   useEffect(() => {
@@ -51,6 +54,15 @@ const PoliceReportGenerator: React.FC = () => {
         if (data.status === 'success') {
           setTranscription(prev => prev + ' ' + data.transcription);
           failedChunkRef.current = null; // Clear the failed chunk on success
+        } else if (data.status === 'backpressure') {
+          pausedRef.current = data.paused;
+          if (!data.paused) {
+            // Send the audio recorded while paused, in order
+            for (const held of heldChunksRef.current) {
+              websocketRef.current?.send(held);
+            }
+            heldChunksRef.current = [];
+          }
         } else if (data.status === 'error') {
           if (data.detail === 'Rate limit exceeded' && data.retry_after) {
             const retryAfter = parseInt(data.retry_after, 10) * 1000; // Convert to milliseconds
@@ -83,7 +95,11 @@ const PoliceReportGenerator: React.FC = () => {
           if (websocketRef.current?.readyState === WebSocket.OPEN && !failedChunkRef.current) {
             const chunk = new Blob([event.data], { type: "audio/webm" });
             const arrayBuffer = await chunk.arrayBuffer();
-            websocketRef.current.send(arrayBuffer);
+            if (pausedRef.current) {
+              heldChunksRef.current.push(arrayBuffer);
+            } else {
+              websocketRef.current.send(arrayBuffer);
+            }
             failedChunkRef.current = chunk; // Store the last sent chunk
           }
         }
@@ -94,6 +110,8 @@ const PoliceReportGenerator: React.FC = () => {
         setAudioBlob(blob);
         chunksRef.current = [];
         failedChunkRef.current = null;
+        pausedRef.current = false;
+        heldChunksRef.current = [];
       };
 
       mediaRecorderRef.current.start(1000); // Send audio data every 1000ms (1 second)
@@ -123,8 +141,9 @@ const PoliceReportGenerator: React.FC = () => {
       setError(null);
       setIsGeneratingReport(true);
       try {
-        const result = await generateReport(transcription, "General Occurrence");
+        const result = await generateReport(transcription, "General Occurrence", { reportId });
         setReport(result.report);
+        setReportId(result.report_id);
       } catch (error) {
         console.error("Report generation error:", error);
         setError("Failed to generate report. Please try again.");
@@ -141,6 +160,7 @@ const PoliceReportGenerator: React.FC = () => {
       setAudioBlob(file);
       setTranscription(""); // Clear any existing transcription
       setReport(""); // Clear any existing report
+      setReportId(undefined);
       setIsLoading(true);
       setIsTranscribing(true);
       setError(null);